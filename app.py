@@ -10,7 +10,7 @@ import os
 import sys
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -66,7 +66,11 @@ except EnvironmentError as e:
 
 # Importar sistema
 import config
-from transcribe_consult import VeterinaryTranscription
+from transcribe_consult import VeterinaryTranscription, run_consultation_job, tutor_summary_filename
+from services.job_queue import ACTIVE_STATUSES, get_job_queue
+from services.progress import ProgressStore
+from services import archive, storage_layout
+from services.report_index import get_index_reconciler
 
 # ============================================================================
 # SEGURANÇA: Validação de API Key no Startup
@@ -192,66 +196,89 @@ st.markdown("""
 @st.cache_resource
 def get_stats_service():
     """Get cached stats service instance"""
-    return StatsService(config.REPORT_DIR)
+    return StatsService(config.REPORT_DIR, index=get_report_service().index)
+
+@st.cache_resource
+def get_progress_store():
+    """Get cached progress event store"""
+    return ProgressStore()
 
 @st.cache_resource
 def get_report_service():
-    """Get cached report service instance"""
-    return ReportService(config.REPORT_DIR)
+    """Get cached report service instance (index reconciled now and periodically in the background)"""
+    service = ReportService(config.REPORT_DIR, transcription_dir=config.TRANSCRIPTION_DIR)
+    get_index_reconciler(service.index, config.REPORT_DIR, config.TRANSCRIPTION_DIR)
+    return service
 
 # Funções auxiliares
-@st.cache_data(ttl=60)  # Cache for 60 seconds
 def get_stats():
-    """Obtém estatísticas do sistema (cached)"""
+    """Obtém estatísticas do sistema (agregados diários: sempre atuais, sem reler os relatórios)"""
     stats_service = get_stats_service()
     return stats_service.get_stats()
 
-@st.cache_data(ttl=30, show_spinner=False)  # Cache for 30 seconds
-def get_recent_reports(limit=10):
-    """Obtém relatórios recentes"""
-    if not config.REPORT_DIR.exists():
-        return []
-
-    reports = list(config.REPORT_DIR.glob("*.md"))
-    reports.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-
-    result = []
-    for report in reports[:limit]:
-        # Parse do nome do arquivo: YYYYMMDD_HHMMSS_Nome_source.md
-        parts = report.stem.split('_', 3)
-        if len(parts) >= 3:
-            date_str = parts[0]
-            time_str = parts[1]
-            paciente = parts[2] if len(parts) > 2 else "Desconhecido"
-
-            # Formatar data
-            try:
-                dt = datetime.strptime(f"{date_str}{time_str}", "%Y%m%d%H%M%S")
-                data_formatada = dt.strftime("%d/%m/%Y %H:%M")
-            except:
-                data_formatada = "Data inválida"
-
-            # Ler primeira linha do relatório para pegar o motivo
-            try:
-                with open(report, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Procurar por motivo
-                    if "Motivo do retorno:" in content:
-                        motivo = "Retorno"
-                    else:
-                        motivo = "Consulta"
-            except:
-                motivo = "N/A"
-
-            result.append({
-                'data': data_formatada,
-                'paciente': paciente,
-                'motivo': motivo,
-                'arquivo': report.name,
-                'caminho': report
-            })
-
-    return result
+def get_recent_reports(limit=10, offset=0):
+    """Obtém relatórios recentes (consulta ao índice de metadados, sem ler os arquivos)"""
+    return get_report_service().get_recent_reports(limit=limit, offset=offset)
+
+
+def _clear_active_job():
+    st.session_state.pop('active_job', None)
+    if 'job' in st.query_params:
+        del st.query_params['job']
+
+
+@st.fragment(run_every=2)
+def show_job_status(job_id):
+    """Mostra o progresso de um job em segundo plano (atualiza a cada 2s sem recarregar a página)"""
+    job = get_job_queue(run_consultation_job).store.get(job_id)
+    if job is None:
+        _clear_active_job()
+        return
+
+    if job['status'] in ACTIVE_STATUSES:
+        # Andamento real: eventos por etapa + latência histórica (tempo restante)
+        snapshot = get_progress_store().snapshot(job_id) if job['status'] == 'running' else None
+        if snapshot and snapshot['status'] == 'running':
+            text = f"⏳ {snapshot['stage_label'] or 'Processando'}... restam ~{snapshot['eta_seconds']:.0f}s"
+            st.progress(min(max(snapshot['fraction'], 0.0), 1.0), text=text)
+            details = []
+            if snapshot['audio_seconds_total']:
+                details.append(
+                    f"🎤 {snapshot['audio_seconds_done'] or 0:.0f}s de {snapshot['audio_seconds_total']:.0f}s de áudio transcritos"
+                )
+            if snapshot['tokens']:
+                details.append(f"🤖 {snapshot['tokens']} tokens gerados")
+            if details:
+                st.caption(" · ".join(details))
+            if snapshot['partial_text']:
+                # Relatório aparecendo enquanto o modelo escreve (o arquivo só é salvo no final)
+                caption = "📝 Prévia do relatório em geração"
+                if snapshot['ttft_seconds'] is not None:
+                    caption += f" (primeiro trecho em {snapshot['ttft_seconds']:.1f}s)"
+                st.caption(caption)
+                with st.container(border=True):
+                    st.markdown(snapshot['partial_text'])
+        else:
+            waiting = "Na fila..." if job['status'] == 'queued' else (job['message'] or "Processando...")
+            st.progress(min(max(job['progress'], 0.0), 1.0), text=f"⏳ {waiting}")
+        if job['kind'] == 'audio':
+            st.caption("🎤 Transcrição de áudio: pode levar alguns minutos. "
+                       "Você pode fechar ou recarregar a página; o processamento continua no servidor.")
+    elif job['status'] == 'done':
+        st.session_state['last_report'] = Path(job['report_path'])
+        st.session_state['last_patient_info'] = job['payload']['patient_info']
+        st.session_state['last_job'] = {'kind': job['kind'], 'payload': job['payload']}
+        st.session_state['show_result'] = True
+        for key in ('tutor_summary', 'tutor_summary_path'):
+            st.session_state.pop(key, None)
+        _clear_active_job()
+        logging.info(f"Relatório gerado com sucesso: {Path(job['report_path']).name}")
+        st.rerun()
+    else:
+        st.error(f"❌ Erro ao processar a consulta: {job['error']}")
+        if st.button("Fechar", key=f"dismiss_{job_id}"):
+            _clear_active_job()
+            st.rerun()
 
 
 # ==================== AUTHENTICATION ====================
@@ -352,9 +379,9 @@ if menu == "📊 Dashboard":
         st.subheader(f"📄 Visualizando: {report_path.name}")
 
         try:
-            with open(report_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                st.markdown(content)
+            # Relatórios antigos podem estar arquivados (comprimidos)
+            content = archive.read_text(report_path)
+            st.markdown(content)
         except Exception as e:
             st.error(f"Erro ao ler relatório: {e}")
 
@@ -440,13 +467,16 @@ if menu == "📊 Dashboard":
         st.markdown("---")
         st.subheader("📈 Estatísticas")
 
+        stats_service = get_stats_service()
+
         col1, col2 = st.columns(2)
 
         with col1:
-            # Gráfico de pizza - tipo de atendimento (mock data por enquanto)
+            # Gráfico de pizza - tipo de atendimento (agregados diários)
+            attendance = stats_service.get_breakdown('attendance')
             fig_pie = go.Figure(data=[go.Pie(
-                labels=['Presencial', 'Videoconferência', 'Retorno'],
-                values=[60, 25, 15],
+                labels=[value.capitalize() if value else "Não informado" for value in attendance],
+                values=[row['reports'] for row in attendance.values()],
                 hole=.3
             )])
             fig_pie.update_layout(
@@ -456,22 +486,97 @@ if menu == "📊 Dashboard":
             st.plotly_chart(fig_pie, width='stretch')
 
         with col2:
-            # Gráfico de barras - consultas por dia (mock data)
-            dias = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
-            valores = [5, 8, 6, 12, 9, 3, 2]
+            # Gráfico de barras - consultas por dia (últimos 30 dias)
+            daily = stats_service.get_daily_counts(30)
 
             fig_bar = go.Figure(data=[go.Bar(
-                x=dias,
-                y=valores,
+                x=[day.strftime("%d/%m") for day, _ in daily],
+                y=[count for _, count in daily],
                 marker_color='#1f77b4'
             )])
             fig_bar.update_layout(
-                title="Consultas por Dia da Semana",
+                title="Consultas por Dia (últimos 30 dias)",
                 height=300,
                 yaxis_title="Quantidade"
             )
             st.plotly_chart(fig_bar, width='stretch')
 
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Consultas por espécie
+            species = stats_service.get_breakdown('species')
+            fig_species = go.Figure(data=[go.Bar(
+                x=[value.capitalize() if value else "Não informada" for value in species],
+                y=[row['reports'] for row in species.values()],
+                marker_color='#2ca02c'
+            )])
+            fig_species.update_layout(
+                title="Consultas por Espécie",
+                height=300,
+                yaxis_title="Quantidade"
+            )
+            st.plotly_chart(fig_species, width='stretch')
+
+        with col2:
+            # Custo real (tokens) por provedor de LLM
+            providers = stats_service.get_breakdown('provider')
+            fig_cost = go.Figure(data=[go.Bar(
+                x=[value or "Sem registro" for value in providers],
+                y=[row['cost_usd'] for row in providers.values()],
+                text=[f"{row['reports']} consulta(s)" for row in providers.values()],
+                marker_color='#ff7f0e'
+            )])
+            fig_cost.update_layout(
+                title="Custo por Provedor (USD)",
+                height=300,
+                yaxis_title="USD"
+            )
+            st.plotly_chart(fig_cost, width='stretch')
+
+        # Latência por etapa (percentis dos histogramas diários)
+        latency = stats_service.get_latency_percentiles()
+        if latency:
+            stage_labels = {'transcription': "Transcrição", 'report': "Geração do relatório"}
+            cols = st.columns(len(latency))
+            for col, (stage, values) in zip(cols, sorted(latency.items())):
+                col.metric(
+                    f"⏱️ {stage_labels.get(stage, stage)} (mediana)",
+                    f"{values['p50']:.0f}s",
+                    help=f"p90: {values['p90']:.0f}s | p99: {values['p99']:.0f}s | {values['count']} consulta(s)"
+                )
+
+    # Uso real dos provedores (registro por chamada: inclui resumos e consultas que falharam)
+    start_date = datetime.now() - timedelta(days=29)
+    usage = get_stats_service().get_usage_summary(start_date=start_date)
+    if usage:
+        st.markdown("---")
+        st.subheader("💵 Uso dos Provedores (últimos 30 dias)")
+        kind_labels = {
+            'transcription': "Transcrição", 'report': "Relatório", 'report_extract': "Relatório longo (extração)",
+            'report_synthesis': "Relatório longo (síntese)", 'tutor_summary': "Resumo do tutor"
+        }
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Chamadas", sum(row['calls'] for row in usage))
+        col2.metric("Custo", f"US$ {sum(row['cost_usd'] for row in usage):.2f}")
+        col3.metric("Áudio transcrito", f"{sum(row['audio_seconds'] for row in usage) / 60:.0f} min")
+        st.dataframe(pd.DataFrame([{
+            'Provedor': row['provider'] or "-",
+            'Modelo': row['model'] or "-",
+            'Chamada': kind_labels.get(row['kind'], row['kind']),
+            'Chamadas': row['calls'],
+            'Tokens (entrada)': row['input_tokens'],
+            'Tokens (saída)': row['output_tokens'],
+            'Custo (US$)': round(row['cost_usd'], 4),
+            'Latência p50 (s)': round(row['latency_p50'], 1) if row['latency_p50'] is not None else None,
+            'Latência p90 (s)': round(row['latency_p90'], 1) if row['latency_p90'] is not None else None,
+            'Primeiro trecho p50 (s)': round(row['ttft_p50'], 1) if row['ttft_p50'] is not None else None,
+            'Acerto de cache': f"{row['cache_hit_rate']:.0%}",
+            'Tokens do cache': row['cached_input_tokens'],
+        } for row in usage]), hide_index=True, width='stretch')
+        if any(row['unpriced_calls'] for row in usage):
+            st.caption("⚠️ Há chamadas de modelos sem preço configurado (config.LLM_PRICES / prices.json).")
+
 elif menu == "➕ Nova Consulta":
     st.markdown('<p class="main-header">➕ Nova Consulta Veterinária</p>', unsafe_allow_html=True)
 
@@ -481,7 +586,7 @@ elif menu == "➕ Nova Consulta":
         if st.button("🗑️ Limpar Tudo", use_container_width=True, type="secondary"):
             # Limpar session state
             keys_to_clear = ['audio_path', 'transcription', 'processing_mode', 'show_result', 'last_report',
-                           'tutor_summary', 'tutor_summary_path', 'last_patient_info']
+                           'tutor_summary', 'tutor_summary_path', 'last_patient_info', 'last_job']
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -723,101 +828,68 @@ elif menu == "➕ Nova Consulta":
 
 
                 if patient_info:
-                    # Criar placeholders para progresso
-                    progress_container = st.container()
-                    
-                    with progress_container:
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        try:
-                            # Verificar API key antes de processar
-                            if not config.ANTHROPIC_API_KEY:
-                                st.error("❌ Erro: ANTHROPIC_API_KEY não configurada no arquivo .env")
-                                logging.error("ANTHROPIC_API_KEY não encontrada")
-                                patient_info = None
-                            else:
-                                # Etapa 1: Inicialização
-                                progress_bar.progress(0.1)
-                                status_text.info("⚙️ Inicializando sistema...")
-                                
-                                # Inicializar sistema
-                                if st.session_state.get('processing_mode') == 'audio':
-                                    # Modo áudio - processo mais longo
-                                    progress_bar.progress(0.2)
-                                    status_text.info("📤 Preparando upload do áudio...")
-                                    
-                                    system = VeterinaryTranscription(load_whisper=True)
-                                    
-                                    # Etapa 2: Transcrição (processo demorado)
-                                    progress_bar.progress(0.3)
-                                    status_text.warning("🎤 Transcrevendo áudio... ⏱️ **Tempo estimado: 5-10 minutos**\n\n*Por favor, aguarde. O processamento está em andamento.*")
-                                    
-                                    report_path = system.process_consultation(
-                                        st.session_state['audio_path'],
-                                        patient_info
-                                    )
-                                    
-                                    # Etapa 3: Geração de relatório
-                                    progress_bar.progress(0.8)
-                                    status_text.info("📝 Gerando relatório médico...")
-                                    
-                                else:  # text mode
-                                    # Modo texto - processo rápido
-                                    progress_bar.progress(0.3)
-                                    status_text.info("📝 Processando transcrição...")
-                                    
-                                    system = VeterinaryTranscription(load_whisper=False)
-                                    
-                                    # Etapa 2: Geração de relatório
-                                    progress_bar.progress(0.5)
-                                    status_text.info("🤖 Gerando relatório médico... ⏱️ **Tempo estimado: 30 segundos**")
-                                    
-                                    report_path = system.process_from_text(
-                                        st.session_state['transcription'],
-                                        patient_info,
-                                        source_name=f"{paciente_nome}_{motivo_retorno[:20]}"
-                                    )
-                                
-                                # Etapa final: Conclusão
-                                progress_bar.progress(1.0)
-                                status_text.success("✅ Processamento concluído com sucesso!")
-                                
-                                st.session_state['last_report'] = report_path
-                                st.session_state['last_patient_info'] = patient_info  # Salvar para usar no resumo
-                                st.session_state['show_result'] = True
-                                logging.info(f"Relatório gerado com sucesso: {report_path.name}")
-
-                                # Limpar dados temporários
-                                if 'audio_path' in st.session_state:
-                                    del st.session_state['audio_path']
-                                if 'transcription' in st.session_state:
-                                    del st.session_state['transcription']
-
-                                # Pequeno delay para mostrar sucesso antes de recarregar
-                                import time
-                                time.sleep(1.5)
-                                
-                                st.rerun()
-
-                        except FileNotFoundError as e:
-                            progress_bar.empty()
-                            status_text.empty()
-                            error_msg = f"Arquivo não encontrado: {str(e)}"
-                            logging.error(f"File not found: {e}")
-                            st.error(f"❌ {error_msg}")
-                        except ValueError as e:
-                            progress_bar.empty()
-                            status_text.empty()
-                            error_msg = f"Erro de validação: {str(e)}"
-                            logging.error(f"Validation error: {e}")
-                            st.error(f"❌ {error_msg}")
-                        except Exception as e:
-                            progress_bar.empty()
-                            status_text.empty()
-                            error_msg = f"Erro inesperado ao processar: {str(e)}"
-                            logging.error(f"Unexpected error processing consultation: {e}", exc_info=True)
-                            st.error(f"❌ {error_msg}")
+                    # Verificar API key antes de processar
+                    if not config.ANTHROPIC_API_KEY:
+                        st.error("❌ Erro: ANTHROPIC_API_KEY não configurada no arquivo .env")
+                        logging.error("ANTHROPIC_API_KEY não encontrada")
+                    elif st.session_state.get('processing_mode') == 'audio' and 'audio_path' not in st.session_state:
+                        st.error("❌ Envie um arquivo de áudio antes de gerar o relatório")
+                    else:
+                        # Processamento em segundo plano: o envio retorna na hora com o id do job
+                        if st.session_state.get('processing_mode') == 'audio':
+                            job_id = get_job_queue(run_consultation_job).submit('audio', {
+                                'audio_path': str(st.session_state['audio_path']),
+                                'patient_info': patient_info
+                            }, owner=current_user['username'])
+                        else:
+                            job_id = get_job_queue(run_consultation_job).submit('text', {
+                                'transcription': st.session_state['transcription'],
+                                'patient_info': patient_info,
+                                'source_name': f"{paciente_nome}_{motivo_retorno[:20]}"
+                            }, owner=current_user['username'])
+                        logging.info(f"Consulta enviada para processamento: job {job_id}")
+
+                        # O id fica na URL para sobreviver a um refresh do navegador
+                        st.session_state['active_job'] = job_id
+                        st.query_params['job'] = job_id
+                        st.session_state['show_result'] = False
+
+                        # Limpar dados temporários
+                        if 'audio_path' in st.session_state:
+                            del st.session_state['audio_path']
+                        if 'transcription' in st.session_state:
+                            del st.session_state['transcription']
+
+                        st.rerun()
+
+    # Acompanhar processamento em segundo plano
+    active_job_id = st.session_state.get('active_job') or st.query_params.get('job')
+    if active_job_id and not st.session_state.get('show_result'):
+        st.markdown("---")
+        show_job_status(active_job_id)
+
+    # Outros processamentos do usuário (ex: enviados em outra aba)
+    other_jobs = [
+        job for job in get_job_queue(run_consultation_job).store.list_jobs(
+            owner=current_user['username'], statuses=ACTIVE_STATUSES
+        )
+        if job['job_id'] != active_job_id
+    ]
+    if other_jobs:
+        with st.expander(f"⏳ Outros processamentos em andamento ({len(other_jobs)})"):
+            for job in other_jobs:
+                col_info, col_btn = st.columns([4, 1])
+                with col_info:
+                    st.write(
+                        f"**{job['payload']['patient_info'].get('paciente_nome', '?')}** — "
+                        f"{job['message'] or job['status']} ({job['progress']:.0%})"
+                    )
+                with col_btn:
+                    if st.button("Acompanhar", key=f"follow_{job['job_id']}"):
+                        st.session_state['active_job'] = job['job_id']
+                        st.query_params['job'] = job['job_id']
+                        st.session_state['show_result'] = False
+                        st.rerun()
 
     # Mostrar resultado
     if st.session_state.get('show_result') and st.session_state.get('last_report'):
@@ -878,6 +950,19 @@ elif menu == "➕ Nova Consulta":
                 use_container_width=True
             )
 
+        # Gerar novamente a mesma consulta: chama o LLM de novo em vez de usar a resposta em cache
+        last_job = st.session_state.get('last_job')
+        if last_job and st.button("🔄 Gerar Novamente", use_container_width=True,
+                                  help="Gera um novo relatório para esta consulta, sem reaproveitar a resposta anterior"):
+            job_id = get_job_queue(run_consultation_job).submit(
+                last_job['kind'], {**last_job['payload'], 'regenerate': True}, owner=current_user['username']
+            )
+            logging.info(f"Relatório enviado para nova geração: job {job_id}")
+            st.session_state['active_job'] = job_id
+            st.query_params['job'] = job_id
+            st.session_state['show_result'] = False
+            st.rerun()
+
         # Botão para gerar resumo para o tutor
         st.markdown("---")
         st.subheader("💬 Resumo para o Tutor")
@@ -886,6 +971,13 @@ elif menu == "➕ Nova Consulta":
             st.info("📱 **Novo:** Gere uma versão simplificada deste relatório para enviar ao tutor!")
 
             if st.button("✨ Gerar Resumo para o Tutor", type="primary", use_container_width=True):
+                # Modo concorrente (config.TUTOR_SUMMARY_MODE): o resumo foi gerado junto com o relatório
+                ready_summary = storage_layout.locate(report_path.with_name(tutor_summary_filename(report_path)))
+                if ready_summary:
+                    st.session_state['tutor_summary'] = archive.read_text(ready_summary)
+                    st.session_state['tutor_summary_path'] = archive.logical_path(ready_summary)
+                    st.rerun()
+
                 with st.spinner("🔄 Gerando resumo simplificado para o tutor..."):
                     try:
                         # Ler relatório completo
@@ -898,17 +990,17 @@ elif menu == "➕ Nova Consulta":
                         # Recuperar patient_info do session_state
                         patient_info = st.session_state.get('last_patient_info', {})
 
-                        # Gerar resumo
-                        summary = system.generate_tutor_summary(full_report, patient_info)
+                        # Gerar resumo (exibido à medida que o modelo responde)
+                        summary = st.write_stream(
+                            system.stream_tutor_summary(full_report, patient_info, report_path=report_path)
+                        )
 
                         # Salvar no session_state
                         st.session_state['tutor_summary'] = summary
 
                         # Salvar arquivo
-                        summary_filename = report_path.stem + '_resumo_tutor.md'
-                        summary_path = config.REPORT_DIR / summary_filename
-                        with open(summary_path, 'w', encoding='utf-8') as f:
-                            f.write(summary)
+                        summary_filename = tutor_summary_filename(report_path)
+                        summary_path = get_report_service().save_report(summary_filename, summary)
 
                         st.session_state['tutor_summary_path'] = summary_path
                         logging.info(f"Resumo para tutor gerado: {summary_filename}")
@@ -993,8 +1085,7 @@ elif menu == "📋 Histórico":
         st.info(f"✏️ Editando relatório: **{editing_report['paciente']}**")
 
         # Ler conteúdo do relatório
-        with open(editing_report['caminho'], 'r', encoding='utf-8') as f:
-            current_content = f.read()
+        current_content = archive.read_text(editing_report['caminho'])
 
         # Editor de texto
         edited_content = st.text_area(
@@ -1016,8 +1107,8 @@ elif menu == "📋 Histórico":
             if st.button("💾 Salvar Alterações", type="primary", use_container_width=True):
                 # Salvar alterações
                 try:
-                    with open(editing_report['caminho'], 'w', encoding='utf-8') as f:
-                        f.write(edited_content)
+                    if not get_report_service().update_report(Path(editing_report['caminho']), edited_content):
+                        raise IOError(f"não foi possível gravar {editing_report['arquivo']}")
                     st.success(f"✅ Relatório atualizado com sucesso!")
                     logging.info(f"Relatório editado: {editing_report['arquivo']}")
                     del st.session_state['edit_mode']
@@ -1034,35 +1125,49 @@ elif menu == "📋 Histórico":
     else:
         # Modo de visualização normal
         # Filtros
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            search_term = st.text_input(
+                "🔍 Buscar",
+                placeholder="Paciente, medicamento, diagnóstico, sintoma...",
+                help="Busca no texto dos relatórios e das transcrições (todas as palavras, sem diferenciar acentos)"
+            )
+
+        with col2:
+            sort_options = ["Mais recentes", "Mais antigos", "Nome (A-Z)"]
+            if search_term:
+                sort_options = ["Relevância"] + sort_options
+            sort_by = st.selectbox("🔄 Ordenar por", sort_options)
+
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            search_term = st.text_input("🔍 Buscar", placeholder="Nome do paciente...")
+            filter_dates = st.date_input("📅 Período", value=(), help="Selecione a data inicial e a final")
 
         with col2:
-            filter_date = st.date_input("📅 Filtrar por data", value=None)
+            filter_species = st.selectbox("🐾 Espécie", ["Todas"] + get_report_service().get_species())
 
         with col3:
-            sort_by = st.selectbox("🔄 Ordenar por", ["Mais recentes", "Mais antigos", "Nome (A-Z)"])
+            filter_tutor = st.text_input("👤 Tutor", placeholder="Nome do tutor...")
 
         st.markdown("---")
 
-        # Obter relatórios
-        recent = get_recent_reports(100)  # Todos
-
-        # Aplicar filtros
+        # Obter relatórios (busca, filtros e ordenação resolvidos pelo índice)
+        start_date = filter_dates[0] if len(filter_dates) > 0 else None
+        end_date = filter_dates[1] if len(filter_dates) > 1 else start_date
+        filters = {
+            'start': start_date,
+            'end': end_date,
+            'species': None if filter_species == "Todas" else filter_species,
+            'tutor': filter_tutor or None,
+        }
+        order = {"Relevância": 'relevance', "Mais recentes": 'recent', "Mais antigos": 'oldest',
+                 "Nome (A-Z)": 'patient'}[sort_by]
         if search_term:
-            recent = [r for r in recent if search_term.lower() in r['paciente'].lower()]
-
-        if filter_date:
-            date_str = filter_date.strftime("%d/%m/%Y")
-            recent = [r for r in recent if date_str in r['data']]
-
-        # Aplicar ordenação
-        if sort_by == "Mais antigos":
-            recent = list(reversed(recent))
-        elif sort_by == "Nome (A-Z)":
-            recent = sorted(recent, key=lambda x: x['paciente'])
+            recent = get_report_service().full_text_search(search_term, order=order, limit=100, **filters)
+        else:
+            recent = get_report_service().search_reports(order=order, limit=100, **filters)
 
         # Exibir resultados
         st.write(f"**Total: {len(recent)} consulta(s)**")
@@ -1075,14 +1180,19 @@ elif menu == "📋 Histórico":
                     with col1:
                         st.write(f"**Data:** {report['data']}")
                         st.write(f"**Paciente:** {report['paciente']}")
+                        if report.get('especie'):
+                            st.write(f"**Espécie:** {report['especie']}")
+                        if report.get('tutor'):
+                            st.write(f"**Tutor:** {report['tutor']}")
                         st.write(f"**Motivo:** {report['motivo']}")
                         st.write(f"**Arquivo:** {report['arquivo']}")
+                        if report.get('trecho'):
+                            st.caption(f"…{report['trecho']}…")
 
                     with col2:
                         # Botão de visualizar
                         if st.button("👁️ Visualizar", key=f"view_hist_{idx}", use_container_width=True):
-                            with open(report['caminho'], 'r', encoding='utf-8') as f:
-                                st.markdown(f.read())
+                            st.markdown(archive.read_text(report['caminho']))
 
                         # Botão de editar
                         if st.button("✏️ Editar", key=f"edit_hist_{idx}", use_container_width=True):
@@ -1101,8 +1211,7 @@ elif menu == "📋 Histórico":
                         st.write("**⬇️ Baixar:**")
                         col_md_h, col_txt_h, col_pdf_h = st.columns(3)
 
-                        with open(report['caminho'], 'r', encoding='utf-8') as f:
-                            md_content_h = f.read()
+                        md_content_h = archive.read_text(report['caminho'])
 
                         with col_md_h:
                             st.download_button(
@@ -1143,7 +1252,12 @@ elif menu == "📋 Histórico":
     with col1:
         if st.button("🗑️ Limpar Cache"):
             st.cache_data.clear()
-            st.success("Cache limpo!")
+            # Reler relatórios alterados fora do app sem esperar a próxima reconciliação
+            changes = get_report_service().reconcile()
+            st.success(
+                f"Cache limpo! Índice de relatórios: {changes['added']} novo(s), "
+                f"{changes['updated']} alterado(s), {changes['removed']} removido(s)"
+            )
 
     with col2:
         if st.button("📁 Abrir Pasta de Relatórios"):
@@ -1192,7 +1306,19 @@ elif menu == "⚙️ Configurações":
         st.metric("API Claude", "Configurada ✅" if config.ANTHROPIC_API_KEY else "Não configurada ❌")
         st.metric("API Google", "Configurada ✅" if config.GOOGLE_API_KEY else "Não configurada ❌")
         st.metric("Database", "Supabase ✅" if config.DATABASE_PROVIDER == "supabase" else "SQLite")
-    
+
+    # Modelos Whisper mantidos em memória pelo processo
+    from services.model_registry import get_model_registry
+    registry_stats = get_model_registry().stats()
+    with st.expander("🧠 Modelos Whisper em memória", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Carregamentos", registry_stats['loads'])
+        col2.metric("Hits", registry_stats['hits'])
+        col3.metric("Misses", registry_stats['misses'])
+        col4.metric("Memória", f"{registry_stats['memory_mb']:.0f} / {registry_stats['memory_budget_mb']} MB")
+        if registry_stats['models']:
+            st.json(registry_stats['models'])
+
     st.markdown("---")
     
     st.subheader("ℹ️ Sobre")
@@ -2,6 +2,7 @@
 Configurações do Sistema de Transcrição Veterinária
 """
 import os
+import json
 import logging
 from pathlib import Path
 
@@ -11,16 +12,48 @@ AUDIO_DIR = BASE_DIR / "audios"
 TRANSCRIPTION_DIR = BASE_DIR / "transcricoes"
 REPORT_DIR = BASE_DIR / "relatorios"
 TEMPLATE_DIR = BASE_DIR / "templates"
+DATA_DIR = BASE_DIR / "data"  # Bancos SQLite e manifestos internos
 
 # Criar diretórios se não existirem
-for directory in [AUDIO_DIR, TRANSCRIPTION_DIR, REPORT_DIR, TEMPLATE_DIR]:
+for directory in [AUDIO_DIR, TRANSCRIPTION_DIR, REPORT_DIR, TEMPLATE_DIR, DATA_DIR]:
     directory.mkdir(exist_ok=True)
 
+# Organização dos relatórios e transcrições: "flat" (todos na pasta) ou "sharded"
+# (subpastas AAAA/MM/DD, para pastas muito grandes ou em rede). Arquivos já existentes
+# continuam sendo encontrados nos dois formatos; para movê-los use o subcomando migrate-layout.
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "flat")
+
+# Arquivamento: relatórios e transcrições sem modificação há ARCHIVE_AFTER_DAYS dias são
+# comprimidos (um arquivo .zst/.gz por documento) e continuam legíveis pelo app
+# "zstd" (pacote opcional zstandard; sem ele usa "gzip") ou "gzip"
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zstd")
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_LEVEL = int(os.getenv("ARCHIVE_LEVEL", "9"))  # zstd 1-22, gzip 1-9
+# Dicionário zstd compartilhado (treinado nos próprios documentos: o texto do template se repete)
+ARCHIVE_USE_DICTIONARY = os.getenv("ARCHIVE_USE_DICTIONARY", "true").lower() in ("1", "true", "yes")
+ARCHIVE_DICT_SIZE = int(os.getenv("ARCHIVE_DICT_SIZE", str(112 * 1024)))
+ARCHIVE_DICT_DIR = DATA_DIR / "archive_dicts"
+
 # Modelo Whisper (opções: tiny, base, small, medium, large)
 # base = rápido e preciso para produção (5-10x mais rápido que medium)
 # medium = mais preciso mas MUITO mais lento em CPU (use apenas com GPU)
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # Permite override via env var
 
+# Dispositivo do Whisper ("cpu", "cuda"). Vazio = escolha automática do Whisper
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "") or None
+
+# Orçamento de memória (MB) para modelos Whisper mantidos carregados no processo.
+# Modelos ociosos são descarregados (LRU) quando o orçamento é excedido.
+WHISPER_MODEL_MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MODEL_MEMORY_BUDGET_MB", "4096"))
+
+# Transcrição Whisper em blocos paralelos (consultas longas)
+# O áudio é dividido em janelas com sobreposição, cortadas em trechos de silêncio,
+# e cada janela é transcrita em um processo separado.
+WHISPER_CHUNKED = os.getenv("WHISPER_CHUNKED", "false").lower() in ("1", "true", "yes")
+WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "300"))
+WHISPER_CHUNK_OVERLAP_SECONDS = float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "2"))
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
 # API Keys (será carregada do arquivo .env)
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
@@ -32,18 +65,134 @@ TRANSCRIPTION_PROVIDER = os.getenv("TRANSCRIPTION_PROVIDER", "google_gemini")
 # Opções: "anthropic_claude", "google_gemini"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google_gemini")
 
+# Resumo para o tutor
+# "on_demand": gerado a partir do relatório quando solicitado na interface
+# "concurrent": gerado a partir da transcrição ao mesmo tempo que o relatório e salvo junto
+# (o botão "Resumo para o Tutor" abre o resumo pronto)
+TUTOR_SUMMARY_MODE = os.getenv("TUTOR_SUMMARY_MODE", "on_demand")
+
 # Modelos Gemini
 GEMINI_MODEL_FLASH = "gemini-2.5-flash" 
 GEMINI_MODEL_PRO = "gemini-2.5-pro"
 
+# Modelo Claude
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+
+# Preços dos LLMs (USD por milhão de tokens: entrada, saída) para estimativa de custos
+LLM_PRICES = {
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    GEMINI_MODEL_PRO: (1.25, 10.00),
+    GEMINI_MODEL_FLASH: (0.30, 2.50),
+}
+
+# Cache de prompt: fração do preço de entrada cobrada por token (lido do cache, gravado no cache)
+# Claude: leitura 10%, gravação 125%; Gemini 2.5 (cache implícito): leitura 25%, sem custo de gravação
+PROMPT_CACHE_PRICE_FACTORS = {
+    "anthropic_claude": (0.10, 1.25),
+    "google_gemini": (0.25, 1.00),
+}
+
+# Preços da transcrição (USD por milhão de tokens: entrada, saída); áudio no Gemini tem preço próprio
+# e o Whisper local não tem custo de API
+TRANSCRIPTION_PRICES = {
+    GEMINI_MODEL_FLASH: (1.00, 2.50),
+    f"whisper-{WHISPER_MODEL}": (0.00, 0.00),
+}
+
+# Arquivo JSON opcional que sobrescreve os preços sem alterar o código, ex:
+# {"llm": {"gemini-2.5-pro": [1.25, 10.0]}, "transcription": {"gemini-2.5-flash": [1.0, 2.5]}}
+PRICES_FILE = Path(os.getenv("PRICES_FILE", str(DATA_DIR / "prices.json")))
+if PRICES_FILE.exists():
+    try:
+        _prices = json.loads(PRICES_FILE.read_text(encoding='utf-8'))
+        LLM_PRICES.update({model: tuple(p) for model, p in _prices.get('llm', {}).items()})
+        TRANSCRIPTION_PRICES.update({model: tuple(p) for model, p in _prices.get('transcription', {}).items()})
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.warning(f"Arquivo de preços inválido ({PRICES_FILE}): {e}")
+
+# Registro de uso por chamada aos provedores (tokens, áudio, latência e custo)
+USAGE_LEDGER_DB = DATA_DIR / "usage_ledger.db"
+
 # Configurações de processamento
 AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
 DEFAULT_LANGUAGE = "pt"
 
+# Cache de transcrições (endereçado pelo SHA-256 do áudio + configurações do modelo)
+# Fica em TRANSCRIPTION_DIR/.cache e é limitado por tamanho (LRU)
+TRANSCRIPTION_CACHE_ENABLED = os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRANSCRIPTION_CACHE_MAX_MB = float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "500"))
+
+# Cache de respostas do LLM (chave: provedor, modelo, temperatura, max_tokens e prompt completo)
+# Gerar de novo o mesmo relatório (rerun, nova tentativa, lote repetido) não chama o provedor;
+# a ação "Gerar novamente" na interface ignora o cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_DIR = DATA_DIR / "llm_cache"
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", str(7 * 24)))
+
+# Cache de áudio decodificado (PCM mono 16 kHz, .npy mapeável em memória)
+# Cada gravação é decodificada uma única vez pelo ffmpeg; VAD, divisão em blocos,
+# Whisper e a recodificação para o Gemini leem deste cache.
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "2048"))
+
+# Remoção de silêncio antes da transcrição (detecção de voz por energia)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))  # Nível (dBFS) abaixo do qual é silêncio
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "2.0"))  # Pausas menores são mantidas
+VAD_PADDING_SECONDS = float(os.getenv("VAD_PADDING_SECONDS", "0.3"))  # Margem mantida em volta da fala
+VAD_MIN_REMOVED_SECONDS = float(os.getenv("VAD_MIN_REMOVED_SECONDS", "5.0"))  # Economia mínima para usar o áudio cortado
+
+# Recodificação do áudio antes do upload para o Gemini
+# "opus" (OGG/Opus de baixa taxa, ajustado para voz), "flac" (16 kHz mono, sem perdas)
+# ou "original" (envia o arquivo sem recodificar)
+GEMINI_UPLOAD_FORMAT = os.getenv("GEMINI_UPLOAD_FORMAT", "opus")
+GEMINI_UPLOAD_OPUS_BITRATE = os.getenv("GEMINI_UPLOAD_OPUS_BITRATE", "24k")
+# Arquivos menores que isso são enviados como estão
+GEMINI_TRANSCODE_MIN_BYTES = int(os.getenv("GEMINI_TRANSCODE_MIN_BYTES", str(512 * 1024)))
+
+# Reaproveitamento e limpeza de uploads no Gemini
+# Manifesto local (hash do áudio -> arquivo remoto e validade); uploads ainda válidos
+# são reaproveitados e um coletor em segundo plano apaga os que não são mais necessários.
+GEMINI_UPLOAD_MANIFEST_DB = DATA_DIR / "gemini_uploads.db"
+GEMINI_UPLOAD_TTL_HOURS = float(os.getenv("GEMINI_UPLOAD_TTL_HOURS", "47"))  # Gemini expira em 48h
+GEMINI_REAPER_INTERVAL_SECONDS = float(os.getenv("GEMINI_REAPER_INTERVAL_SECONDS", "300"))
+
+# Pipeline de processamento em lote (etapas concorrentes com filas limitadas)
+# decodificação -> transcrição -> geração de relatório (LLM) -> gravação
+PIPELINE_DECODE_WORKERS = int(os.getenv("PIPELINE_DECODE_WORKERS", "2"))
+PIPELINE_TRANSCRIBE_WORKERS = int(os.getenv("PIPELINE_TRANSCRIBE_WORKERS", str(WHISPER_WORKERS)))
+PIPELINE_REPORT_WORKERS = int(os.getenv("PIPELINE_REPORT_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))  # Itens aguardando entre etapas
+JOB_JOURNAL_DB = DATA_DIR / "batch_jobs.db"  # Etapa alcançada por arquivo (retomada de lotes)
+
+# Fila de processamento em segundo plano da interface web
+JOB_STORE_DB = DATA_DIR / "app_jobs.db"
+# Eventos de progresso de jobs sem atividade há mais dias que isso são apagados (0 = manter tudo)
+JOB_EVENTS_RETENTION_DAYS = float(os.getenv("JOB_EVENTS_RETENTION_DAYS", "90"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Consultas processadas em paralelo pelo servidor
+
+# Modo de monitoramento da pasta de áudios (python transcribe_consult.py watch)
+# Um arquivo só é processado depois de ficar WATCH_STABLE_SECONDS sem mudar de tamanho
+WATCH_STABLE_SECONDS = float(os.getenv("WATCH_STABLE_SECONDS", "5"))
+WATCH_POLL_INTERVAL_SECONDS = float(os.getenv("WATCH_POLL_INTERVAL_SECONDS", "2"))
+
+# Índice de metadados dos relatórios (listagem, paginação e contagens sem ler os arquivos)
+REPORT_INDEX_DB = DATA_DIR / "report_index.db"
+# Intervalo da reconciliação em segundo plano com a pasta (arquivos copiados/editados por fora)
+REPORT_INDEX_RECONCILE_SECONDS = float(os.getenv("REPORT_INDEX_RECONCILE_SECONDS", "60"))
+
 # Template do prompt
 # Template do prompt
 PROMPT_TEMPLATE_FILE = TEMPLATE_DIR / "prompt_veterinario.txt"
 
+# Transcrições longas (cirurgias, consultas em grupo): acima do limite, o relatório é gerado
+# em duas fases — fatos clínicos extraídos de cada trecho em chamadas paralelas, depois uma
+# síntese que preenche o template do relatório. Tokens estimados (~4 caracteres); 0 desativa
+LONG_TRANSCRIPT_TOKEN_THRESHOLD = int(os.getenv("LONG_TRANSCRIPT_TOKEN_THRESHOLD", "30000"))
+LONG_TRANSCRIPT_SEGMENT_TOKENS = int(os.getenv("LONG_TRANSCRIPT_SEGMENT_TOKENS", "8000"))
+LONG_TRANSCRIPT_WORKERS = int(os.getenv("LONG_TRANSCRIPT_WORKERS", "4"))
+FACT_EXTRACTION_TEMPLATE_FILE = TEMPLATE_DIR / "prompt_extracao_fatos.txt"
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")  # anon/public key
@@ -0,0 +1,348 @@
+"""
+Archive Module
+Compression of old reports and transcriptions (one zstd or gzip file per document, optionally with a
+shared zstd dictionary trained on the documents) and transparent reads of archived files
+"""
+from datetime import datetime, timedelta
+import gzip
+import logging
+import os
+import random
+import time
+from pathlib import Path
+
+import config
+from services import storage_layout
+
+try:
+    import zstandard
+except ImportError:  # Optional: without it documents are archived with gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+
+# Training samples used for a dictionary, and the minimum for one to be worth it
+DICTIONARY_SAMPLES = 2000
+DICTIONARY_MIN_SAMPLES = 20
+
+_dictionaries = {}
+
+
+def logical_path(path):
+    """
+    Path of a document without its archive suffix (x.md.zst -> x.md)
+
+    Args:
+        path (Path): Plain or archived file
+
+    Returns:
+        Path: Plain path
+    """
+    path = Path(path)
+    if path.suffix in storage_layout.ARCHIVE_SUFFIXES:
+        return path.with_suffix('')
+    return path
+
+
+def is_archived(path):
+    return Path(path).suffix in storage_layout.ARCHIVE_SUFFIXES
+
+
+def _dictionary(dict_id, dict_dir=None):
+    key = (str(dict_dir or config.ARCHIVE_DICT_DIR), dict_id)
+    if key not in _dictionaries:
+        matches = sorted(Path(key[0]).glob(f"*-{dict_id}.zdict"))
+        if not matches:
+            raise FileNotFoundError(f"zstd dictionary {dict_id} not found in {key[0]}")
+        _dictionaries[key] = zstandard.ZstdCompressionDict(matches[0].read_bytes())
+    return _dictionaries[key]
+
+
+def decompress(data, suffix, dict_dir=None):
+    """
+    Decompress one archived document
+
+    Args:
+        data (bytes): File content
+        suffix (str): '.zst' or '.gz'
+        dict_dir (Path, optional): Dictionary directory (default: config.ARCHIVE_DICT_DIR)
+
+    Returns:
+        bytes: Original content
+    """
+    if suffix == '.gz':
+        return gzip.decompress(data)
+    if zstandard is None:
+        raise RuntimeError("Arquivo .zst requer o pacote zstandard (pip install zstandard)")
+    try:
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        dictionary = _dictionary(dict_id, dict_dir) if dict_id else None
+        return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data)
+    except zstandard.ZstdError as e:
+        # Same error family as a corrupt .gz (gzip.BadGzipFile)
+        raise OSError(f"Corrupt zstd archive: {e}") from e
+
+
+def original_size(path):
+    """
+    Uncompressed size of an archived document, from its header (zstd) or trailer (gzip)
+
+    Args:
+        path (Path): Archived file
+
+    Returns:
+        int: Bytes
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        if path.suffix == '.gz':
+            # ISIZE: original size modulo 2^32 (documents are far smaller)
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), 'little')
+        header = f.read(18)
+    if zstandard is None:
+        raise RuntimeError("Arquivo .zst requer o pacote zstandard (pip install zstandard)")
+    return zstandard.get_frame_parameters(header).content_size
+
+
+def read_bytes(path, dict_dir=None):
+    """
+    Content of a document, plain or archived
+
+    Args:
+        path (Path): Plain path (x.md) or archived file (x.md.zst); a plain path that was
+            archived is found under its archive suffix
+        dict_dir (Path, optional): Dictionary directory (default: config.ARCHIVE_DICT_DIR)
+
+    Returns:
+        bytes: Original content
+    """
+    path = Path(path)
+    if not is_archived(path) and not path.exists():
+        for suffix in storage_layout.ARCHIVE_SUFFIXES:
+            if path.with_name(path.name + suffix).exists():
+                path = path.with_name(path.name + suffix)
+                break
+    data = path.read_bytes()
+    if is_archived(path):
+        return decompress(data, path.suffix, dict_dir)
+    return data
+
+
+def read_text(path, dict_dir=None):
+    """
+    Text of a document, plain or archived (UTF-8)
+
+    Args:
+        path (Path): Plain or archived file
+        dict_dir (Path, optional): Dictionary directory
+
+    Returns:
+        str: Text
+    """
+    return read_bytes(path, dict_dir).decode('utf-8')
+
+
+class Archiver:
+    """Compresses documents of a directory that were not modified for a while"""
+
+    def __init__(self, codec=None, level=None, use_dictionary=None, dict_dir=None):
+        """
+        Initialize archiver
+
+        Args:
+            codec (str, optional): 'zstd' or 'gzip' (default: config.ARCHIVE_CODEC; gzip if
+                zstandard is not installed)
+            level (int, optional): Compression level (default: config.ARCHIVE_LEVEL)
+            use_dictionary (bool, optional): Train a shared zstd dictionary (default: config.ARCHIVE_USE_DICTIONARY)
+            dict_dir (Path, optional): Dictionary directory (default: config.ARCHIVE_DICT_DIR)
+        """
+        codec = codec or config.ARCHIVE_CODEC
+        if codec == 'zstd' and zstandard is None:
+            logger.warning("zstandard not installed: archiving with gzip")
+            codec = 'gzip'
+        if codec not in CODEC_SUFFIXES:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.codec = codec
+        self.level = config.ARCHIVE_LEVEL if level is None else level
+        self.use_dictionary = (config.ARCHIVE_USE_DICTIONARY if use_dictionary is None else use_dictionary) \
+            and codec == 'zstd'
+        self.dict_dir = Path(dict_dir or config.ARCHIVE_DICT_DIR)
+
+    def candidates(self, root, suffix, older_than_days=None, now=None):
+        """
+        Plain documents not modified for the given number of days
+
+        Args:
+            root (Path): Report or transcription directory (both layouts)
+            suffix (str): '.md' or '.txt'
+            older_than_days (float, optional): Age (default: config.ARCHIVE_AFTER_DAYS)
+            now (datetime, optional): Reference time (default: now)
+
+        Returns:
+            list: Paths
+        """
+        days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = ((now or datetime.now()) - timedelta(days=days)).timestamp()
+        paths = []
+        for _, entry in storage_layout.iter_files(root, suffix):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    paths.append(Path(entry.path))
+            except OSError:
+                continue
+        return paths
+
+    def train_dictionary(self, paths, name):
+        """
+        Train a zstd dictionary on a sample of documents and save it
+
+        Args:
+            paths (list): Documents to sample from
+            name (str): Dictionary name prefix ('reports', 'transcriptions')
+
+        Returns:
+            ZstdCompressionDict or None: None if there are too few documents
+        """
+        sample = random.Random(0).sample(paths, min(len(paths), DICTIONARY_SAMPLES))
+        samples = []
+        for path in sample:
+            try:
+                samples.append(path.read_bytes())
+            except OSError:
+                continue
+        if len(samples) < DICTIONARY_MIN_SAMPLES:
+            return None
+        try:
+            dictionary = zstandard.train_dictionary(config.ARCHIVE_DICT_SIZE, samples)
+        except zstandard.ZstdError as e:
+            logger.warning(f"Could not train a zstd dictionary for {name}: {e}")
+            return None
+        self.dict_dir.mkdir(parents=True, exist_ok=True)
+        (self.dict_dir / f"{name}-{dictionary.dict_id()}.zdict").write_bytes(dictionary.as_bytes())
+        _dictionaries[(str(self.dict_dir), dictionary.dict_id())] = dictionary
+        return dictionary
+
+    def latest_dictionary(self, name):
+        """
+        Most recently trained dictionary of a kind
+
+        Args:
+            name (str): Dictionary name prefix
+
+        Returns:
+            ZstdCompressionDict or None
+        """
+        files = sorted(self.dict_dir.glob(f"{name}-*.zdict"), key=lambda path: path.stat().st_mtime)
+        if not files:
+            return None
+        return zstandard.ZstdCompressionDict(files[-1].read_bytes())
+
+    def compress_file(self, path, dictionary=None):
+        """
+        Replace a document by its compressed version (same mtime, written atomically)
+
+        Args:
+            path (Path): Plain document
+            dictionary (ZstdCompressionDict, optional): Shared dictionary
+
+        Returns:
+            tuple: (archived Path, original bytes, compressed bytes)
+        """
+        path = Path(path)
+        file_stat = path.stat()
+        data = path.read_bytes()
+        if self.codec == 'gzip':
+            compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+        else:
+            compressed = zstandard.ZstdCompressor(
+                level=self.level, dict_data=dictionary, write_content_size=True
+            ).compress(data)
+        target = path.with_name(path.name + CODEC_SUFFIXES[self.codec])
+        temp = target.with_name(f".{target.name}.tmp")
+        temp.write_bytes(compressed)
+        os.utime(temp, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+        os.replace(temp, target)
+        path.unlink()
+        return target, len(data), len(compressed)
+
+    def archive(self, root, suffix, name, older_than_days=None, retrain=False, on_archive=None):
+        """
+        Compress the old documents of a directory
+
+        Args:
+            root (Path): Report or transcription directory
+            suffix (str): '.md' or '.txt'
+            name (str): Kind of document, used for the dictionary ('reports', 'transcriptions')
+            older_than_days (float, optional): Age (default: config.ARCHIVE_AFTER_DAYS)
+            retrain (bool): Train a new dictionary even if one exists
+            on_archive (callable, optional): on_archive(plain path, archived path), after each file
+
+        Returns:
+            dict: 'files', 'original_bytes', 'compressed_bytes', 'ratio', 'seconds', 'codec', 'dictionary'
+        """
+        start = time.perf_counter()
+        paths = self.candidates(root, suffix, older_than_days)
+        dictionary = None
+        if self.use_dictionary and paths:
+            dictionary = None if retrain else self.latest_dictionary(name)
+            if dictionary is None:
+                dictionary = self.train_dictionary(paths, name)
+
+        stats = {'files': 0, 'original_bytes': 0, 'compressed_bytes': 0, 'codec': self.codec,
+                 'dictionary': dictionary.dict_id() if dictionary is not None else None}
+        for path in paths:
+            try:
+                target, original, compressed = self.compress_file(path, dictionary)
+            except OSError as e:
+                logger.warning(f"Could not archive {path}: {e}")
+                continue
+            stats['files'] += 1
+            stats['original_bytes'] += original
+            stats['compressed_bytes'] += compressed
+            if on_archive is not None:
+                on_archive(path, target)
+        stats['ratio'] = (stats['original_bytes'] / stats['compressed_bytes']) if stats['compressed_bytes'] else None
+        stats['seconds'] = time.perf_counter() - start
+        logger.info(f"Archived {stats['files']} file(s) of {root}: {stats['original_bytes']} -> "
+                    f"{stats['compressed_bytes']} bytes")
+        return stats
+
+
+def archive_stats(root, suffix, sample_size=200):
+    """
+    Storage and read latency of a directory's plain and archived documents
+
+    Args:
+        root (Path): Report or transcription directory
+        suffix (str): '.md' or '.txt'
+        sample_size (int): Files read per kind to measure latency
+
+    Returns:
+        dict: 'plain' and 'archived' -> {'files', 'bytes', 'read_ms'}, plus 'original_bytes'
+        and 'ratio' of the archived documents
+    """
+    suffixes = (suffix, *(suffix + s for s in storage_layout.ARCHIVE_SUFFIXES))
+    groups = {'plain': [], 'archived': []}
+    for _, entry in storage_layout.iter_files(root, suffixes):
+        groups['archived' if is_archived(entry.name) else 'plain'].append(Path(entry.path))
+
+    result = {}
+    for kind, paths in groups.items():
+        sizes = [path.stat().st_size for path in paths]
+        sample = random.Random(0).sample(paths, min(len(paths), sample_size))
+        start = time.perf_counter()
+        for path in sample:
+            read_bytes(path)
+        elapsed = time.perf_counter() - start
+        result[kind] = {
+            'files': len(paths),
+            'bytes': sum(sizes),
+            'read_ms': elapsed / len(sample) * 1000 if sample else None,
+        }
+    original = sum(original_size(path) for path in groups['archived'])
+    result['original_bytes'] = original
+    result['ratio'] = original / result['archived']['bytes'] if result['archived']['bytes'] else None
+    return result
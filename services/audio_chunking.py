@@ -0,0 +1,261 @@
+"""
+Audio Chunking Module
+Splits long recordings at silence boundaries and transcribes the chunks in parallel
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from services.audio_preprocessing import SAMPLE_RATE, frame_energy
+
+logger = logging.getLogger(__name__)
+
+# Worker pools kept across recordings, one per (model, device, workers): each worker loads
+# its Whisper model once (model registry) and keeps it for every later chunk
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def plan_chunks(audio, chunk_seconds, overlap_seconds, sample_rate=SAMPLE_RATE, search_seconds=None):
+    """
+    Plan overlapping chunk windows whose cut points fall on the quietest frames
+
+    Each cut point is searched in the last ``search_seconds`` before the nominal
+    chunk end. Chunk ``i`` spans ``[cut_{i-1}, cut_i + overlap]`` so consecutive
+    chunks share ``overlap_seconds`` of audio.
+
+    Args:
+        audio (np.ndarray): Mono float32 PCM
+        chunk_seconds (float): Nominal chunk length
+        overlap_seconds (float): Audio shared by consecutive chunks
+        sample_rate (int): Sample rate in Hz
+        search_seconds (float, optional): Window searched for silence
+
+    Returns:
+        list: List of (start_sample, end_sample) tuples
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    if chunk <= 0 or total <= chunk:
+        return [(0, total)]
+
+    if search_seconds is None:
+        search_seconds = min(10.0, chunk_seconds / 4)
+    search = int(search_seconds * sample_rate)
+
+    energy, frame_len = frame_energy(audio, sample_rate)
+
+    windows = []
+    start = 0
+    while start < total:
+        nominal_end = start + chunk
+        if nominal_end >= total:
+            windows.append((start, total))
+            break
+
+        lo = max(start + chunk // 2, nominal_end - search) // frame_len
+        hi = nominal_end // frame_len
+        if hi > lo and hi <= len(energy):
+            cut = (lo + int(np.argmin(energy[lo:hi]))) * frame_len
+        else:
+            cut = nominal_end
+
+        windows.append((start, min(total, cut + overlap)))
+        start = cut
+
+    return windows
+
+
+def _normalize_word(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def _word_overlap(previous_words, next_words, max_words=60, min_words=2):
+    """
+    Find how many leading words of the next chunk repeat the tail of the previous one
+
+    Args:
+        previous_words (list): Words already kept
+        next_words (list): Words of the next chunk
+        max_words (int): Longest overlap considered
+        min_words (int): Shortest overlap accepted (avoids coincidental matches)
+
+    Returns:
+        int: Number of duplicated leading words in ``next_words``
+    """
+    prev = [_normalize_word(w) for w in previous_words[-max_words:]]
+    nxt = [_normalize_word(w) for w in next_words[:max_words]]
+    for k in range(min(len(prev), len(nxt)), min_words - 1, -1):
+        if prev[-k:] == nxt[:k]:
+            return k
+    return 0
+
+
+def _drop_leading_words(segments, n_words):
+    """Remove the first ``n_words`` words from a list of segments"""
+    kept = []
+    for seg in segments:
+        if n_words <= 0:
+            kept.append(seg)
+            continue
+        words = seg['text'].split()
+        if len(words) <= n_words:
+            n_words -= len(words)
+            continue
+        seg = dict(seg)
+        seg['text'] = ' ' + ' '.join(words[n_words:])
+        n_words = 0
+        kept.append(seg)
+    return kept
+
+
+def stitch_chunks(chunk_results, windows, sample_rate=SAMPLE_RATE):
+    """
+    Merge per-chunk Whisper results into a single result
+
+    Segment times are shifted to the original timeline and words duplicated
+    in the overlap regions are removed.
+
+    Args:
+        chunk_results (list): Whisper result dicts, one per window
+        windows (list): (start_sample, end_sample) tuples used for each chunk
+        sample_rate (int): Sample rate in Hz
+
+    Returns:
+        dict: Result with 'text' and 'segments'
+    """
+    merged = []
+    kept_words = []
+    previous_end = 0.0
+
+    for result, (start, _end) in zip(chunk_results, windows):
+        offset = start / sample_rate
+        segments = []
+        for seg in result.get('segments', []):
+            seg = dict(seg)
+            seg['start'] = seg.get('start', 0.0) + offset
+            seg['end'] = seg.get('end', 0.0) + offset
+            segments.append(seg)
+
+        if merged and segments:
+            next_words = ' '.join(s['text'] for s in segments).split()
+            duplicated = _word_overlap(kept_words, next_words)
+            if duplicated:
+                segments = _drop_leading_words(segments, duplicated)
+            else:
+                # No textual match: drop segments lying entirely inside the
+                # stretch already covered by the previous chunk
+                segments = [s for s in segments if s['end'] > previous_end]
+
+        for seg in segments:
+            kept_words.extend(seg['text'].split())
+            merged.append(seg)
+        if merged:
+            previous_end = merged[-1]['end']
+
+    for idx, seg in enumerate(merged):
+        seg['id'] = idx
+
+    text = ''.join(seg['text'] for seg in merged).strip()
+    language = chunk_results[0].get('language') if chunk_results else None
+    return {'text': text, 'segments': merged, 'language': language}
+
+
+def _init_worker(threads_per_worker):
+    """Limit intra-op threads so parallel workers do not oversubscribe the CPU"""
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+
+def _transcribe_chunk(model_name, device, audio, options):
+    """Transcribe one chunk inside a worker process (model loaded once per worker)"""
+    from services.model_registry import get_model_registry
+    with get_model_registry().lease(model_name, device) as model:
+        return model.transcribe(audio, **options)
+
+
+def _get_pool(model_name, device, workers):
+    """Shared worker pool for a model and settings, created on first use"""
+    key = (model_name, device, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(threads_per_worker,))
+            _pools[key] = pool
+        return pool
+
+
+def _discard_pool(model_name, device, workers):
+    with _pools_lock:
+        pool = _pools.pop((model_name, device, workers), None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools():
+    """Stop every shared worker pool (also run at interpreter exit)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def transcribe_chunked(audio, model_name, device, options, workers, chunk_seconds, overlap_seconds,
+                       progress=None):
+    """
+    Transcribe a long recording in parallel chunks
+
+    Args:
+        audio (np.ndarray): Mono float32 PCM at 16 kHz
+        model_name (str): Whisper model name
+        device (str or None): Torch device
+        options (dict): Keyword arguments for ``model.transcribe``
+        workers (int): Number of worker processes (the pool is reused by later calls with the
+            same model, device and workers)
+        chunk_seconds (float): Nominal chunk length
+        overlap_seconds (float): Overlap between consecutive chunks
+        progress (callable, optional): Called with the audio seconds done after each chunk
+
+    Returns:
+        dict: Result with 'text' and 'segments'
+    """
+    windows = plan_chunks(audio, chunk_seconds, overlap_seconds)
+    workers = max(1, workers)
+    logger.info(
+        f"Chunked transcription: {len(audio) / SAMPLE_RATE:.0f}s in {len(windows)} chunks, "
+        f"{min(workers, len(windows))} workers"
+    )
+
+    chunks = [np.ascontiguousarray(audio[start:end]) for start, end in windows]
+    pool = _get_pool(model_name, device, workers)
+    try:
+        futures = [pool.submit(_transcribe_chunk, model_name, device, chunk, options) for chunk in chunks]
+        if progress is not None:
+            total_seconds = len(audio) / SAMPLE_RATE
+            chunk_seconds_of = {f: len(chunk) / SAMPLE_RATE for f, chunk in zip(futures, chunks)}
+            done_seconds = 0.0
+            for future in as_completed(futures):
+                # Overlapping windows add up to slightly more than the recording
+                done_seconds = min(total_seconds, done_seconds + chunk_seconds_of[future])
+                progress(done_seconds)
+        results = [f.result() for f in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory): the next call starts a fresh pool
+        _discard_pool(model_name, device, workers)
+        raise
+
+    return stitch_chunks(results, windows)
@@ -0,0 +1,110 @@
+"""
+Audio Ingestion Module
+Decodes each recording once to 16 kHz mono PCM and keeps it in a memory-mappable cache
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+import config
+from services.audio_preprocessing import SAMPLE_RATE, decode_audio
+from services.transcription_cache import hash_file
+from utils import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+
+class IngestedAudio:
+    """Decoded PCM of one recording, backed by the ingestion cache"""
+
+    def __init__(self, source_path, audio_hash, pcm_path, samples):
+        self.source_path = Path(source_path)
+        self.audio_hash = audio_hash
+        self.pcm_path = Path(pcm_path)
+        self.samples = samples
+        self.sample_rate = SAMPLE_RATE
+
+    @property
+    def duration_seconds(self):
+        return len(self.samples) / self.sample_rate
+
+
+class AudioIngestor:
+    """Single decode stage shared by VAD, chunking, Whisper and Gemini re-encoding"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Initialize audio ingestor
+
+        Args:
+            cache_dir (Path, optional): PCM cache directory (default: TRANSCRIPTION_DIR/.audio_cache)
+            max_bytes (int, optional): Size limit before LRU eviction
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(config.TRANSCRIPTION_DIR) / ".audio_cache"
+        self.max_bytes = (
+            int(config.AUDIO_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _pcm_path(self, audio_hash):
+        return self.cache_dir / f"{audio_hash}.npy"
+
+    def load(self, audio_path, audio_hash=None):
+        """
+        Get the decoded PCM of a recording, decoding it only on a cache miss
+
+        Args:
+            audio_path (Path): Original audio file (any of config.AUDIO_EXTENSIONS)
+            audio_hash (str, optional): SHA-256 of the file, if already known
+
+        Returns:
+            IngestedAudio: Memory-mapped float32 samples at 16 kHz
+
+        Raises:
+            RuntimeError: If ffmpeg cannot decode the file
+        """
+        audio_path = Path(audio_path)
+        audio_hash = audio_hash or hash_file(audio_path)
+        pcm_path = self._pcm_path(audio_hash)
+
+        samples = self._open(pcm_path)
+        if samples is not None:
+            logger.debug(f"PCM cache hit: {audio_path.name}")
+            return IngestedAudio(audio_path, audio_hash, pcm_path, samples)
+
+        start = time.perf_counter()
+        decoded = decode_audio(audio_path)
+        tmp_path = pcm_path.with_suffix('.tmp.npy')
+        np.save(tmp_path, decoded)
+        os.replace(tmp_path, pcm_path)
+        logger.info(
+            f"Decoded {audio_path.name}: {len(decoded) / SAMPLE_RATE:.0f}s of audio "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        del decoded
+
+        evict_lru_files(self.cache_dir, "*.npy", self.max_bytes)
+        samples = self._open(pcm_path)
+        if samples is None:
+            # Evicted immediately (file larger than the whole budget): decode again in memory
+            samples = decode_audio(audio_path)
+        return IngestedAudio(audio_path, audio_hash, pcm_path, samples)
+
+    def _open(self, pcm_path):
+        """Memory-map a cached PCM file (copy-on-write, so consumers may modify it)"""
+        try:
+            samples = np.load(pcm_path, mmap_mode='c')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable PCM cache file {pcm_path.name}: {e}")
+            pcm_path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(pcm_path, None)
+        except OSError:
+            pass
+        return samples
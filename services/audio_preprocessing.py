@@ -0,0 +1,271 @@
+"""
+Audio Preprocessing Module
+PCM decoding and energy-based voice activity detection (silence trimming)
+"""
+from bisect import bisect_right
+import logging
+import subprocess
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+def decode_audio(audio_path, sample_rate=SAMPLE_RATE):
+    """
+    Decode any ffmpeg-readable file to mono float32 PCM
+
+    Args:
+        audio_path (Path): Audio file
+        sample_rate (int): Target sample rate in Hz
+
+    Returns:
+        np.ndarray: Samples in [-1, 1]
+
+    Raises:
+        RuntimeError: If ffmpeg fails to decode the file
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", str(audio_path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')[-500:]}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def encode_audio(audio, output_path, sample_rate=SAMPLE_RATE, extra_args=None):
+    """
+    Encode mono float32 PCM to a file (format chosen by ffmpeg from the extension)
+
+    Args:
+        audio (np.ndarray): Samples in [-1, 1]
+        output_path (Path): Destination file
+        sample_rate (int): Sample rate of ``audio``
+        extra_args (list, optional): Extra ffmpeg output arguments (codec, bitrate...)
+
+    Raises:
+        RuntimeError: If ffmpeg fails to encode the audio
+    """
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    cmd = [
+        "ffmpeg", "-nostdin", "-y", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "-",
+        *(extra_args or []), str(output_path)
+    ]
+    try:
+        subprocess.run(cmd, input=pcm, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to encode audio: {e.stderr.decode(errors='ignore')[-500:]}") from e
+
+
+def frame_energy(audio, sample_rate=SAMPLE_RATE):
+    """
+    Compute RMS energy per fixed-size frame
+
+    Args:
+        audio (np.ndarray): Mono float32 PCM
+        sample_rate (int): Sample rate in Hz
+
+    Returns:
+        tuple: (energy per frame, frame length in samples)
+    """
+    frame_len = max(1, int(FRAME_SECONDS * sample_rate))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame_len
+    frames = np.asarray(audio[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames ** 2, axis=1)), frame_len
+
+
+def detect_speech_regions(audio, sample_rate=SAMPLE_RATE, threshold_db=None,
+                          min_silence_seconds=None, padding_seconds=None):
+    """
+    Detect speech regions with an adaptive energy threshold
+
+    A frame counts as speech when its level is above both ``threshold_db`` and
+    the estimated noise floor plus a margin. Only silences longer than
+    ``min_silence_seconds`` split regions, and each region is padded so word
+    onsets and tails are kept.
+
+    Args:
+        audio (np.ndarray): Mono float32 PCM
+        sample_rate (int): Sample rate in Hz
+        threshold_db (float, optional): Absolute level (dBFS) below which audio is silence
+        min_silence_seconds (float, optional): Shortest silence that is removed
+        padding_seconds (float, optional): Audio kept around each speech region
+
+    Returns:
+        list: List of (start_sample, end_sample) tuples
+    """
+    threshold_db = config.VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+    min_silence_seconds = config.VAD_MIN_SILENCE_SECONDS if min_silence_seconds is None else min_silence_seconds
+    padding_seconds = config.VAD_PADDING_SECONDS if padding_seconds is None else padding_seconds
+
+    energy, frame_len = frame_energy(audio, sample_rate)
+    if len(energy) == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    level_db = 20 * np.log10(energy + 1e-10)
+    noise_floor_db = float(np.percentile(level_db, 10))
+    speech = level_db > max(threshold_db, noise_floor_db + 6.0)
+
+    regions = []
+    start = None
+    for idx, is_speech in enumerate(speech):
+        if is_speech and start is None:
+            start = idx
+        elif not is_speech and start is not None:
+            regions.append([start, idx])
+            start = None
+    if start is not None:
+        regions.append([start, len(speech)])
+
+    # Merge regions separated by short pauses
+    min_gap = int(min_silence_seconds / FRAME_SECONDS)
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+
+    pad = int(padding_seconds * sample_rate)
+    result = []
+    for start_frame, end_frame in merged:
+        start_sample = max(0, start_frame * frame_len - pad)
+        end_sample = min(len(audio), end_frame * frame_len + pad)
+        if result and start_sample <= result[-1][1]:
+            result[-1] = (result[-1][0], end_sample)
+        else:
+            result.append((start_sample, end_sample))
+    return result
+
+
+class TimestampMap:
+    """Maps times in trimmed audio back to the original recording"""
+
+    def __init__(self, regions, sample_rate=SAMPLE_RATE):
+        """
+        Initialize timestamp map
+
+        Args:
+            regions (list): (start_sample, end_sample) speech regions that were kept
+            sample_rate (int): Sample rate in Hz
+        """
+        self._trimmed_starts = []
+        self._original_starts = []
+        self._durations = []
+        position = 0
+        for start, end in regions:
+            self._trimmed_starts.append(position / sample_rate)
+            self._original_starts.append(start / sample_rate)
+            self._durations.append((end - start) / sample_rate)
+            position += end - start
+
+    def to_original(self, seconds):
+        """
+        Convert a time in the trimmed audio to the original timeline
+
+        Args:
+            seconds (float): Time in the trimmed audio
+
+        Returns:
+            float: Time in the original audio
+        """
+        if not self._trimmed_starts:
+            return seconds
+        idx = max(0, bisect_right(self._trimmed_starts, seconds) - 1)
+        offset = min(seconds - self._trimmed_starts[idx], self._durations[idx])
+        return self._original_starts[idx] + offset
+
+    def map_segments(self, segments):
+        """
+        Shift segment start/end times to the original timeline
+
+        Args:
+            segments (list): Whisper-style segments
+
+        Returns:
+            list: New segment dicts with original times
+        """
+        mapped = []
+        for seg in segments:
+            seg = dict(seg)
+            seg['start'] = self.to_original(seg.get('start', 0.0))
+            seg['end'] = self.to_original(seg.get('end', 0.0))
+            mapped.append(seg)
+        return mapped
+
+
+class SilenceTrimResult:
+    """Trimmed audio plus the information needed to undo the trimming"""
+
+    def __init__(self, audio, timestamp_map, original_seconds, kept_seconds):
+        self.audio = audio
+        self.timestamp_map = timestamp_map
+        self.original_seconds = original_seconds
+        self.kept_seconds = kept_seconds
+
+    @property
+    def removed_seconds(self):
+        return self.original_seconds - self.kept_seconds
+
+    def stats(self):
+        """
+        Summary of the trimming for logs and results
+
+        Returns:
+            dict: Original, kept and removed seconds
+        """
+        return {
+            'original_seconds': round(self.original_seconds, 2),
+            'kept_seconds': round(self.kept_seconds, 2),
+            'removed_seconds': round(self.removed_seconds, 2),
+        }
+
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE, **vad_options):
+    """
+    Drop silent stretches from a recording
+
+    Args:
+        audio (np.ndarray): Mono float32 PCM
+        sample_rate (int): Sample rate in Hz
+        **vad_options: Overrides for detect_speech_regions
+
+    Returns:
+        SilenceTrimResult: Trimmed audio with its timestamp map
+    """
+    regions = detect_speech_regions(audio, sample_rate, **vad_options)
+    if regions:
+        trimmed = np.concatenate([audio[start:end] for start, end in regions])
+    else:
+        trimmed = np.zeros(0, dtype=np.float32)
+    return SilenceTrimResult(
+        trimmed,
+        TimestampMap(regions, sample_rate),
+        original_seconds=len(audio) / sample_rate,
+        kept_seconds=len(trimmed) / sample_rate
+    )
+
+
+def vad_settings():
+    """
+    Current VAD settings (part of the transcription cache key)
+
+    Returns:
+        dict: Threshold, minimum silence and padding
+    """
+    return {
+        'threshold_db': config.VAD_THRESHOLD_DB,
+        'min_silence_seconds': config.VAD_MIN_SILENCE_SECONDS,
+        'padding_seconds': config.VAD_PADDING_SECONDS,
+        'min_removed_seconds': config.VAD_MIN_REMOVED_SECONDS,
+    }
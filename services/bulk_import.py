@@ -0,0 +1,218 @@
+"""
+Bulk Import Module
+Reads a patient manifest (CSV or JSONL) for unattended batch runs and writes the run summary
+"""
+import csv
+from datetime import datetime
+import json
+import logging
+from pathlib import Path
+
+import config
+from services.pipeline import PipelineItem
+from utils import validate_patient_info
+
+logger = logging.getLogger(__name__)
+
+PATIENT_FIELDS = (
+    'paciente_nome', 'paciente_especie', 'paciente_raca', 'paciente_idade',
+    'tutor_nome', 'data_consulta', 'motivo_retorno', 'tipo_atendimento',
+)
+# Also placeholders of the report template; optional columns, empty when absent (as in the web form)
+OPTIONAL_PATIENT_FIELDS = (
+    'vet_nome', 'vet_crmv', 'vet_especialidade',
+    'exame_temperatura', 'exame_fc', 'exame_fr', 'exame_tpc', 'exame_mucosas', 'exame_hidratacao',
+    'exame_linfonodos', 'medicacao_info', 'exames_complementares',
+)
+AUDIO_COLUMN = 'audio'
+TEXT_COLUMN = 'transcricao'
+
+
+class ManifestError(ValueError):
+    """Manifest rows that cannot be processed (all problems are reported at once)"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} linha(s) inválida(s) no manifesto:\n" + "\n".join(errors))
+
+
+def patient_info_from_row(row):
+    """
+    Extract and validate the patient fields of a manifest row or sidecar file
+
+    Args:
+        row (dict): Column -> value
+
+    Returns:
+        dict: Patient information (data_consulta defaults to today, optional fields to '')
+
+    Raises:
+        ValueError: If a required field is missing or invalid
+    """
+    patient_info = {
+        field: str(row.get(field) or '').strip() for field in PATIENT_FIELDS + OPTIONAL_PATIENT_FIELDS
+    }
+    if not patient_info['data_consulta']:
+        patient_info['data_consulta'] = datetime.now().strftime("%d/%m/%Y")
+    validate_patient_info(patient_info)
+    return patient_info
+
+
+def _read_rows(manifest_path):
+    """Yield (line_number, row dict) from a CSV or JSONL manifest"""
+    if manifest_path.suffix.lower() in ('.jsonl', '.ndjson'):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+                    continue
+                yield line_number, row if isinstance(row, dict) else ValueError("linha não é um objeto JSON")
+    else:
+        with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+            # Linha 1 é o cabeçalho
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                yield line_number, row
+
+
+def _resolve(path_value, manifest_dir, fallback_dir):
+    path = Path(path_value).expanduser()
+    if path.is_absolute():
+        return path
+    candidate = manifest_dir / path
+    if candidate.exists() or fallback_dir is None:
+        return candidate
+    return fallback_dir / path
+
+
+def load_manifest(manifest_path):
+    """
+    Read and validate every row of a manifest before anything is processed
+
+    Each row has either an ``audio`` column (audio file) or a ``transcricao`` column
+    (text file with an existing transcription), plus the patient fields collected by
+    ``collect_patient_info`` and, optionally, the veterinarian, exam, medication and
+    complementary exam fields of OPTIONAL_PATIENT_FIELDS. Relative paths are resolved against the manifest folder
+    (audio files also against config.AUDIO_DIR).
+
+    Args:
+        manifest_path (Path): .csv or .jsonl file
+
+    Returns:
+        list: PipelineItem objects, in manifest order
+
+    Raises:
+        ManifestError: If any row is invalid
+    """
+    manifest_path = Path(manifest_path)
+    manifest_dir = manifest_path.parent
+    items = []
+    errors = []
+
+    for line_number, row in _read_rows(manifest_path):
+        if isinstance(row, Exception):
+            errors.append(f"linha {line_number}: JSON inválido ({row})")
+            continue
+        row = {key.strip(): (str(value).strip() if value is not None else '') for key, value in row.items() if key}
+
+        audio_value = row.get(AUDIO_COLUMN, '')
+        text_value = row.get(TEXT_COLUMN, '')
+        if bool(audio_value) == bool(text_value):
+            errors.append(f"linha {line_number}: informe exatamente uma das colunas '{AUDIO_COLUMN}' ou '{TEXT_COLUMN}'")
+            continue
+
+        try:
+            patient_info = patient_info_from_row(row)
+        except ValueError as e:
+            errors.append(f"linha {line_number}: {e}")
+            continue
+
+        if audio_value:
+            audio_path = _resolve(audio_value, manifest_dir, config.AUDIO_DIR)
+            if not audio_path.is_file():
+                errors.append(f"linha {line_number}: áudio não encontrado: {audio_value}")
+                continue
+            if audio_path.suffix.lower() not in config.AUDIO_EXTENSIONS:
+                errors.append(f"linha {line_number}: formato de áudio não suportado: {audio_path.suffix}")
+                continue
+            items.append(PipelineItem(patient_info, audio_path=audio_path))
+        else:
+            text_path = _resolve(text_value, manifest_dir, None)
+            try:
+                text = text_path.read_text(encoding='utf-8')
+            except OSError as e:
+                errors.append(f"linha {line_number}: não foi possível ler a transcrição {text_value}: {e}")
+                continue
+            if not text.strip():
+                errors.append(f"linha {line_number}: transcrição vazia: {text_value}")
+                continue
+            items.append(PipelineItem(patient_info, transcription_text=text, source_name=text_path.stem))
+
+    if errors:
+        raise ManifestError(errors)
+    logger.info(f"Manifest {manifest_path.name}: {len(items)} row(s) validated")
+    return items
+
+
+def build_summary(manifest_path, results, stage_stats, started_at, finished_at):
+    """
+    Machine-readable summary of a bulk run
+
+    Args:
+        manifest_path (Path): Manifest that was processed
+        results (list): Finished PipelineItem objects
+        stage_stats (dict): BatchPipeline.stats_summary()
+        started_at (datetime): Run start
+        finished_at (datetime): Run end
+
+    Returns:
+        dict: JSON-serializable summary
+    """
+    items = [item.to_dict() for item in results]
+    costs = [item['cost_usd'] for item in items if item['cost_usd'] is not None]
+    usages = [item['usage'] for item in items if item['usage']]
+    return {
+        'manifest': str(manifest_path),
+        'started_at': started_at.isoformat(),
+        'finished_at': finished_at.isoformat(),
+        'wall_seconds': round((finished_at - started_at).total_seconds(), 3),
+        'totals': {
+            'items': len(items),
+            'succeeded': sum(1 for item in results if item.succeeded and not item.skipped),
+            'skipped': sum(1 for item in results if item.skipped),
+            'failed': sum(1 for item in results if not item.succeeded),
+        },
+        'cost': {
+            'input_tokens': sum(u['input_tokens'] for u in usages),
+            'output_tokens': sum(u['output_tokens'] for u in usages),
+            'estimated_usd': round(sum(costs), 6),
+            'unpriced_calls': len(usages) - len(costs),
+        },
+        'stages': stage_stats,
+        'failures': [
+            {'name': item['name'], 'stage': item['failed_stage'], 'error': item['error']}
+            for item in items if item['error']
+        ],
+        'items': items,
+    }
+
+
+def write_summary(summary, summary_path):
+    """
+    Write the summary as JSON
+
+    Args:
+        summary (dict): Output of build_summary
+        summary_path (Path): Destination file
+
+    Returns:
+        Path: The written file
+    """
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary_path
@@ -0,0 +1,286 @@
+"""
+Daily Stats Module
+Materialized daily rollups of saved reports (counts per dimension, token cost, latency histograms),
+maintained incrementally by the report index in the same transaction as each report write
+"""
+from bisect import bisect_left
+from datetime import date, timedelta
+import sqlite3
+from pathlib import Path
+
+import config
+
+# Dimensions counted per day; the value of a report comes from its index row
+DIMENSIONS = {
+    'total': lambda row: '',
+    'type': lambda row: row['report_type'] or '',
+    'species': lambda row: row['species_key'] or '',
+    'attendance': lambda row: (row['attendance_type'] or '').lower(),
+    'provider': lambda row: row['provider'] or '',
+}
+
+# Stages with a latency histogram, and the index column holding each duration
+LATENCY_STAGES = {
+    'transcription': 'transcription_seconds',
+    'report': 'report_seconds',
+}
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (
+    0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300, 450, 600, 900, 1200, 1800, 3600
+)
+
+
+def create_tables(conn):
+    """
+    Create the rollup tables
+
+    Args:
+        conn (sqlite3.Connection): Report index connection
+
+    Returns:
+        bool: True if the tables did not exist yet (they must be filled with rebuild())
+    """
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_stats'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            directory TEXT NOT NULL,
+            day TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            reports INTEGER NOT NULL DEFAULT 0,
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (directory, dimension, day, value)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_latency (
+            directory TEXT NOT NULL,
+            day TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (directory, stage, day, bucket)
+        ) WITHOUT ROWID
+    """)
+    return existed is None
+
+
+def _bucket(seconds):
+    return bisect_left(LATENCY_BUCKETS, seconds)
+
+
+def apply(conn, row, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the contribution of one report to the rollups
+
+    Args:
+        conn (sqlite3.Connection): Connection inside the write transaction of the index change
+        row (Mapping): Report index row
+        sign (int): 1 or -1
+    """
+    if not row['day']:
+        return
+    input_tokens = sign * (row['input_tokens'] or 0)
+    output_tokens = sign * (row['output_tokens'] or 0)
+    cost = sign * (row['cost_usd'] or 0.0)
+    for dimension, value_of in DIMENSIONS.items():
+        conn.execute(
+            "INSERT INTO daily_stats (directory, day, dimension, value, reports, input_tokens, output_tokens, cost_usd) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (directory, dimension, day, value) DO UPDATE SET "
+            "reports = reports + excluded.reports, input_tokens = input_tokens + excluded.input_tokens, "
+            "output_tokens = output_tokens + excluded.output_tokens, cost_usd = cost_usd + excluded.cost_usd",
+            (row['directory'], row['day'], dimension, value_of(row), sign, input_tokens, output_tokens, cost)
+        )
+    for stage, column in LATENCY_STAGES.items():
+        if row[column] is None:
+            continue
+        conn.execute(
+            "INSERT INTO daily_latency (directory, day, stage, bucket, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (directory, stage, day, bucket) DO UPDATE SET count = count + excluded.count",
+            (row['directory'], row['day'], stage, _bucket(row[column]), sign)
+        )
+    if sign < 0:
+        conn.execute("DELETE FROM daily_stats WHERE directory = ? AND day = ? AND reports <= 0",
+                     (row['directory'], row['day']))
+        conn.execute("DELETE FROM daily_latency WHERE directory = ? AND day = ? AND count <= 0",
+                     (row['directory'], row['day']))
+
+
+def rebuild(conn):
+    """
+    Recompute every rollup from the report index rows (used once, when the tables are created)
+
+    Args:
+        conn (sqlite3.Connection): Connection inside a write transaction
+    """
+    conn.execute("DELETE FROM daily_stats")
+    conn.execute("DELETE FROM daily_latency")
+    for row in conn.execute("SELECT * FROM reports WHERE day IS NOT NULL").fetchall():
+        apply(conn, row, 1)
+
+
+def _percentile(histogram, pct):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    threshold = pct / 100 * total
+    cumulative = 0
+    for bucket in sorted(histogram):
+        cumulative += histogram[bucket]
+        if cumulative >= threshold:
+            # Upper bound of the bucket (the open-ended last bucket reports its lower bound)
+            return LATENCY_BUCKETS[bucket] if bucket < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+    return LATENCY_BUCKETS[-1]
+
+
+class DailyStats:
+    """Read side of the rollups (cost proportional to the number of days, not of reports)"""
+
+    def __init__(self, report_dir, db_path=None):
+        """
+        Initialize daily stats reader
+
+        Args:
+            report_dir (Path): Report directory
+            db_path (Path, optional): Report index database (default: config.REPORT_INDEX_DB)
+        """
+        self.directory = str(Path(report_dir).resolve())
+        self.db_path = Path(db_path or config.REPORT_INDEX_DB)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _day_range(start, end):
+        return (start.strftime("%Y-%m-%d") if start else "0000-00-00",
+                end.strftime("%Y-%m-%d") if end else "9999-99-99")
+
+    def totals(self, start=None, end=None):
+        """
+        Reports, tokens and cost in a period
+
+        Args:
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+
+        Returns:
+            dict: 'reports', 'input_tokens', 'output_tokens', 'cost_usd'
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(reports), 0) AS reports, COALESCE(SUM(input_tokens), 0) AS input_tokens, "
+                "COALESCE(SUM(output_tokens), 0) AS output_tokens, COALESCE(SUM(cost_usd), 0) AS cost_usd "
+                "FROM daily_stats WHERE directory = ? AND dimension = 'total' AND day BETWEEN ? AND ?",
+                (self.directory, *self._day_range(start, end))
+            ).fetchone()
+        finally:
+            conn.close()
+        return dict(row)
+
+    def per_day(self, start=None, end=None):
+        """
+        Reports and cost per day
+
+        Args:
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+
+        Returns:
+            list: Dicts with 'day' (YYYY-MM-DD), 'reports' and 'cost_usd', oldest first
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT day, reports, cost_usd FROM daily_stats "
+                "WHERE directory = ? AND dimension = 'total' AND day BETWEEN ? AND ? ORDER BY day",
+                (self.directory, *self._day_range(start, end))
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def breakdown(self, dimension, start=None, end=None):
+        """
+        Reports and cost per value of a dimension in a period
+
+        Args:
+            dimension (str): 'type', 'species', 'attendance' or 'provider'
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+
+        Returns:
+            dict: Value ('' when unknown) -> {'reports', 'cost_usd'}, most reports first
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT value, SUM(reports) AS reports, SUM(cost_usd) AS cost_usd FROM daily_stats "
+                "WHERE directory = ? AND dimension = ? AND day BETWEEN ? AND ? "
+                "GROUP BY value ORDER BY reports DESC, value",
+                (self.directory, dimension, *self._day_range(start, end))
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row['value']: {'reports': row['reports'], 'cost_usd': row['cost_usd']} for row in rows}
+
+    def latency_percentiles(self, start=None, end=None, percentiles=(50, 90, 99)):
+        """
+        Latency percentiles per stage, from the merged daily histograms
+
+        Values are bucket upper bounds (see LATENCY_BUCKETS), i.e. accurate to one bucket.
+
+        Args:
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            percentiles (tuple): Percentiles to compute
+
+        Returns:
+            dict: Stage -> {'count', 'p50', 'p90', 'p99'}
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT stage, bucket, SUM(count) AS count FROM daily_latency "
+                "WHERE directory = ? AND day BETWEEN ? AND ? GROUP BY stage, bucket",
+                (self.directory, *self._day_range(start, end))
+            ).fetchall()
+        finally:
+            conn.close()
+        histograms = {}
+        for row in rows:
+            histograms.setdefault(row['stage'], {})[row['bucket']] = row['count']
+        return {
+            stage: {
+                'count': sum(histogram.values()),
+                **{f"p{pct}": _percentile(histogram, pct) for pct in percentiles}
+            }
+            for stage, histogram in histograms.items()
+        }
+
+    def last_days(self, days=30, today=None):
+        """
+        Reports per day for the last days, with zero for days without reports
+
+        Args:
+            days (int): Number of days (including today)
+            today (date, optional): Last day (default: today)
+
+        Returns:
+            list: (date, reports) tuples, oldest first
+        """
+        today = today or date.today()
+        start = today - timedelta(days=days - 1)
+        counts = {row['day']: row['reports'] for row in self.per_day(start, today)}
+        return [
+            (start + timedelta(days=n), counts.get((start + timedelta(days=n)).strftime("%Y-%m-%d"), 0))
+            for n in range(days)
+        ]
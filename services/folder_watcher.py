@@ -0,0 +1,310 @@
+"""
+Folder Watcher Module
+Watches the audio folder and feeds finished recordings to the batch pipeline
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+
+import config
+from services.bulk_import import patient_info_from_row
+from services.pipeline import BatchPipeline, PipelineItem
+from services.transcription_cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = '.json'
+
+
+def _signature(path):
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+class FolderWatcher:
+    """
+    Reports audio files once they stop growing.
+
+    Uses inotify (optional ``inotify_simple`` package, Linux) to learn about new or
+    modified files, falling back to scanning the folder every ``poll_interval`` seconds.
+    Either way a file is only reported after its size and mtime stayed unchanged for
+    ``stable_seconds`` (uploads and tablet syncs write in pieces).
+    """
+
+    def __init__(self, directory, on_ready, stable_seconds=None, poll_interval=None,
+                 extensions=None, use_inotify=None):
+        """
+        Initialize folder watcher
+
+        Args:
+            directory (Path): Folder to watch
+            on_ready (callable): Called with the Path of each finished file
+            stable_seconds (float, optional): Quiet time before a file counts as finished
+            poll_interval (float, optional): Seconds between checks
+            extensions (list, optional): Suffixes to watch (default: config.AUDIO_EXTENSIONS)
+            use_inotify (bool, optional): Force (True) or disable (False) inotify; default: if available
+        """
+        self.directory = Path(directory)
+        self.on_ready = on_ready
+        self.stable_seconds = config.WATCH_STABLE_SECONDS if stable_seconds is None else stable_seconds
+        self.poll_interval = config.WATCH_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self.extensions = {ext.lower() for ext in (extensions or config.AUDIO_EXTENSIONS)}
+        self._gone_mask = 0
+        self._inotify = self._open_inotify() if use_inotify is not False else None
+        if use_inotify and self._inotify is None:
+            raise RuntimeError("inotify indisponível (instale o pacote inotify_simple, apenas Linux)")
+        # path -> (signature, time the signature was first seen)
+        self._candidates = {}
+        # path -> signature already reported (forgotten once the file is gone)
+        self._reported = {}
+        self._stop = threading.Event()
+
+    @property
+    def mode(self):
+        return 'inotify' if self._inotify is not None else 'polling'
+
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            return None
+        try:
+            inotify = INotify()
+            inotify.add_watch(
+                str(self.directory),
+                flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO | flags.DELETE | flags.MOVED_FROM
+            )
+            self._gone_mask = flags.DELETE | flags.MOVED_FROM
+            return inotify
+        except OSError as e:
+            logger.warning(f"inotify unavailable for {self.directory}, polling instead: {e}")
+            return None
+
+    def _watched(self, path):
+        return path.suffix.lower() in self.extensions and not path.name.startswith('.')
+
+    def _add_candidate(self, path):
+        if self._watched(path) and path not in self._candidates:
+            self._candidates[path] = None
+
+    def _forget(self, path):
+        self._candidates.pop(path, None)
+        self._reported.pop(path, None)
+
+    def scan(self):
+        """Consider every watched file in the folder (startup, and every cycle when polling)"""
+        present = set()
+        for path in self.directory.iterdir():
+            if path.is_file():
+                present.add(path)
+                self._add_candidate(path)
+        for path in [path for path in self._reported if path not in present]:
+            self._forget(path)
+
+    def _drain_events(self, timeout):
+        """Wait up to ``timeout`` seconds for inotify events"""
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            if not event.name:
+                continue
+            path = self.directory / event.name
+            if event.mask & self._gone_mask:
+                self._forget(path)
+            else:
+                self._add_candidate(path)
+
+    def check(self, now=None):
+        """
+        Report candidates that stopped changing
+
+        Returns:
+            list: Paths reported in this call
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path, seen in list(self._candidates.items()):
+            try:
+                signature = _signature(path)
+            except FileNotFoundError:
+                del self._candidates[path]
+                continue
+            if self._reported.get(path) == signature:
+                del self._candidates[path]
+                continue
+            if seen is None or seen[0] != signature:
+                self._candidates[path] = (signature, now)
+                continue
+            if now - seen[1] >= self.stable_seconds:
+                del self._candidates[path]
+                self._reported[path] = signature
+                ready.append(path)
+
+        for path in ready:
+            try:
+                self.on_ready(path)
+            except Exception as e:
+                logger.error(f"Watcher callback failed for {path.name}: {e}")
+        return ready
+
+    def run(self):
+        """Watch until stop() is called"""
+        logger.info(f"Watching {self.directory} ({self.mode})")
+        self.scan()
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                # Files still settling are re-checked at least every poll_interval
+                self._drain_events(self.poll_interval)
+            else:
+                self._stop.wait(self.poll_interval)
+                self.scan()
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+
+
+class WatchDaemon:
+    """
+    Long-running ingestion: finished recordings in the audio folder go through the
+    batch pipeline as soon as their patient data is available.
+
+    Patient data comes from a sidecar file next to the recording (``consulta.mp3`` ->
+    ``consulta.json``) with the same fields as a bulk manifest row. Recordings whose
+    hash already has a saved report in the job journal are ignored, so restarting the
+    daemon does not reprocess anything.
+    """
+
+    def __init__(self, system, journal, directory=None, pipeline=None,
+                 stable_seconds=None, poll_interval=None, use_inotify=None):
+        """
+        Initialize watch daemon
+
+        Args:
+            system (VeterinaryTranscription): Processing system
+            journal (JobJournal): Job journal (resume and skip of finished files)
+            directory (Path, optional): Folder to watch (default: config.AUDIO_DIR)
+            pipeline (BatchPipeline, optional): Pipeline (its worker counts bound the concurrency)
+            stable_seconds (float, optional): See FolderWatcher
+            poll_interval (float, optional): See FolderWatcher
+            use_inotify (bool, optional): See FolderWatcher
+        """
+        self.system = system
+        self.journal = journal
+        self.directory = Path(directory or config.AUDIO_DIR)
+        self.pipeline = pipeline or BatchPipeline(system, journal=journal)
+        self.watcher = FolderWatcher(
+            self.directory, self.enqueue, stable_seconds=stable_seconds,
+            poll_interval=poll_interval, use_inotify=use_inotify
+        )
+        # Bounded: a burst of uploads waits here instead of piling up in the pipeline
+        self._queue = queue.Queue(maxsize=self.pipeline.queue_size)
+        # Recordings waiting for their sidecar file -> signature of the sidecar that was rejected
+        # (None while missing); shared by the watcher thread and the main thread
+        self._waiting = {}
+        self._waiting_lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+
+    def _sidecar(self, audio_path):
+        return audio_path.with_suffix(SIDECAR_SUFFIX)
+
+    def _load_patient_info(self, audio_path):
+        """
+        Patient data of a recording
+
+        Returns:
+            tuple: (patient_info or None, signature of the sidecar when it exists but is invalid)
+        """
+        sidecar = self._sidecar(audio_path)
+        signature = None
+        try:
+            signature = _signature(sidecar)
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                return patient_info_from_row(json.load(f)), None
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid patient data in {sidecar.name}: {e}")
+            return None, signature
+
+    def enqueue(self, audio_path):
+        """
+        Queue a finished recording (called by the watcher)
+
+        Args:
+            audio_path (Path): Recording that stopped growing
+        """
+        # Sidecar first: a recording still waiting for it is not hashed again on every retry
+        patient_info, rejected = self._load_patient_info(audio_path)
+        with self._waiting_lock:
+            if patient_info is None:
+                if audio_path not in self._waiting:
+                    logger.info(f"Waiting for patient data ({self._sidecar(audio_path).name}) of {audio_path.name}")
+                self._waiting[audio_path] = rejected
+                return
+            self._waiting.pop(audio_path, None)
+        audio_hash = hash_file(audio_path)
+        if self.journal.is_done(audio_hash):
+            logger.debug(f"Already processed: {audio_path.name}")
+            return
+        item = PipelineItem(patient_info, audio_path=audio_path)
+        item.audio_hash = audio_hash
+        logger.info(f"Queued {audio_path.name}")
+        self._queue.put(item)
+
+    def retry_waiting(self):
+        """Queue recordings whose sidecar has arrived, or changed since it was rejected"""
+        with self._waiting_lock:
+            self._waiting = {path: rejected for path, rejected in self._waiting.items() if path.exists()}
+            ready = []
+            for path, rejected in self._waiting.items():
+                try:
+                    signature = _signature(self._sidecar(path))
+                except FileNotFoundError:
+                    continue
+                if signature != rejected:
+                    ready.append(path)
+            for path in ready:
+                del self._waiting[path]
+        for audio_path in ready:
+            self.enqueue(audio_path)
+
+    def _items(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            yield item
+
+    def _item_done(self, item):
+        if item.succeeded:
+            self._processed += 1
+            if not item.skipped:
+                logger.info(f"Report ready for {item.name}: {item.report_path}")
+        else:
+            self._failed += 1
+
+    def run(self):
+        """Watch and process until interrupted (Ctrl+C)"""
+        pipeline_thread = threading.Thread(
+            target=self.pipeline.run, args=(self._items(),), kwargs={'on_item_done': self._item_done, 'collect': False},
+            name="watch-pipeline", daemon=True
+        )
+        pipeline_thread.start()
+
+        watcher_thread = threading.Thread(target=self.watcher.run, name="folder-watcher", daemon=True)
+        watcher_thread.start()
+        try:
+            while watcher_thread.is_alive():
+                watcher_thread.join(self.watcher.poll_interval)
+                self.retry_waiting()
+        except KeyboardInterrupt:
+            logger.info("Stopping watch daemon")
+        finally:
+            self.watcher.stop()
+            # Items already queued are finished before exiting
+            self._queue.put(None)
+            pipeline_thread.join()
+        return {'processed': self._processed, 'failed': self._failed}
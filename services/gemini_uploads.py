@@ -0,0 +1,231 @@
+"""
+Gemini Uploads Module
+Local manifest of files uploaded to Gemini, with reuse of valid uploads and a background reaper
+"""
+from datetime import datetime, timedelta, timezone
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Uploads expiring within this margin are not reused (transcription may take minutes)
+REUSE_MARGIN = timedelta(minutes=30)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class UploadManifest:
+    """SQLite-backed map of audio content key -> remote Gemini file"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize upload manifest
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.GEMINI_UPLOAD_MANIFEST_DB)
+        """
+        self.db_path = Path(db_path or config.GEMINI_UPLOAD_MANIFEST_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS gemini_uploads (
+                    content_key TEXT PRIMARY KEY,
+                    remote_name TEXT NOT NULL,
+                    uploaded_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    released_at TEXT
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_reusable(self, content_key):
+        """
+        Get the remote file name of a still-valid upload
+
+        Args:
+            content_key (str): Audio content key
+
+        Returns:
+            str or None: Remote file name
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT remote_name, expires_at FROM gemini_uploads "
+                "WHERE content_key = ? AND released_at IS NULL",
+                (content_key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        remote_name, expires_at = row
+        if datetime.fromisoformat(expires_at) - REUSE_MARGIN <= _now():
+            return None
+        return remote_name
+
+    def record(self, content_key, remote_name, expires_at=None):
+        """
+        Record a new upload (replacing any previous one for the same content)
+
+        Args:
+            content_key (str): Audio content key
+            remote_name (str): Remote file name (e.g. "files/abc123")
+            expires_at (datetime, optional): Remote expiry (default: now + GEMINI_UPLOAD_TTL_HOURS)
+        """
+        if expires_at is None:
+            expires_at = _now() + timedelta(hours=config.GEMINI_UPLOAD_TTL_HOURS)
+        elif expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO gemini_uploads "
+                "(content_key, remote_name, uploaded_at, expires_at, released_at) VALUES (?, ?, ?, ?, NULL)",
+                (content_key, remote_name, _now().isoformat(), expires_at.isoformat())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def release(self, content_key):
+        """
+        Mark an upload as no longer needed (its consultation completed)
+
+        Args:
+            content_key (str): Audio content key
+        """
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE gemini_uploads SET released_at = ? WHERE content_key = ? AND released_at IS NULL",
+                (_now().isoformat(), content_key)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def forget(self, content_key):
+        """Remove an entry (e.g. the remote file no longer exists)"""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM gemini_uploads WHERE content_key = ?", (content_key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def due_for_deletion(self):
+        """
+        List uploads that were released or have expired
+
+        Returns:
+            list: (content_key, remote_name) tuples
+        """
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT content_key, remote_name FROM gemini_uploads "
+                "WHERE released_at IS NOT NULL OR expires_at <= ?",
+                (_now().isoformat(),)
+            ).fetchall()
+        finally:
+            conn.close()
+
+
+class UploadReaper:
+    """Background thread deleting remote uploads that are no longer needed"""
+
+    def __init__(self, manifest, delete_file, interval_seconds=None):
+        """
+        Initialize upload reaper
+
+        Args:
+            manifest (UploadManifest): Upload manifest
+            delete_file (callable): Function deleting a remote file by name
+            interval_seconds (float, optional): Seconds between sweeps
+        """
+        self.manifest = manifest
+        self.delete_file = delete_file
+        self.interval_seconds = (
+            config.GEMINI_REAPER_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sweep thread (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="gemini-upload-reaper", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Trigger a sweep now (e.g. right after a consultation completes)"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Gemini upload reaper sweep failed: {e}")
+
+    def sweep(self):
+        """
+        Delete every released or expired upload
+
+        Returns:
+            int: Number of manifest entries removed
+        """
+        removed = 0
+        for content_key, remote_name in self.manifest.due_for_deletion():
+            try:
+                self.delete_file(remote_name)
+                logger.info(f"Deleted Gemini upload {remote_name}")
+            except Exception as e:
+                # Already gone (expired remotely) counts as deleted; keep others for a retry
+                if 'not found' not in str(e).lower() and '404' not in str(e) and '403' not in str(e):
+                    logger.warning(f"Could not delete Gemini upload {remote_name}: {e}")
+                    continue
+            self.manifest.forget(content_key)
+            removed += 1
+        return removed
+
+
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def get_upload_reaper(delete_file):
+    """
+    Get the process-wide reaper, starting it on first use
+
+    Args:
+        delete_file (callable): Function deleting a remote file by name
+
+    Returns:
+        UploadReaper: Running reaper
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = UploadReaper(UploadManifest(), delete_file)
+            _reaper.start()
+        return _reaper
+
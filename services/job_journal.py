@@ -0,0 +1,246 @@
+"""
+Job Journal Module
+Durable record of how far each batch file got, so interrupted batches resume where they stopped
+"""
+from datetime import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+import config
+from services.storage_layout import locate
+
+logger = logging.getLogger(__name__)
+
+# Stages in the order a file reaches them
+JOURNAL_STAGES = ('pending', 'decoded', 'transcribed', 'report_generated', 'saved')
+
+
+def hash_text(text):
+    """
+    Content hash of a transcription supplied as text
+
+    Args:
+        text (str): Transcription text
+
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def hash_patient_info(patient_info):
+    """
+    Hash of the patient information a report was generated with
+
+    Args:
+        patient_info (dict): Patient information
+
+    Returns:
+        str: Hex digest (independent of key order)
+    """
+    return hash_text(json.dumps(patient_info, sort_keys=True, ensure_ascii=False, default=str))
+
+
+class JobEntry:
+    """Journal row of one file"""
+
+    def __init__(self, content_hash, source_name, stage, transcription=None, report=None,
+                 patient_hash=None, report_path=None, error=None, attempts=0, updated_at=None):
+        self.content_hash = content_hash
+        self.source_name = source_name
+        self.stage = stage
+        self.transcription = transcription
+        self.report = report
+        self.patient_hash = patient_hash
+        self.report_path = Path(report_path) if report_path else None
+        self.error = error
+        self.attempts = attempts
+        self.updated_at = updated_at
+
+    def reached(self, stage):
+        """Whether this file already got to (or past) a stage"""
+        return JOURNAL_STAGES.index(self.stage) >= JOURNAL_STAGES.index(stage)
+
+
+class JobJournal:
+    """SQLite journal keyed by file content hash"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize job journal
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.JOB_JOURNAL_DB)
+        """
+        self.db_path = Path(db_path or config.JOB_JOURNAL_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    content_hash TEXT PRIMARY KEY,
+                    source_name TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    transcription TEXT,
+                    report TEXT,
+                    patient_hash TEXT,
+                    report_path TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, content_hash):
+        """
+        Get the journal entry of a file
+
+        Args:
+            content_hash (str): SHA-256 of the file (or of the transcription text)
+
+        Returns:
+            JobEntry or None: Entry, if the file was seen before
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT content_hash, source_name, stage, transcription, report, patient_hash, report_path, "
+                "error, attempts, updated_at FROM batch_jobs WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return JobEntry(*row) if row else None
+
+    def is_done(self, content_hash):
+        """
+        Whether a file already has a saved report that still exists on disk
+
+        Args:
+            content_hash (str): SHA-256 of the file
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        entry = self.get(content_hash)
+        # The report may have moved to another layout since (services.storage_layout)
+        return bool(entry and entry.stage == 'saved' and entry.report_path and locate(entry.report_path))
+
+    def start(self, content_hash, source_name, force=False):
+        """
+        Register an attempt at a file
+
+        Args:
+            content_hash (str): SHA-256 of the file
+            source_name (str): File name (for humans reading the journal)
+            force (bool): Discard previous progress and start from scratch
+
+        Returns:
+            JobEntry: Entry to resume from
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connect()
+            try:
+                if force:
+                    conn.execute("DELETE FROM batch_jobs WHERE content_hash = ?", (content_hash,))
+                conn.execute(
+                    "INSERT INTO batch_jobs (content_hash, source_name, stage, attempts, updated_at) "
+                    "VALUES (?, ?, 'pending', 1, ?) "
+                    "ON CONFLICT(content_hash) DO UPDATE SET "
+                    "source_name = excluded.source_name, attempts = attempts + 1, "
+                    "error = NULL, updated_at = excluded.updated_at",
+                    (content_hash, source_name, now)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        return self.get(content_hash)
+
+    def advance(self, content_hash, stage, transcription=None, report=None, patient_hash=None,
+                report_path=None):
+        """
+        Record that a file reached a stage (never moves an entry backwards)
+
+        Args:
+            content_hash (str): SHA-256 of the file
+            stage (str): One of JOURNAL_STAGES
+            transcription (str, optional): Transcription text (stored at 'transcribed')
+            report (str, optional): Report text (stored at 'report_generated')
+            patient_hash (str, optional): hash_patient_info() of the patient information the
+                report was generated with (stored with the report)
+            report_path (Path, optional): Saved report (stored at 'saved')
+        """
+        if stage not in JOURNAL_STAGES:
+            raise ValueError(f"Unknown journal stage: {stage}")
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT stage FROM batch_jobs WHERE content_hash = ?", (content_hash,)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"Journal entry {content_hash[:12]} missing; stage '{stage}' not recorded")
+                    return
+                new_stage = max(row[0], stage, key=JOURNAL_STAGES.index)
+                conn.execute(
+                    "UPDATE batch_jobs SET stage = ?, "
+                    "transcription = COALESCE(?, transcription), report = COALESCE(?, report), "
+                    "patient_hash = COALESCE(?, patient_hash), "
+                    "report_path = COALESCE(?, report_path), error = NULL, updated_at = ? "
+                    "WHERE content_hash = ?",
+                    (new_stage, transcription, report, patient_hash, str(report_path) if report_path else None,
+                     datetime.now().isoformat(), content_hash)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def fail(self, content_hash, error):
+        """
+        Record the error of the last attempt (progress so far is kept)
+
+        Args:
+            content_hash (str): SHA-256 of the file
+            error (str): Error message
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE batch_jobs SET error = ?, updated_at = ? WHERE content_hash = ?",
+                    (error, datetime.now().isoformat(), content_hash)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def summary(self):
+        """
+        Count entries per stage
+
+        Returns:
+            dict: Stage -> number of files (plus 'failed' for entries with an error)
+        """
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT stage, COUNT(*) FROM batch_jobs GROUP BY stage").fetchall())
+            failed = conn.execute("SELECT COUNT(*) FROM batch_jobs WHERE error IS NOT NULL").fetchone()[0]
+        finally:
+            conn.close()
+        return {**{stage: counts.get(stage, 0) for stage in JOURNAL_STAGES}, 'failed': failed}
@@ -0,0 +1,276 @@
+"""
+Job Queue Module
+Background processing of consultations submitted from the web interface
+"""
+from datetime import datetime
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobStore:
+    """SQLite store of submitted jobs and their progress (shared by every browser session)"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize job store
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.JOB_STORE_DB)
+        """
+        self.db_path = Path(db_path or config.JOB_STORE_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    owner TEXT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    payload TEXT NOT NULL,
+                    report_path TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs(owner, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def create(self, kind, payload, owner=None):
+        """
+        Register a new queued job
+
+        Args:
+            kind (str): 'audio' or 'text'
+            payload (dict): JSON-serializable job arguments
+            owner (str, optional): Username that submitted the job
+
+        Returns:
+            str: Job id
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, owner, kind, status, payload, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, owner, kind, json.dumps(payload, ensure_ascii=False, default=str),
+                 datetime.now().isoformat())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Get a job
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict or None: Job fields (payload decoded)
+        """
+        conn = self._connect()
+        try:
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+        finally:
+            conn.close()
+
+    def update(self, job_id, **fields):
+        """
+        Update job fields (status, stage, progress, message, report_path, error, ...)
+
+        Args:
+            job_id (str): Job id
+            **fields: Columns to set
+        """
+        if not fields:
+            return
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        values = [str(v) if isinstance(v, Path) else v for v in fields.values()]
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*values, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def list_jobs(self, owner=None, statuses=None, limit=20):
+        """
+        List the most recent jobs
+
+        Args:
+            owner (str, optional): Only jobs of this user
+            statuses (tuple, optional): Only jobs in these statuses
+            limit (int): Maximum number of jobs
+
+        Returns:
+            list: Job dicts, newest first
+        """
+        query = "SELECT * FROM jobs WHERE 1=1"
+        params = []
+        if owner is not None:
+            query += " AND owner = ?"
+            params.append(owner)
+        if statuses:
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        conn = self._connect()
+        try:
+            return [self._to_dict(row) for row in conn.execute(query, params).fetchall()]
+        finally:
+            conn.close()
+
+    def unfinished(self):
+        """Jobs that were queued or running when the server stopped, oldest first"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._to_dict(row) for row in rows]
+
+
+class JobQueue:
+    """
+    Worker threads running submitted jobs outside the Streamlit script run.
+
+    ``runner(job, report_progress)`` does the work and returns the report path;
+    ``report_progress(stage, progress, message)`` stores progress for the UI to poll.
+    """
+
+    def __init__(self, store, runner, workers=None):
+        """
+        Initialize job queue
+
+        Args:
+            store (JobStore): Job store
+            runner (callable): Function executing one job
+            workers (int, optional): Concurrent jobs (default: config.JOB_WORKERS)
+        """
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers or config.JOB_WORKERS)
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def start(self):
+        """Start the workers and re-queue jobs interrupted by a restart (idempotent)"""
+        if self._threads:
+            return
+        for job in self.store.unfinished():
+            logger.info(f"Re-queuing interrupted job {job['job_id']}")
+            self.store.update(job['job_id'], status='queued', message='Retomado após reinício')
+            self._queue.put(job['job_id'])
+        for n in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, kind, payload, owner=None):
+        """
+        Queue a job and return immediately
+
+        Args:
+            kind (str): 'audio' or 'text'
+            payload (dict): Job arguments
+            owner (str, optional): Username
+
+        Returns:
+            str: Job id
+        """
+        job_id = self.store.create(kind, payload, owner)
+        self._queue.put(job_id)
+        logger.info(f"Job {job_id} queued ({kind})")
+        return job_id
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            job = self.store.get(job_id)
+            if job is None or job['status'] not in ACTIVE_STATUSES:
+                continue
+            self.store.update(job_id, status='running', started_at=datetime.now().isoformat(),
+                              message='Iniciando...')
+
+            def report_progress(stage, progress, message=None, _job_id=job_id):
+                self.store.update(_job_id, stage=stage, progress=progress, message=message)
+
+            try:
+                report_path = self.runner(job, report_progress)
+                self.store.update(
+                    job_id, status='done', progress=1.0, report_path=report_path,
+                    message='Concluído', finished_at=datetime.now().isoformat()
+                )
+                logger.info(f"Job {job_id} done")
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+                self.store.update(
+                    job_id, status='failed', error=str(e), message='Erro',
+                    finished_at=datetime.now().isoformat()
+                )
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(runner):
+    """
+    Get the process-wide job queue, starting it on first use
+
+    Args:
+        runner (callable): Function executing one job (used on first call only)
+
+    Returns:
+        JobQueue: Running queue
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(JobStore(), runner)
+            _job_queue.start()
+        return _job_queue
@@ -0,0 +1,123 @@
+"""
+LLM Cache Module
+On-disk cache of LLM responses keyed by the fully rendered request (provider, model, sampling
+settings and prompt), with a TTL and size-bounded LRU eviction
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import config
+from utils import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Stores LLM responses so an identical request is answered without calling the provider"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl_seconds=None):
+        """
+        Initialize response cache
+
+        Args:
+            cache_dir (Path, optional): Cache directory (default: config.LLM_CACHE_DIR)
+            max_bytes (int, optional): Size limit before LRU eviction (default: config.LLM_CACHE_MAX_MB)
+            ttl_seconds (float, optional): Age after which an entry is ignored and removed
+                (default: config.LLM_CACHE_TTL_HOURS)
+        """
+        self.cache_dir = Path(cache_dir or config.LLM_CACHE_DIR)
+        self.max_bytes = int(config.LLM_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.ttl_seconds = config.LLM_CACHE_TTL_HOURS * 3600 if ttl_seconds is None else ttl_seconds
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider, model, temperature, max_tokens, prompt, system_prompt=None):
+        """
+        Build the cache key of a request
+
+        Args:
+            provider (str): LLM provider
+            model (str): Model name
+            temperature (float or None): Sampling temperature (None: provider default)
+            max_tokens (int or None): Output limit (None: provider default)
+            prompt (str): Fully rendered prompt (cacheable prefix included)
+            system_prompt (str, optional): System instructions
+
+        Returns:
+            str: Hex cache key
+        """
+        payload = json.dumps({
+            'provider': provider,
+            'model': model,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'system': system_prompt,
+            'prompt': prompt,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Get a cached response
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict or None: 'text', 'usage' (of the original call) and 'cached_at'; None if
+            missing or older than the TTL
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if time.time() - entry.get('cached_at', 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+
+        # Touch for LRU ordering
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, text, usage=None):
+        """
+        Store a response
+
+        Args:
+            key (str): Cache key
+            text (str): Response text
+            usage (dict, optional): Token usage of the call that produced it
+        """
+        entry = {'text': text, 'usage': usage, 'cached_at': time.time()}
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: pipeline workers may store the same key at once
+        tmp_path = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write LLM cache entry: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        evict_lru_files(self.cache_dir, "*/*.json", self.max_bytes)
@@ -1,16 +1,213 @@
 import logging
+import string
+import threading
+import time
 import google.generativeai as genai
 import config
 from abc import ABC, abstractmethod
+from services.llm_cache import ResponseCache
 from utils import retry_with_backoff
 
+# Início da parte variável dos templates de prompt (dados da consulta + transcrição)
+PROMPT_DATA_MARKER = "=== DADOS DA CONSULTA ==="
+
+
+def split_prompt_template(template, marker=PROMPT_DATA_MARKER):
+    """
+    Separa um template em prefixo fixo (instruções, cacheável) e template da parte variável
+
+    O prefixo vai idêntico em todas as chamadas, então os provedores podem reaproveitá-lo
+    (prompt caching). Templates sem o marcador, ou com campos antes dele, não são separados.
+
+    Args:
+        template (str): Template com campos {nome}
+        marker (str): Linha que abre a parte variável
+
+    Returns:
+        tuple: (prefixo: str, possivelmente vazio; template da parte variável: str)
+    """
+    index = template.find(marker)
+    if index <= 0:
+        return "", template
+    prefix = template[:index]
+    if any(field is not None for _, field, _, _ in string.Formatter().parse(prefix)):
+        return "", template
+    return prefix.format(), template[index:]
+
+
 class LLMService(ABC):
+    provider = None
+    model_name = None
+    # Parâmetros de amostragem (entram na chave do cache de respostas; None = padrão do provedor)
+    temperature = None
+    max_tokens = None
+
+    def __init__(self, response_cache=None):
+        """
+        Args:
+            response_cache (ResponseCache, opcional): Cache de respostas em disco
+                (padrão: um ResponseCache em config.LLM_CACHE_DIR, se config.LLM_CACHE_ENABLED)
+        """
+        # Uso por thread: o serviço é compartilhado pelos workers do pipeline
+        self._local = threading.local()
+        if response_cache is None and config.LLM_CACHE_ENABLED:
+            response_cache = ResponseCache()
+        self.response_cache = response_cache
+
     @abstractmethod
-    def generate_report(self, prompt: str, system_prompt: str = None) -> str:
+    def _generate(self, prompt: str, system_prompt: str = None, prefix: str = None) -> str:
+        """Chamada ao provedor (resposta inteira); registra o uso com _record_usage"""
         pass
 
+    def generate_report(self, prompt: str, system_prompt: str = None, prefix: str = None,
+                        use_cache: bool = True) -> str:
+        """
+        Gera o texto de uma chamada
+
+        Args:
+            prompt (str): Parte variável do prompt
+            system_prompt (str, opcional): Instruções de sistema
+            prefix (str, opcional): Início fixo do prompt (enviado antes de prompt e marcado
+                para cache no provedor; ver split_prompt_template)
+            use_cache (bool): Responder do cache de respostas se a mesma requisição já foi feita;
+                False sempre chama o provedor (ação "Gerar novamente") e atualiza o cache
+        """
+        self._local.usage = None
+        key = self._cache_key(prompt, system_prompt, prefix)
+        cached = self._cached_response(key, use_cache)
+        if cached is not None:
+            return cached
+        text = self._generate(prompt, system_prompt, prefix)
+        self._store_response(key, text)
+        return text
+
+    def generate_report_stream(self, prompt: str, system_prompt: str = None, prefix: str = None,
+                               use_cache: bool = True):
+        """
+        Gera o relatório em partes, à medida que o modelo responde
+
+        Falhas antes do primeiro trecho são repetidas com backoff (nada foi entregue ainda);
+        depois dele, o erro é propagado. O uso de tokens fica em last_usage e o tempo até o
+        primeiro trecho em last_ttft quando o iterador termina. prefix e use_cache: como em
+        generate_report (uma resposta do cache vem em um único trecho).
+
+        Yields:
+            str: Trechos de texto (concatenados formam o relatório completo)
+        """
+        self._local.usage = None
+        self._local.ttft = None
+        start = time.perf_counter()
+        key = self._cache_key(prompt, system_prompt, prefix)
+        cached = self._cached_response(key, use_cache)
+        if cached is not None:
+            self._local.ttft = time.perf_counter() - start
+            yield cached
+            return
+        first, chunks = self._start_stream(prompt, system_prompt, prefix)
+        if first is None:
+            return
+        self._local.ttft = time.perf_counter() - start
+        parts = [first]
+        yield first
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        # Só respostas completas vão para o cache
+        self._store_response(key, "".join(parts))
+
+    def _cache_key(self, prompt, system_prompt, prefix):
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(
+            self.provider, self.model_name, self.temperature, self.max_tokens, (prefix or "") + prompt,
+            system_prompt
+        )
+
+    def _cached_response(self, key, use_cache):
+        if key is None or not use_cache:
+            return None
+        entry = self.response_cache.get(key)
+        if entry is None:
+            return None
+        # Nenhuma chamada ao provedor: entra no registro de uso sem tokens
+        self._record_usage(0, 0)
+        self._local.usage['cached_response'] = True
+        logging.info(f"Resposta do LLM servida do cache ({self.provider}/{self.model_name})")
+        return entry['text']
+
+    def _store_response(self, key, text):
+        if key is not None and text:
+            self.response_cache.put(key, text, usage=self.last_usage)
+
+    @retry_with_backoff(max_retries=3)
+    def _start_stream(self, prompt, system_prompt, prefix):
+        chunks = self._stream(prompt, system_prompt, prefix)
+        # A requisição acontece no primeiro next()
+        return next(chunks, None), chunks
+
+    def _stream(self, prompt, system_prompt=None, prefix=None):
+        """Trechos não vazios da resposta (padrão: resposta inteira de uma vez)"""
+        text = self._generate(prompt, system_prompt, prefix)
+        if text:
+            yield text
+
+    @property
+    def last_usage(self):
+        """Uso de tokens da última chamada feita nesta thread (None se indisponível)"""
+        return getattr(self._local, 'usage', None)
+
+    @property
+    def last_ttft(self):
+        """Segundos até o primeiro trecho da última chamada em streaming nesta thread"""
+        return getattr(self._local, 'ttft', None)
+
+    def _record_usage(self, input_tokens, output_tokens, cached_input_tokens=0, cache_write_tokens=0):
+        # input_tokens inclui os tokens lidos do cache e os gravados nele
+        self._local.usage = {
+            'provider': self.provider,
+            'model': self.model_name,
+            'input_tokens': int(input_tokens or 0),
+            'output_tokens': int(output_tokens or 0),
+            'cached_input_tokens': int(cached_input_tokens or 0),
+            'cache_write_tokens': int(cache_write_tokens or 0),
+        }
+
+
+def estimate_cost(usage, prices=None):
+    """
+    Estima o custo (USD) de uma chamada a partir da tabela de preços
+
+    Tokens lidos do cache de prompt e gravados nele usam os fatores de
+    config.PROMPT_CACHE_PRICE_FACTORS do provedor.
+
+    Args:
+        usage (dict): Uso retornado por LLMService.last_usage
+        prices (dict, opcional): Tabela modelo -> (entrada, saída) por milhão de tokens
+            (padrão: config.LLM_PRICES)
+
+    Returns:
+        float or None: Custo estimado, ou None se o modelo não tiver preço configurado
+    """
+    if not usage:
+        return None
+    prices = (config.LLM_PRICES if prices is None else prices).get(usage.get('model'))
+    if prices is None:
+        return None
+    input_price, output_price = prices
+    cached = usage.get('cached_input_tokens') or 0
+    written = usage.get('cache_write_tokens') or 0
+    read_factor, write_factor = config.PROMPT_CACHE_PRICE_FACTORS.get(usage.get('provider'), (1.0, 1.0))
+    input_cost = (usage['input_tokens'] - cached - written + cached * read_factor + written * write_factor) * input_price
+    return (input_cost + usage['output_tokens'] * output_price) / 1_000_000
+
 class ClaudeLLMService(LLMService):
+    provider = "anthropic_claude"
+    model_name = config.CLAUDE_MODEL
+    temperature = 0.3
+    max_tokens = 4000
+
     def __init__(self, api_key=config.ANTHROPIC_API_KEY):
+        super().__init__()
         # Importação tardia para evitar dependência hardcoded
         try:
             import anthropic
@@ -21,44 +218,125 @@ class ClaudeLLMService(LLMService):
             raise ValueError("ANTHROPIC_API_KEY não configurada")
         self.client = anthropic.Anthropic(api_key=api_key)
 
+    @staticmethod
+    def _content(prompt, prefix=None):
+        if not prefix:
+            return prompt
+        # Prefixo fixo marcado para o cache de prompt (reaproveitado por ~5 min entre chamadas)
+        return [
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt},
+        ]
+
+    def _record_message_usage(self, usage):
+        if usage is None:
+            return
+        # input_tokens da API não inclui os tokens lidos do cache nem os gravados nele
+        cached = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        written = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        self._record_usage(
+            (getattr(usage, 'input_tokens', 0) or 0) + cached + written,
+            getattr(usage, 'output_tokens', 0),
+            cached_input_tokens=cached,
+            cache_write_tokens=written
+        )
+
     @retry_with_backoff(max_retries=3)
-    def generate_report(self, prompt: str, system_prompt: str = None) -> str:
+    def _generate(self, prompt: str, system_prompt: str = None, prefix: str = None) -> str:
+        self._local.usage = None
         try:
             message = self.client.messages.create(
-                model="claude-sonnet-4-20250514", # Usando o modelo definido no código original
-                max_tokens=4000,
-                temperature=0.3,
+                model=self.model_name,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
                 messages=[
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": self._content(prompt, prefix)
                     }
                 ]
             )
+            self._record_message_usage(getattr(message, 'usage', None))
             return message.content[0].text
         except Exception as e:
             logging.error(f"Erro Claude API: {e}")
             raise
 
+    def _stream(self, prompt, system_prompt=None, prefix=None):
+        try:
+            with self.client.messages.stream(
+                model=self.model_name,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": self._content(prompt, prefix)
+                    }
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    if text:
+                        yield text
+                usage = getattr(stream.get_final_message(), 'usage', None)
+            self._record_message_usage(usage)
+        except Exception as e:
+            logging.error(f"Erro Claude API (streaming): {e}")
+            raise
+
 class GeminiLLMService(LLMService):
+    provider = "google_gemini"
+    model_name = config.GEMINI_MODEL_PRO
+
     def __init__(self, api_key=config.GOOGLE_API_KEY):
+        super().__init__()
         if not api_key:
             raise ValueError("GOOGLE_API_KEY não configurada")
         genai.configure(api_key=api_key)
         # Usando Pro para melhor raciocínio na geração de relatórios
-        self.model = genai.GenerativeModel(config.GEMINI_MODEL_PRO) 
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _record_response_usage(self, usage):
+        if usage is None:
+            return
+        # Cache implícito: prompt_token_count já inclui os tokens do prefixo reaproveitado
+        self._record_usage(
+            getattr(usage, 'prompt_token_count', 0),
+            getattr(usage, 'candidates_token_count', 0),
+            cached_input_tokens=getattr(usage, 'cached_content_token_count', 0)
+        )
 
     @retry_with_backoff(max_retries=3)
-    def generate_report(self, prompt: str, system_prompt: str = None) -> str:
+    def _generate(self, prompt: str, system_prompt: str = None, prefix: str = None) -> str:
+        self._local.usage = None
         try:
             # Gemini não usa system prompt separado da mesma forma que Claude em chamadas simples,
             # mas podemos concatenar ou usar config se necessário. Aqui vamos direto.
-            response = self.model.generate_content(prompt)
+            # O prefixo fixo vai primeiro: o cache implícito dos modelos 2.5 reaproveita inícios
+            # de prompt idênticos (o prefixo é pequeno demais para o cache explícito)
+            response = self.model.generate_content((prefix or "") + prompt)
+            self._record_response_usage(getattr(response, 'usage_metadata', None))
             return response.text
         except Exception as e:
             logging.error(f"Erro Gemini API: {e}")
             raise
 
+    def _stream(self, prompt, system_prompt=None, prefix=None):
+        try:
+            response = self.model.generate_content((prefix or "") + prompt, stream=True)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Trecho sem partes de texto (ex: só metadados)
+                    continue
+                if text:
+                    yield text
+            self._record_response_usage(getattr(response, 'usage_metadata', None))
+        except Exception as e:
+            logging.error(f"Erro Gemini API (streaming): {e}")
+            raise
+
 def get_llm_service():
     provider = config.LLM_PROVIDER
     
@@ -0,0 +1,231 @@
+"""
+Model Registry Module
+Process-wide cache of loaded Whisper models shared across service instances
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import threading
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident size (MB) of each Whisper checkpoint, used when the
+# loaded model does not expose its parameters (e.g. test doubles)
+APPROX_MODEL_SIZE_MB = {
+    'tiny': 75,
+    'base': 145,
+    'small': 480,
+    'medium': 1500,
+    'large': 3000,
+    'turbo': 1600,
+}
+
+
+def _default_loader(model_name, device):
+    """Load a Whisper model (imported lazily so the registry has no hard dependency)"""
+    import whisper
+    return whisper.load_model(model_name, device=device)
+
+
+def _estimate_model_mb(model, model_name):
+    """
+    Estimate the memory footprint of a loaded model
+
+    Args:
+        model: Loaded model object
+        model_name (str): Whisper model name
+
+    Returns:
+        float: Estimated size in MB
+    """
+    try:
+        total_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        if total_bytes > 0:
+            return total_bytes / (1024 * 1024)
+    except Exception:
+        pass
+    base_name = model_name.split('.')[0].split('-')[0]
+    return float(APPROX_MODEL_SIZE_MB.get(base_name, APPROX_MODEL_SIZE_MB['large']))
+
+
+class _ModelEntry:
+    """Bookkeeping for one loaded model"""
+
+    def __init__(self):
+        self.model = None
+        self.size_mb = 0.0
+        self.refcount = 0
+        self.load_lock = threading.Lock()
+
+
+class WhisperModelRegistry:
+    """Reference-counted registry of Whisper models keyed by (model name, device)"""
+
+    def __init__(self, loader=None, memory_budget_mb=None):
+        """
+        Initialize model registry
+
+        Args:
+            loader (callable, optional): Function (model_name, device) -> model
+            memory_budget_mb (float, optional): Memory budget for loaded models
+        """
+        self._loader = loader or _default_loader
+        self.memory_budget_mb = (
+            config.WHISPER_MODEL_MEMORY_BUDGET_MB if memory_budget_mb is None else memory_budget_mb
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'loads': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def acquire(self, model_name, device=None):
+        """
+        Get a loaded model, loading it on first use, and take a reference
+
+        Args:
+            model_name (str): Whisper model name
+            device (str, optional): Torch device
+
+        Returns:
+            Loaded Whisper model
+        """
+        key = (model_name, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _ModelEntry()
+                self._entries[key] = entry
+            entry.refcount += 1
+            self._entries.move_to_end(key)
+
+        try:
+            # Per-key lock: concurrent sessions asking for the same model wait for a
+            # single load instead of each loading their own copy
+            with entry.load_lock:
+                if entry.model is not None:
+                    with self._lock:
+                        self._counters['hits'] += 1
+                    return entry.model
+
+                with self._lock:
+                    self._counters['misses'] += 1
+                logger.info(f"Loading Whisper model '{model_name}' (device={device or 'auto'})")
+                model = self._loader(model_name, device)
+                size_mb = _estimate_model_mb(model, model_name)
+
+                with self._lock:
+                    entry.model = model
+                    entry.size_mb = size_mb
+                    self._counters['loads'] += 1
+                    self._evict_idle_locked()
+                return model
+        except Exception:
+            with self._lock:
+                entry.refcount -= 1
+                if entry.model is None and entry.refcount == 0:
+                    self._entries.pop(key, None)
+            raise
+
+    def release(self, model_name, device=None):
+        """
+        Drop a reference taken with acquire()
+
+        Args:
+            model_name (str): Whisper model name
+            device (str, optional): Torch device
+        """
+        key = (model_name, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                logger.warning(f"Release without acquire for model {key}")
+                return
+            entry.refcount -= 1
+            self._evict_idle_locked()
+
+    @contextmanager
+    def lease(self, model_name, device=None):
+        """
+        Context manager holding a model reference for the duration of a block
+
+        Args:
+            model_name (str): Whisper model name
+            device (str, optional): Torch device
+
+        Yields:
+            Loaded Whisper model
+        """
+        model = self.acquire(model_name, device)
+        try:
+            yield model
+        finally:
+            self.release(model_name, device)
+
+    def _evict_idle_locked(self):
+        """Unload least-recently-used idle models until within budget (caller holds lock)"""
+        total_mb = sum(e.size_mb for e in self._entries.values() if e.model is not None)
+        if total_mb <= self.memory_budget_mb:
+            return
+
+        for key in list(self._entries.keys()):
+            if total_mb <= self.memory_budget_mb:
+                break
+            entry = self._entries[key]
+            if entry.refcount > 0 or entry.model is None:
+                continue
+            total_mb -= entry.size_mb
+            del self._entries[key]
+            self._counters['evictions'] += 1
+            logger.info(f"Evicted idle Whisper model {key} ({entry.size_mb:.0f} MB)")
+
+    def evict_idle(self):
+        """
+        Unload every model that is not currently in use
+
+        Returns:
+            int: Number of models evicted
+        """
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if e.refcount == 0 and e.model is not None]
+            for key in idle:
+                del self._entries[key]
+            self._counters['evictions'] += len(idle)
+        return len(idle)
+
+    def stats(self):
+        """
+        Get registry counters and loaded models
+
+        Returns:
+            dict: Counters plus per-model refcount and size
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                'memory_mb': sum(e.size_mb for e in self._entries.values() if e.model is not None),
+                'memory_budget_mb': self.memory_budget_mb,
+                'models': {
+                    f"{name}@{device or 'auto'}": {'refcount': e.refcount, 'size_mb': e.size_mb}
+                    for (name, device), e in self._entries.items()
+                    if e.model is not None
+                },
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Get the process-wide model registry (survives Streamlit reruns and sessions)
+
+    Returns:
+        WhisperModelRegistry: Shared registry instance
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = WhisperModelRegistry()
+        return _registry
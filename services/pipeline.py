@@ -0,0 +1,400 @@
+"""
+Batch Pipeline Module
+Staged, concurrent processing of consultations: decode -> transcribe -> report -> save
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import config
+from services.job_journal import hash_patient_info, hash_text
+from services.llm_service import estimate_cost
+from services.report_index import report_metrics
+from services.transcription_cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('decode', 'transcribe', 'report', 'save')
+
+_STOP = object()
+
+
+class PipelineItem:
+    """One consultation flowing through the pipeline"""
+
+    def __init__(self, patient_info, audio_path=None, transcription_text=None, source_name=None):
+        """
+        Initialize pipeline item
+
+        Args:
+            patient_info (dict): Validated patient information
+            audio_path (Path, optional): Audio recording to transcribe
+            transcription_text (str, optional): Existing transcription (skips decode and transcribe)
+            source_name (str, optional): Name used in the report file name
+        """
+        if audio_path is None and transcription_text is None:
+            raise ValueError("PipelineItem requires audio_path or transcription_text")
+        self.patient_info = patient_info
+        self.audio_path = Path(audio_path) if audio_path is not None else None
+        self.transcription_text = transcription_text
+        self.source_name = source_name or (self.audio_path.stem if self.audio_path else "transcrição_manual")
+        self.audio_hash = None
+        self.transcription = None
+        self.report = None
+        self.usage = None
+        # Links the provider calls of this item in the usage ledger
+        self.consultation_id = uuid.uuid4().hex
+        self.report_path = None
+        self.error = None
+        self.failed_stage = None
+        self.skipped = False
+        self.resumed_from = None
+        self.timings = {}
+
+    @property
+    def name(self):
+        return self.audio_path.name if self.audio_path else self.source_name
+
+    @property
+    def succeeded(self):
+        return self.report_path is not None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'audio_file': str(self.audio_path) if self.audio_path else None,
+            'audio_sha256': self.audio_hash,
+            'report_path': str(self.report_path) if self.report_path else None,
+            'error': self.error,
+            'failed_stage': self.failed_stage,
+            'skipped': self.skipped,
+            'resumed_from': self.resumed_from,
+            'usage': self.usage,
+            'cost_usd': estimate_cost(self.usage),
+            'timings': {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+        }
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, start, end, ok):
+        with self._lock:
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self.busy_seconds += end - start
+            self.first_start = start if self.first_start is None else min(self.first_start, start)
+            self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def to_dict(self):
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        done = self.processed + self.failed
+        return {
+            'workers': self.workers,
+            'processed': self.processed,
+            'failed': self.failed,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'wall_seconds': round(wall, 3),
+            'avg_seconds': round(self.busy_seconds / done, 3) if done else 0.0,
+            'items_per_minute': round(self.processed * 60 / wall, 2) if wall > 0 else 0.0,
+            # Fraction of the stage's worker capacity that was in use
+            'utilization': round(self.busy_seconds / (wall * self.workers), 3) if wall > 0 else 0.0,
+        }
+
+
+# ============================================================================
+# Transcription in worker processes (Whisper is CPU-bound)
+# ============================================================================
+
+_worker_system = None
+
+
+def _init_transcription_worker(system_factory, threads_per_worker):
+    """Build one processing system per worker process (model loaded once per worker)"""
+    global _worker_system
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    _worker_system = system_factory()
+
+
+def _transcribe_in_worker(audio_path, consultation_id=None):
+    return _worker_system.transcribe_audio(Path(audio_path), consultation_id=consultation_id)
+
+
+class BatchPipeline:
+    """
+    Runs consultations through bounded queues between stages, each stage with its own
+    concurrency limit. A full queue blocks the previous stage (backpressure), so decoded
+    audio never piles up ahead of a slow transcription or LLM stage.
+    """
+
+    def __init__(self, system, decode_workers=None, transcribe_workers=None, report_workers=None,
+                 queue_size=None, use_processes=None, system_factory=None, journal=None, force=False):
+        """
+        Initialize batch pipeline
+
+        Args:
+            system (VeterinaryTranscription): Processing system (ingestion, transcription, LLM, saving)
+            decode_workers (int, optional): Concurrent decodes
+            transcribe_workers (int, optional): Concurrent transcriptions
+            report_workers (int, optional): Concurrent LLM calls
+            queue_size (int, optional): Items allowed to wait between two stages
+            use_processes (bool, optional): Transcribe in worker processes
+                (default: True for local Whisper, False for API providers)
+            system_factory (callable, optional): Builds a system inside each worker process
+                (default: type(system))
+            journal (JobJournal, optional): Records the stage each file reached, so a rerun
+                resumes there and files with a saved report are skipped
+            force (bool): Reprocess files even if the journal has a saved report for them
+        """
+        self.system = system
+        self.workers = {
+            'decode': max(1, decode_workers or config.PIPELINE_DECODE_WORKERS),
+            'transcribe': max(1, transcribe_workers or config.PIPELINE_TRANSCRIBE_WORKERS),
+            'report': max(1, report_workers or config.PIPELINE_REPORT_WORKERS),
+            # Saving is cheap and keeps report file names ordered
+            'save': 1,
+        }
+        self.queue_size = max(1, queue_size or config.PIPELINE_QUEUE_SIZE)
+        if use_processes is None:
+            use_processes = config.TRANSCRIPTION_PROVIDER != 'google_gemini'
+        self.use_processes = use_processes
+        self.system_factory = system_factory or type(system)
+        self.journal = journal
+        self.force = force
+        self.stats = {}
+        self._pool = None
+
+    # ------------------------------------------------------------------
+    # Stage functions
+    # ------------------------------------------------------------------
+
+    def _decode(self, item):
+        if self.journal is not None:
+            self._resume(item)
+            if item.skipped:
+                return
+        if item.audio_path is not None and item.transcription_text is None:
+            try:
+                ingested = self.system.audio_ingestor.load(item.audio_path, item.audio_hash)
+                item.audio_hash = ingested.audio_hash
+            except RuntimeError as e:
+                # The provider still receives the original file
+                logger.warning(f"Could not decode {item.name}: {e}")
+        self._checkpoint(item, 'decoded')
+
+    def _transcribe(self, item):
+        if item.transcription_text is None:
+            if self._pool is not None:
+                item.transcription = self._pool.submit(
+                    _transcribe_in_worker, str(item.audio_path), item.consultation_id
+                ).result()
+            else:
+                item.transcription = self.system.transcribe_audio(item.audio_path, consultation_id=item.consultation_id)
+            item.transcription_text = item.transcription['text']
+        self._checkpoint(item, 'transcribed', transcription=item.transcription_text)
+
+    def _report(self, item):
+        if item.report is None:
+            item.report = self.system.generate_report(
+                item.transcription_text, item.patient_info, consultation_id=item.consultation_id
+            )
+            # Read in the calling thread, so this is the usage of this generation
+            item.usage = self.system.llm_service.last_usage
+        self._checkpoint(item, 'report_generated', report=item.report,
+                         patient_hash=hash_patient_info(item.patient_info))
+
+    def _save(self, item):
+        item.report_path = self.system.save_report(
+            item.report, item.patient_info['paciente_nome'], item.source_name,
+            transcription=item.transcription_text, patient_info=item.patient_info,
+            metrics=report_metrics(
+                item.usage,
+                # Stages skipped by a resume (or a text item) did no work worth timing
+                transcription_seconds=(
+                    item.timings.get('transcribe') if item.audio_path is not None and item.resumed_from is None
+                    else None
+                ),
+                report_seconds=item.timings.get('report') if item.resumed_from != 'report_generated' else None
+            ),
+            consultation_id=item.consultation_id
+        )
+        self._checkpoint(item, 'saved', report_path=item.report_path)
+        if item.audio_path is not None:
+            self.system.transcription_service.consultation_finished(item.audio_path)
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+
+    def _resume(self, item):
+        """Skip a file already saved, or pick up the transcription/report of a previous attempt"""
+        if item.audio_hash is None:
+            item.audio_hash = (
+                hash_file(item.audio_path) if item.audio_path is not None
+                else hash_text(item.transcription_text)
+            )
+        if not self.force and self.journal.is_done(item.audio_hash):
+            item.skipped = True
+            item.report_path = self.journal.get(item.audio_hash).report_path
+            logger.info(f"Skipping {item.name}: report already saved at {item.report_path.name}")
+            return
+
+        entry = self.journal.start(item.audio_hash, item.name, force=self.force)
+        if entry.reached('transcribed') and entry.transcription is not None:
+            item.transcription_text = entry.transcription
+            item.resumed_from = 'transcribed'
+        if entry.reached('report_generated') and entry.report is not None:
+            # A report generated with other patient information (corrected manifest row) is redone
+            if entry.patient_hash == hash_patient_info(item.patient_info):
+                item.report = entry.report
+                item.resumed_from = 'report_generated'
+            else:
+                logger.info(f"Patient information of {item.name} changed; regenerating its report")
+        if item.resumed_from:
+            logger.info(f"Resuming {item.name} after stage '{item.resumed_from}'")
+
+    def _checkpoint(self, item, stage, **data):
+        if self.journal is not None and item.audio_hash is not None:
+            self.journal.advance(item.audio_hash, stage, **data)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, items, on_item_done=None, collect=True):
+        """
+        Process items through all stages
+
+        Args:
+            items (iterable): PipelineItem objects (may be an endless generator)
+            on_item_done (callable, optional): Called with each finished (or failed) item
+            collect (bool): Keep finished items for the return value (disable for long-running feeds)
+
+        Returns:
+            list: The items, in completion order
+        """
+        functions = {
+            'decode': self._decode,
+            'transcribe': self._transcribe,
+            'report': self._report,
+            'save': self._save,
+        }
+        self.stats = {stage: StageStats(stage, self.workers[stage]) for stage in STAGES}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in STAGES]
+        finished = []
+        finished_lock = threading.Lock()
+
+        def finish(item):
+            if collect:
+                with finished_lock:
+                    finished.append(item)
+            if on_item_done is not None:
+                try:
+                    on_item_done(item)
+                except Exception as e:
+                    logger.error(f"Pipeline callback failed for {item.name}: {e}")
+
+        def worker(index, stage, remaining):
+            in_q = queues[index]
+            out_q = queues[index + 1] if index + 1 < len(STAGES) else None
+            while True:
+                item = in_q.get()
+                if item is _STOP:
+                    break
+                start = time.perf_counter()
+                try:
+                    functions[stage](item)
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    item.error = str(e)
+                    item.failed_stage = stage
+                    if self.journal is not None and item.audio_hash is not None:
+                        self.journal.fail(item.audio_hash, item.error)
+                    logger.error(f"Pipeline stage '{stage}' failed for {item.name}: {e}")
+                end = time.perf_counter()
+                item.timings[stage] = end - start
+                self.stats[stage].record(start, end, ok)
+                if ok and out_q is not None and not item.skipped:
+                    out_q.put(item)  # Blocks while the next stage is saturated
+                else:
+                    finish(item)
+            # The last worker of a stage closes the next one
+            with remaining['lock']:
+                remaining['count'] -= 1
+                last = remaining['count'] == 0
+            if last and out_q is not None:
+                for _ in range(self.workers[STAGES[index + 1]]):
+                    out_q.put(_STOP)
+
+        if self.use_processes:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers['transcribe'])
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers['transcribe'],
+                initializer=_init_transcription_worker,
+                initargs=(self.system_factory, threads_per_worker),
+            )
+
+        threads = []
+        try:
+            for index, stage in enumerate(STAGES):
+                remaining = {'count': self.workers[stage], 'lock': threading.Lock()}
+                for n in range(self.workers[stage]):
+                    t = threading.Thread(
+                        target=worker, args=(index, stage, remaining),
+                        name=f"pipeline-{stage}-{n}", daemon=True
+                    )
+                    t.start()
+                    threads.append(t)
+
+            for item in items:
+                queues[0].put(item)
+            for _ in range(self.workers[STAGES[0]]):
+                queues[0].put(_STOP)
+
+            for t in threads:
+                t.join()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+        self._log_stats()
+        return finished
+
+    def stats_summary(self):
+        """
+        Get per-stage throughput of the last run
+
+        Returns:
+            dict: Stage name -> counters
+        """
+        return {stage: stats.to_dict() for stage, stats in self.stats.items()}
+
+    def _log_stats(self):
+        for stage, s in self.stats_summary().items():
+            logger.info(
+                f"Pipeline {stage}: {s['processed']} ok, {s['failed']} failed, "
+                f"{s['items_per_minute']}/min, avg {s['avg_seconds']}s, utilization {s['utilization']:.0%}"
+            )
@@ -0,0 +1,533 @@
+"""
+Progress Module
+Structured per-stage progress events of consultation processing, with ETA from historical latency
+"""
+from contextlib import contextmanager
+import json
+import logging
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+STAGE_LABELS = {
+    'transcribing': "Transcrevendo áudio",
+    'generating_report': "Gerando relatório médico",
+    'tutor_summary': "Finalizando resumo do tutor",
+    'saving': "Salvando relatório",
+}
+
+# Estimates used until there is history: seconds per audio second for transcription,
+# seconds per call for the other stages
+DEFAULT_TRANSCRIPTION_RATIO = 0.3
+DEFAULT_TRANSCRIPTION_SECONDS = 120.0
+DEFAULT_STAGE_SECONDS = {'generating_report': 45.0, 'tutor_summary': 2.0, 'saving': 0.5}
+
+# Only the most recent runs of a stage are used for estimates
+HISTORY_LIMIT = 200
+
+# Streamed text is written at most this often (the first piece right away)
+TEXT_FLUSH_SECONDS = 0.5
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _latency_summary(durations):
+    return {
+        'count': len(durations),
+        'mean': round(statistics.mean(durations), 3),
+        'p50': round(_percentile(durations, 50), 3),
+        'p90': round(_percentile(durations, 90), 3),
+        'p99': round(_percentile(durations, 99), 3),
+    }
+
+
+def _estimate(stages, durations, elapsed, expected_seconds, audio_done=None, audio_total=None):
+    """
+    Progress of a plan of stages
+
+    Args:
+        stages (list): Planned stages, in order
+        durations (dict): Stage -> seconds, for the stages that ended
+        elapsed (dict): Stage -> seconds since it started
+        expected_seconds (callable): Stage -> seconds it is expected to take
+        audio_done (float, optional): Audio transcribed so far
+        audio_total (float, optional): Audio length
+
+    Returns:
+        tuple: (finished, fraction done, seconds remaining)
+    """
+    done_seconds = 0.0
+    remaining_seconds = 0.0
+    for stage in stages:
+        if stage in durations:
+            done_seconds += durations[stage]
+            continue
+        expected = expected_seconds(stage)
+        if stage in elapsed:
+            if stage == 'transcribing' and audio_total and audio_done:
+                within = min(audio_done / audio_total, 1.0)
+                expected = max(expected, elapsed[stage] / within) if within > 0 else expected
+            else:
+                # Time-based estimate; never claims the stage is finished
+                expected = max(expected, elapsed[stage] / 0.95)
+                within = elapsed[stage] / expected
+            done_seconds += expected * within
+            remaining_seconds += expected * (1 - within)
+        else:
+            remaining_seconds += expected
+
+    total = done_seconds + remaining_seconds
+    finished = bool(stages) and all(stage in durations for stage in stages)
+    if finished:
+        return True, 1.0, 0.0
+    return False, round(done_seconds / total, 4) if total > 0 else 0.0, round(remaining_seconds, 1)
+
+
+class ProgressStore:
+    """SQLite table of progress events (one row per event, shared with the job store database)"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize progress store
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.JOB_STORE_DB)
+        """
+        self.db_path = Path(db_path or config.JOB_STORE_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+        self.prune()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    stage TEXT,
+                    event TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    duration REAL,
+                    audio_seconds_done REAL,
+                    audio_seconds_total REAL,
+                    tokens INTEGER,
+                    detail TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_stage ON job_events(stage, event, id)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, job_id, event, stage=None, duration=None, audio_seconds_done=None,
+               audio_seconds_total=None, tokens=None, detail=None, ts=None):
+        """
+        Append one event
+
+        Args:
+            job_id (str): Job id
+            event (str): 'plan', 'start', 'progress', 'text', 'phase', 'end' or 'error'
+            stage (str, optional): Stage name
+            duration (float, optional): Stage duration (on 'end') or phase duration (on 'phase')
+            audio_seconds_done (float, optional): Audio transcribed so far
+            audio_seconds_total (float, optional): Audio length
+            tokens (int, optional): Tokens generated so far
+            detail (object, optional): JSON-serializable extra data
+            ts (float, optional): Unix timestamp (default: now)
+        """
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO job_events (job_id, stage, event, ts, duration, audio_seconds_done, "
+                "audio_seconds_total, tokens, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, stage, event, time.time() if ts is None else ts, duration, audio_seconds_done,
+                 audio_seconds_total, tokens,
+                 json.dumps(detail, ensure_ascii=False, default=str) if detail is not None else None)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete_text(self, job_id, stage):
+        """
+        Drop the streamed text of a finished stage (only a preview; the result is saved elsewhere)
+
+        Args:
+            job_id (str): Job id
+            stage (str): Stage name
+        """
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id = ? AND stage = ? AND event = 'text'", (job_id, stage)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def prune(self, retention_days=None, now=None):
+        """
+        Delete the events of jobs with no activity for retention_days
+
+        A job silent for that long has finished (or its process died); the latency history
+        keeps using the runs that remain.
+
+        Args:
+            retention_days (float, optional): Days kept (default: config.JOB_EVENTS_RETENTION_DAYS;
+                0 keeps everything)
+            now (float, optional): Unix timestamp (default: now)
+
+        Returns:
+            int: Events deleted
+        """
+        retention_days = config.JOB_EVENTS_RETENTION_DAYS if retention_days is None else retention_days
+        if retention_days <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - retention_days * 86400
+        conn = self._connect()
+        try:
+            deleted = conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT job_id FROM job_events GROUP BY job_id HAVING MAX(ts) < ?)",
+                (cutoff,)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if deleted:
+            logger.info(f"Pruned {deleted} progress events older than {retention_days:g} days")
+        return deleted
+
+    def events(self, job_id):
+        """
+        Get the events of a job, oldest first
+
+        Returns:
+            list: Event dicts
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM job_events WHERE job_id = ? ORDER BY id", (job_id,)).fetchall()
+        finally:
+            conn.close()
+        events = [dict(row) for row in rows]
+        for event in events:
+            if event['detail'] is not None:
+                event['detail'] = json.loads(event['detail'])
+        return events
+
+    def _history(self, stage, limit=HISTORY_LIMIT):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT duration, audio_seconds_total FROM job_events "
+                "WHERE stage = ? AND event = 'end' AND duration IS NOT NULL "
+                "AND (detail IS NULL OR detail NOT LIKE '%\"cached\": true%') ORDER BY id DESC LIMIT ?",
+                (stage, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def expected_seconds(self, stage, audio_seconds=None):
+        """
+        Typical duration of a stage (median of recent runs)
+
+        Args:
+            stage (str): Stage name
+            audio_seconds (float, optional): Audio length (transcription scales with it)
+
+        Returns:
+            float: Expected seconds
+        """
+        history = self._history(stage)
+        if stage == 'transcribing':
+            ratios = [d / a for d, a in history if a]
+            ratio = statistics.median(ratios) if ratios else DEFAULT_TRANSCRIPTION_RATIO
+            if audio_seconds:
+                return ratio * audio_seconds
+            durations = [d for d, _ in history]
+            return statistics.median(durations) if durations else DEFAULT_TRANSCRIPTION_SECONDS
+        durations = [d for d, _ in history]
+        return statistics.median(durations) if durations else DEFAULT_STAGE_SECONDS.get(stage, 1.0)
+
+    def latency_stats(self):
+        """
+        Historical latency per stage (capacity planning)
+
+        Returns:
+            dict: Stage -> {'count', 'p50', 'p90', 'p99', 'mean'} (and 'seconds_per_audio_second'
+            for transcription); phases recorded inside a stage appear as 'stage:phase'
+        """
+        conn = self._connect()
+        try:
+            stages = [row[0] for row in conn.execute(
+                "SELECT DISTINCT stage FROM job_events WHERE event = 'end' AND stage IS NOT NULL"
+            ).fetchall()]
+            phase_rows = conn.execute(
+                "SELECT stage, duration, detail FROM job_events "
+                "WHERE event = 'phase' AND duration IS NOT NULL ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        stats = {}
+        for stage in stages:
+            history = self._history(stage, limit=10_000)
+            durations = [d for d, _ in history]
+            if not durations:
+                continue
+            stats[stage] = _latency_summary(durations)
+            ratios = [d / a for d, a in history if a]
+            if ratios:
+                stats[stage]['seconds_per_audio_second'] = round(statistics.median(ratios), 4)
+
+        phases = {}
+        for row in phase_rows:
+            name = json.loads(row['detail'] or '{}').get('phase')
+            phases.setdefault(f"{row['stage']}:{name}", []).append(row['duration'])
+        for key, durations in phases.items():
+            stats[key] = _latency_summary(durations)
+        return stats
+
+    def snapshot(self, job_id, now=None):
+        """
+        Current progress and ETA of a job, computed from its events and the history
+
+        Args:
+            job_id (str): Job id
+            now (float, optional): Unix timestamp (default: now)
+
+        Returns:
+            dict or None: stage, fraction, eta_seconds, elapsed_seconds, audio and token
+            counters, status ('running', 'done', 'failed'), partial_text (text streamed so far),
+            ttft_seconds (stage start to first streamed text) and phases (phase -> seconds)
+        """
+        events = self.events(job_id)
+        if not events:
+            return None
+        now = time.time() if now is None else now
+
+        plan = next((e['detail'] for e in events if e['event'] == 'plan'), None)
+        stages = plan or list(dict.fromkeys(e['stage'] for e in events if e['stage']))
+        started = {}
+        durations = {}
+        audio_done = audio_total = tokens = None
+        current = None
+        failed = None
+        text = []
+        ttft = None
+        phases = {}
+        for e in events:
+            if e['audio_seconds_total'] is not None:
+                audio_total = e['audio_seconds_total']
+            if e['audio_seconds_done'] is not None:
+                audio_done = e['audio_seconds_done']
+            if e['tokens'] is not None:
+                tokens = e['tokens']
+            if e['event'] == 'start':
+                started[e['stage']] = e['ts']
+                current = e['stage']
+            elif e['event'] == 'end':
+                durations[e['stage']] = e['duration']
+            elif e['event'] == 'error':
+                failed = e['detail']
+            elif e['event'] == 'text':
+                if not text and e['stage'] in started:
+                    ttft = e['ts'] - started[e['stage']]
+                text.append(e['detail'])
+            elif e['event'] == 'phase':
+                phases[e['detail']['phase']] = e['duration']
+
+        finished, fraction, eta = _estimate(
+            stages, durations, {stage: now - ts for stage, ts in started.items()},
+            lambda stage: self.expected_seconds(stage, audio_total if stage == 'transcribing' else None),
+            audio_done, audio_total
+        )
+        return {
+            'job_id': job_id,
+            'status': 'failed' if failed is not None else ('done' if finished else 'running'),
+            'stage': current,
+            'stage_label': STAGE_LABELS.get(current, current),
+            'fraction': fraction,
+            'eta_seconds': eta,
+            'elapsed_seconds': round(now - events[0]['ts'], 1),
+            'audio_seconds_done': audio_done,
+            'audio_seconds_total': audio_total,
+            'tokens': tokens,
+            'partial_text': "".join(text) or None,
+            'ttft_seconds': round(ttft, 3) if ttft is not None else None,
+            'phases': phases,
+            'error': failed,
+        }
+
+    def recent_jobs(self, limit=20):
+        """
+        Ids of the jobs with the most recent events
+
+        Returns:
+            list: Job ids, newest first
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, MAX(id) AS last_id FROM job_events GROUP BY job_id ORDER BY last_id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row['job_id'] for row in rows]
+
+
+class ProgressTracker:
+    """Emits the progress events of one consultation"""
+
+    def __init__(self, job_id, stages, store=None, callback=None):
+        """
+        Initialize progress tracker
+
+        Args:
+            job_id (str): Job id (any unique string for CLI runs)
+            stages (list): Stages this run will go through, in order
+            store (ProgressStore, optional): Event store (default: a ProgressStore on config.JOB_STORE_DB)
+            callback (callable, optional): callback(stage, fraction, message) after every event
+        """
+        self.job_id = job_id
+        self.stages = list(stages)
+        self.store = store or ProgressStore()
+        self.callback = callback
+        self._started = {}
+        self._audio_total = {}
+        self._cached = set()
+        self._durations = {}
+        self._pending_text = {}
+        self._text_written = {}
+        self._current = None
+        self._audio_done = None
+        self._expected = {}
+        self._safe_record('plan', detail=self.stages)
+
+    def _safe_record(self, event, **fields):
+        # Progress must never break the processing itself
+        try:
+            self.store.record(self.job_id, event, **fields)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record progress event for job {self.job_id}: {e}")
+            return
+        if self.callback is not None:
+            try:
+                self._notify()
+            except Exception as e:
+                logger.warning(f"Progress callback failed for job {self.job_id}: {e}")
+
+    def _expected_seconds(self, stage):
+        # History is read once per stage (and audio length), not on every event
+        audio_total = self._audio_total.get(stage) if stage == 'transcribing' else None
+        key = (stage, audio_total)
+        if key not in self._expected:
+            self._expected[key] = self.store.expected_seconds(stage, audio_total)
+        return self._expected[key]
+
+    def _notify(self):
+        """Call the callback with the progress computed from this tracker (as ProgressStore.snapshot would)"""
+        now = time.perf_counter()
+        _, fraction, eta = _estimate(
+            self.stages, self._durations, {stage: now - started for stage, started in self._started.items()},
+            self._expected_seconds, self._audio_done, self._audio_total.get('transcribing')
+        )
+        message = STAGE_LABELS.get(self._current, self._current) or "Processando"
+        if eta:
+            message += f" (restam ~{eta:.0f}s)"
+        self.callback(self._current, fraction, message)
+
+    def start(self, stage):
+        self._started[stage] = time.perf_counter()
+        self._current = stage
+        self._safe_record('start', stage=stage)
+
+    def update(self, stage, audio_seconds_done=None, audio_seconds_total=None, tokens=None):
+        """Report progress inside a stage (audio transcribed so far, tokens generated so far)"""
+        if audio_seconds_total is not None:
+            self._audio_total[stage] = audio_seconds_total
+        if audio_seconds_done is not None:
+            self._audio_done = audio_seconds_done
+        self._safe_record(
+            'progress', stage=stage, audio_seconds_done=audio_seconds_done,
+            audio_seconds_total=audio_seconds_total, tokens=tokens
+        )
+
+    def stream_text(self, stage, text):
+        """Append text generated inside a stage (buffered; see TEXT_FLUSH_SECONDS)"""
+        self._pending_text.setdefault(stage, []).append(text)
+        if time.perf_counter() - self._text_written.get(stage, float('-inf')) >= TEXT_FLUSH_SECONDS:
+            self._flush_text(stage)
+
+    def _flush_text(self, stage):
+        pending = self._pending_text.pop(stage, None)
+        if pending:
+            self._text_written[stage] = time.perf_counter()
+            self._safe_record('text', stage=stage, detail="".join(pending))
+
+    def phase(self, stage, name, duration, detail=None):
+        """Record how long a named phase inside a stage took (e.g. the two calls of a long-transcript report)"""
+        self._safe_record('phase', stage=stage, duration=duration, detail={'phase': name, **(detail or {})})
+
+    def mark_cached(self, stage):
+        """The stage was served from a cache (its duration is kept out of the latency history)"""
+        self._cached.add(stage)
+
+    def end(self, stage):
+        self._flush_text(stage)
+        duration = time.perf_counter() - self._started.pop(stage, time.perf_counter())
+        self._durations[stage] = duration
+        self._safe_record(
+            'end', stage=stage, duration=duration,
+            # Stored with the duration so transcription latency can be normalized by audio length
+            audio_seconds_total=self._audio_total.get(stage),
+            detail={'cached': True} if stage in self._cached else None
+        )
+        if self._text_written.pop(stage, None) is not None:
+            try:
+                self.store.delete_text(self.job_id, stage)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not drop streamed text of job {self.job_id}: {e}")
+
+    def duration(self, stage):
+        """Seconds a finished stage took (None if it has not ended or was served from a cache)"""
+        if stage in self._cached:
+            return None
+        return self._durations.get(stage)
+
+    def fail(self, stage, error):
+        self._flush_text(stage)
+        self._started.pop(stage, None)
+        self._safe_record('error', stage=stage, detail=str(error))
+
+    @contextmanager
+    def stage(self, stage):
+        """Record start and end (or error) of a stage around a block"""
+        self.start(stage)
+        try:
+            yield self
+        except Exception as e:
+            self.fail(stage, e)
+            raise
+        self.end(stage)
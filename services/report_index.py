@@ -0,0 +1,734 @@
+"""
+Report Index Module
+SQLite metadata index of saved reports (listing, pagination and counts without reading the files),
+FTS5 full-text index over report and transcription text, and reconciliation with the directory
+"""
+from datetime import datetime
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+import config
+from services import archive, daily_stats, storage_layout
+from services.llm_service import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+# Reports are saved as YYYYMMDD_HHMMSS_Patient_source.md
+FILENAME_TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# Tutor summaries are saved next to their report (<report>_resumo_tutor.md) but are not reports:
+# they stay out of the index, listings and rollups
+TUTOR_SUMMARY_SUFFIX = "_resumo_tutor.md"
+
+# Patient header of the report template: "**Espécie:** Canina | **Raça:** ..." / "- Tutor: Maria"
+SPECIES_PATTERN = re.compile(r"Esp[ée]cie:\**\s*([^|\n*]+)")
+TUTOR_PATTERN = re.compile(r"Tutor:\**\s*([^|\n*]+)")
+ATTENDANCE_PATTERN = re.compile(r"Modalidade:\**\s*([^|\n*]+)")
+
+# Processing metrics of a report (provider, tokens, cost, stage latency); kept from the
+# previous entry when a report is re-indexed without them (manual edits, reconciliation)
+METRIC_COLUMNS = (
+    'attendance_type',
+    'provider',
+    'model',
+    'input_tokens',
+    'output_tokens',
+    'cost_usd',
+    'transcription_seconds',
+    'report_seconds',
+)
+
+# Words of at least one letter/digit; everything else (FTS5 operators, quotes, punctuation) is dropped
+QUERY_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Reports written per transaction when reconciling a directory
+RECONCILE_BATCH_SIZE = 500
+
+# Reports whose filename does not follow the pattern are searchable but left out of listings
+# and counts (the same condition for both, so page counts match the rows listed)
+LISTED = "patient IS NOT NULL"
+
+SORT_ORDERS = {
+    'recent': "created_at DESC, filename DESC",
+    'oldest': "created_at ASC, filename ASC",
+    'patient': "patient_key ASC, created_at DESC",
+}
+
+
+def consultation_type(content):
+    """
+    Consultation type of a report, from its content
+
+    Args:
+        content (str): Report text
+
+    Returns:
+        str: 'Retorno' or 'Consulta'
+    """
+    return "Retorno" if "Motivo do retorno:" in content else "Consulta"
+
+
+def _header_field(pattern, content):
+    match = pattern.search(content)
+    if not match:
+        return None
+    value = match.group(1).strip()
+    return value or None
+
+
+def build_match_query(text):
+    """
+    FTS5 MATCH expression for free text typed by a user
+
+    Every word must appear (prefix match, accents ignored), so "amoxi otite" finds reports
+    mentioning amoxicilina and otite.
+
+    Args:
+        text (str): Search text
+
+    Returns:
+        str or None: MATCH expression (None when the text has no searchable word)
+    """
+    terms = QUERY_TERM_PATTERN.findall(text or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def report_metrics(usage, transcription_seconds=None, report_seconds=None):
+    """
+    Processing metrics stored with a report (feed the daily rollups)
+
+    Args:
+        usage (dict): Usage of the LLM call (LLMService.last_usage), or None
+        transcription_seconds (float, optional): Transcription time (None when served from a cache)
+        report_seconds (float, optional): Report generation time
+
+    Returns:
+        dict: Metrics for ReportIndex.upsert
+    """
+    metrics = {'transcription_seconds': transcription_seconds, 'report_seconds': report_seconds}
+    if usage:
+        metrics.update(
+            provider=usage['provider'],
+            model=usage['model'],
+            input_tokens=usage['input_tokens'],
+            output_tokens=usage['output_tokens'],
+            cost_usd=estimate_cost(usage)
+        )
+    return metrics
+
+
+def is_tutor_summary(path):
+    """
+    Whether a file in the report directory is a tutor summary (plain or archived)
+
+    Args:
+        path (str or Path): File path or name
+
+    Returns:
+        bool: True for <report>_resumo_tutor.md
+    """
+    return archive.logical_path(path).name.endswith(TUTOR_SUMMARY_SUFFIX)
+
+
+def parse_report_filename(filename):
+    """
+    Patient, timestamp and source encoded in a report filename
+
+    Args:
+        filename (str): Report filename (YYYYMMDD_HHMMSS_Patient_source.md)
+
+    Returns:
+        dict: 'patient', 'created_at' (datetime) and 'source' (None when the name does not follow the pattern)
+    """
+    parts = Path(filename).stem.split('_', 3)
+    if len(parts) < 3:
+        return {'patient': None, 'created_at': None, 'source': None}
+    try:
+        created_at = datetime.strptime(f"{parts[0]}{parts[1]}", FILENAME_TIMESTAMP_FORMAT)
+    except ValueError:
+        created_at = None
+    return {
+        'patient': parts[2],
+        'created_at': created_at,
+        'source': parts[3] if len(parts) > 3 else None,
+    }
+
+
+class ReportIndex:
+    """SQLite index of report metadata, maintained whenever a report is written or deleted"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize report index
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.REPORT_INDEX_DB)
+        """
+        self.db_path = Path(db_path or config.REPORT_INDEX_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id INTEGER PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    patient TEXT,
+                    patient_key TEXT,
+                    created_at TEXT,
+                    day TEXT,
+                    report_type TEXT,
+                    source TEXT,
+                    size INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    mtime REAL,
+                    indexed_at TEXT NOT NULL,
+                    species TEXT,
+                    species_key TEXT,
+                    tutor TEXT,
+                    tutor_key TEXT,
+                    inode INTEGER,
+                    mtime_ns INTEGER,
+                    attendance_type TEXT,
+                    provider TEXT,
+                    model TEXT,
+                    input_tokens INTEGER,
+                    output_tokens INTEGER,
+                    cost_usd REAL,
+                    transcription_seconds REAL,
+                    report_seconds REAL,
+                    UNIQUE (directory, filename)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(directory, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_day ON reports(directory, day)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_patient ON reports(directory, patient_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_species ON reports(directory, species_key)")
+            # Full text of each report (rowid = reports.id); accents are ignored when matching
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS report_fts USING fts5(
+                    patient, report, transcription,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            # Daily rollups for the dashboard, filled from the existing rows the first time
+            if daily_stats.create_tables(conn):
+                daily_stats.rebuild(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(report_path):
+        # (report directory, name relative to it: 'file.md' or 'YYYY/MM/DD/file.md' when sharded;
+        # an archived report keeps the name of its plain file)
+        root, relative = storage_layout.split_path(archive.logical_path(report_path))
+        return str(root.resolve()), relative
+
+    def upsert(self, report_path, content, transcription=None, patient_info=None, metrics=None,
+               file_stat=None, conn=None):
+        """
+        Add or refresh the entry of a report
+
+        Args:
+            report_path (Path): Report file
+            content (str): Report text as written to the file
+            transcription (str, optional): Transcription the report was generated from
+                (kept from the previous entry when not given)
+            patient_info (dict, optional): Patient data (species, tutor and attendance type
+                are otherwise read from the report header)
+            metrics (dict, optional): Processing metrics ('provider', 'model', 'input_tokens',
+                'output_tokens', 'cost_usd', 'transcription_seconds', 'report_seconds')
+            file_stat (os.stat_result, optional): Stat taken before the content was read
+                (default: stat the file now)
+            conn (sqlite3.Connection, optional): Connection with an open write transaction
+                (default: a transaction of its own)
+
+        Tutor summaries (see is_tutor_summary) are ignored.
+        """
+        if is_tutor_summary(report_path):
+            return
+        directory, filename = self._key(report_path)
+        meta = parse_report_filename(filename)
+        created_at = meta['created_at']
+        patient_info = patient_info or {}
+        species = patient_info.get('paciente_especie') or _header_field(SPECIES_PATTERN, content)
+        tutor = patient_info.get('tutor_nome') or _header_field(TUTOR_PATTERN, content)
+        attendance = patient_info.get('tipo_atendimento') or _header_field(ATTENDANCE_PATTERN, content)
+        metrics = metrics or {}
+        data = content.encode('utf-8')
+        if file_stat is None:
+            try:
+                file_stat = Path(report_path).stat()
+            except OSError:
+                file_stat = None
+        fields = {
+            'patient': meta['patient'],
+            'patient_key': meta['patient'].lower() if meta['patient'] else None,
+            'created_at': created_at.isoformat() if created_at else None,
+            'day': created_at.strftime("%Y-%m-%d") if created_at else None,
+            'report_type': consultation_type(content),
+            'source': meta['source'],
+            'size': file_stat.st_size if file_stat else len(data),
+            'content_hash': hashlib.sha256(data).hexdigest(),
+            'mtime': file_stat.st_mtime if file_stat else None,
+            'inode': file_stat.st_ino if file_stat else None,
+            'mtime_ns': file_stat.st_mtime_ns if file_stat else None,
+            'indexed_at': datetime.now().isoformat(),
+            'species': species,
+            'species_key': species.lower() if species else None,
+            'tutor': tutor,
+            'tutor_key': tutor.lower() if tutor else None,
+            'attendance_type': attendance,
+            **{column: metrics.get(column) for column in METRIC_COLUMNS if column != 'attendance_type'},
+        }
+
+        if conn is None:
+            conn = self._connect()
+            try:
+                # Lookup and insert in one write transaction (several processes may index the same file)
+                conn.execute("BEGIN IMMEDIATE")
+                self.upsert(report_path, content, transcription, patient_info, metrics, file_stat, conn=conn)
+                conn.commit()
+            finally:
+                conn.close()
+            return
+
+        row = conn.execute(
+            "SELECT * FROM reports WHERE directory = ? AND filename = ?", (directory, filename)
+        ).fetchone()
+        if row is None:
+            columns = ['directory', 'filename', *fields]
+            report_id = conn.execute(
+                f"INSERT INTO reports ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                (directory, filename, *fields.values())
+            ).lastrowid
+        else:
+            report_id = row['id']
+            for column in ('species', 'species_key', 'tutor', 'tutor_key', *METRIC_COLUMNS):
+                if fields[column] is None:
+                    fields[column] = row[column]
+            daily_stats.apply(conn, row, -1)
+            conn.execute(
+                f"UPDATE reports SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                (*fields.values(), report_id)
+            )
+            if transcription is None:
+                previous = conn.execute(
+                    "SELECT transcription FROM report_fts WHERE rowid = ?", (report_id,)
+                ).fetchone()
+                transcription = previous['transcription'] if previous else None
+            conn.execute("DELETE FROM report_fts WHERE rowid = ?", (report_id,))
+        conn.execute(
+            "INSERT INTO report_fts (rowid, patient, report, transcription) VALUES (?, ?, ?, ?)",
+            (report_id, meta['patient'], content, transcription)
+        )
+        daily_stats.apply(conn, conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone(), 1)
+
+    def remove(self, report_path, conn=None):
+        """
+        Drop the entry of a report
+
+        Args:
+            report_path (Path): Report file
+            conn (sqlite3.Connection, optional): Connection with an open write transaction
+                (default: a transaction of its own)
+        """
+        if conn is None:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self.remove(report_path, conn=conn)
+                conn.commit()
+            finally:
+                conn.close()
+            return
+
+        row = conn.execute(
+            "SELECT * FROM reports WHERE directory = ? AND filename = ?", self._key(report_path)
+        ).fetchone()
+        if row is not None:
+            daily_stats.apply(conn, row, -1)
+            conn.execute("DELETE FROM report_fts WHERE rowid = ?", (row['id'],))
+            conn.execute("DELETE FROM reports WHERE id = ?", (row['id'],))
+
+    def reconcile(self, report_dir, transcription_dir=None, day=None):
+        """
+        Bring the index in line with the directory after changes made outside the app
+        (copied, edited or deleted files)
+
+        Only directory entries whose inode, mtime or size differ from the index are read;
+        when nothing changed this costs one directory scan and one query. Both the flat
+        and the date-sharded layout are scanned (see services.storage_layout).
+
+        Args:
+            report_dir (Path): Report directory
+            transcription_dir (Path, optional): Where to look for the transcription of new
+                reports (<source>_transcricao.txt, as saved for audio consultations)
+            day (date, optional): Only reconcile that day's shard directory (the rest of the
+                directory is not listed)
+
+        Returns:
+            dict: Counts of 'added', 'updated', 'removed' and 'unchanged' reports
+        """
+        report_dir = Path(report_dir)
+        directory = str(report_dir.resolve())
+        query = "SELECT filename, inode, mtime_ns, size FROM reports WHERE directory = ?"
+        params = [directory]
+        if day is not None:
+            query += " AND filename LIKE ?"
+            params.append(storage_layout.shard_dir("", day).as_posix() + "/%")
+        conn = self._connect()
+        try:
+            indexed = {
+                row['filename']: (row['inode'], row['mtime_ns'], row['size'])
+                for row in conn.execute(query, params)
+            }
+        finally:
+            conn.close()
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        seen = set()
+        # Archived reports (x.md.zst) are indexed under their plain name; if both copies
+        # exist (archiving interrupted) the plain file wins
+        entries = {}
+        for relative, entry in storage_layout.iter_files(
+            report_dir, ('.md', *('.md' + suffix for suffix in storage_layout.ARCHIVE_SUFFIXES)), day=day
+        ):
+            relative = archive.logical_path(relative).as_posix()
+            if is_tutor_summary(relative):
+                continue
+            if relative not in entries or not archive.is_archived(entry.name):
+                entries[relative] = entry
+
+        conn = None
+        pending = 0
+        try:
+            for relative, entry in entries.items():
+                try:
+                    file_stat = entry.stat()
+                except OSError:
+                    continue
+                seen.add(relative)
+                previous = indexed.get(relative)
+                if previous == (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size):
+                    counts['unchanged'] += 1
+                    continue
+
+                report_path = report_dir / relative
+                try:
+                    content = archive.read_text(entry.path)
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"Could not index report {relative}: {e}")
+                    continue
+                if conn is None:
+                    conn = self._connect()
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                self.upsert(
+                    report_path, content,
+                    transcription=(
+                        self._find_transcription(report_path, transcription_dir) if previous is None else None
+                    ),
+                    file_stat=file_stat, conn=conn
+                )
+                counts['added' if previous is None else 'updated'] += 1
+                pending += 1
+                if pending >= RECONCILE_BATCH_SIZE:
+                    conn.commit()
+                    pending = 0
+
+            for filename in indexed.keys() - seen:
+                if conn is None:
+                    conn = self._connect()
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                self.remove(report_dir / filename, conn=conn)
+                counts['removed'] += 1
+
+            if conn is not None:
+                conn.commit()
+        finally:
+            if conn is not None:
+                conn.close()
+
+        if counts['added'] or counts['updated'] or counts['removed']:
+            logger.info(
+                f"Report index reconciled with {report_dir}: {counts['added']} added, "
+                f"{counts['updated']} updated, {counts['removed']} removed"
+            )
+        return counts
+
+    def relocate(self, moves):
+        """
+        Follow reports moved to another layout or archived, without re-reading them
+        (keeps their metrics and transcription)
+
+        Args:
+            moves (list): (old path, new path) pairs, inside the same report directory
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for old_path, new_path in moves:
+                try:
+                    file_stat = Path(new_path).stat()
+                except OSError:
+                    continue
+                # The file signature is refreshed too, so reconcile() sees it as unchanged
+                conn.execute(
+                    "UPDATE reports SET directory = ?, filename = ?, inode = ?, mtime_ns = ?, size = ? "
+                    "WHERE directory = ? AND filename = ?",
+                    (*self._key(new_path), file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size,
+                     *self._key(old_path))
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _find_transcription(report_path, transcription_dir):
+        meta = parse_report_filename(Path(report_path).name)
+        if transcription_dir is None or not meta['source']:
+            return None
+        transcription_path = storage_layout.resolve(
+            transcription_dir, f"{meta['source']}_transcricao.txt",
+            day=meta['created_at'].date() if meta['created_at'] else None
+        )
+        if transcription_path is None:
+            return None
+        try:
+            return archive.read_text(transcription_path)
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    @staticmethod
+    def _day(value):
+        return value.strftime("%Y-%m-%d") if value else None
+
+    def _filters(self, report_dir, patient=None, start=None, end=None, species=None, tutor=None, prefix=""):
+        clauses = [f"{prefix}directory = ?"]
+        params = [str(Path(report_dir).resolve())]
+        for column, value in (('patient_key', patient), ('species_key', species), ('tutor_key', tutor)):
+            if value:
+                clauses.append(f"{prefix}{column} LIKE ?")
+                params.append(f"%{value.lower()}%")
+        if start:
+            clauses.append(f"{prefix}day >= ?")
+            params.append(self._day(start))
+        if end:
+            clauses.append(f"{prefix}day <= ?")
+            params.append(self._day(end))
+        return " AND ".join(clauses), params
+
+    def list_reports(self, report_dir, limit=10, offset=0, patient=None, day=None, order='recent',
+                     start=None, end=None, species=None, tutor=None):
+        """
+        List reports of a directory
+
+        Args:
+            report_dir (Path): Report directory
+            limit (int): Maximum number of entries
+            offset (int): Entries to skip
+            patient (str, optional): Substring of the patient name (case-insensitive)
+            day (date, optional): Only reports of this day
+            order (str): 'recent', 'oldest' or 'patient'
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            species (str, optional): Substring of the species (case-insensitive)
+            tutor (str, optional): Substring of the tutor name (case-insensitive)
+
+        Returns:
+            list: Entry dicts (reports whose filename does not follow the pattern are left out)
+        """
+        where, params = self._filters(
+            report_dir, patient, start or day, end or day, species, tutor
+        )
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM reports WHERE {where} AND {LISTED} "
+                f"ORDER BY {SORT_ORDERS[order]} LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def search(self, report_dir, query, limit=20, offset=0, start=None, end=None, species=None, tutor=None,
+               order='relevance'):
+        """
+        Full-text search over report and transcription text, best matches first
+
+        Args:
+            report_dir (Path): Report directory
+            query (str): Free text (drug, diagnosis, symptom, patient...)
+            limit (int): Maximum number of entries
+            offset (int): Entries to skip
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            species (str, optional): Substring of the species (case-insensitive)
+            tutor (str, optional): Substring of the tutor name (case-insensitive)
+            order (str): 'relevance', 'recent', 'oldest' or 'patient'
+
+        Returns:
+            list: Entry dicts with 'snippet' (matched terms in **bold**) and 'rank' (lower is better)
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+        where, params = self._filters(report_dir, start=start, end=end, species=species, tutor=tutor, prefix="r.")
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT r.*, snippet(report_fts, -1, '**', '**', ' … ', 16) AS snippet, "
+                "bm25(report_fts) AS rank "
+                "FROM report_fts JOIN reports r ON r.id = report_fts.rowid "
+                f"WHERE report_fts MATCH ? AND {where} "
+                f"ORDER BY {'rank' if order == 'relevance' else SORT_ORDERS[order]} LIMIT ? OFFSET ?",
+                (match, *params, limit, offset)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def count(self, report_dir, start=None, end=None):
+        """
+        Count reports of a directory, optionally within a date range (the same reports
+        list_reports pages through)
+
+        Args:
+            report_dir (Path): Report directory
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+
+        Returns:
+            int: Number of reports
+        """
+        where, params = self._filters(report_dir, start=start, end=end)
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM reports WHERE {where} AND {LISTED}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def species(self, report_dir):
+        """
+        Distinct species of the indexed reports (for filter choices)
+
+        Args:
+            report_dir (Path): Report directory
+
+        Returns:
+            list: Species names, sorted
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT MIN(species) FROM reports WHERE directory = ? AND species IS NOT NULL "
+                "GROUP BY species_key ORDER BY species_key",
+                (str(Path(report_dir).resolve()),)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def get(self, report_path):
+        """
+        Get the entry of a report
+
+        Args:
+            report_path (Path): Report file
+
+        Returns:
+            dict or None: Entry
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT * FROM reports WHERE directory = ? AND filename = ?", self._key(report_path)
+            ).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+
+class IndexReconciler:
+    """Background thread reconciling the report index with the report directory"""
+
+    def __init__(self, index, report_dir, transcription_dir=None, interval_seconds=None):
+        """
+        Initialize index reconciler
+
+        Args:
+            index (ReportIndex): Report index
+            report_dir (Path): Report directory
+            transcription_dir (Path, optional): Transcription directory (for new reports)
+            interval_seconds (float, optional): Seconds between passes
+        """
+        self.index = index
+        self.report_dir = Path(report_dir)
+        self.transcription_dir = transcription_dir
+        self.interval_seconds = (
+            config.REPORT_INDEX_RECONCILE_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the reconciliation thread (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="report-index-reconciler", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Trigger a pass now (e.g. after the report folder was opened for manual edits)"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            try:
+                self.index.reconcile(self.report_dir, self.transcription_dir)
+            except Exception as e:
+                logger.error(f"Report index reconciliation failed: {e}")
+
+
+_reconciler = None
+_reconciler_lock = threading.Lock()
+
+
+def get_index_reconciler(index, report_dir, transcription_dir=None):
+    """
+    Get the process-wide reconciler, starting it on first use
+
+    Args:
+        index (ReportIndex): Report index (used on first call only)
+        report_dir (Path): Report directory (used on first call only)
+        transcription_dir (Path, optional): Transcription directory (used on first call only)
+
+    Returns:
+        IndexReconciler: Running reconciler
+    """
+    global _reconciler
+    with _reconciler_lock:
+        if _reconciler is None:
+            _reconciler = IndexReconciler(index, report_dir, transcription_dir)
+            _reconciler.start()
+        return _reconciler
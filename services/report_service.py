@@ -6,20 +6,30 @@ from datetime import datetime
 from pathlib import Path
 import logging
 
+from services import archive, storage_layout
+from services.report_index import ReportIndex
+
 logger = logging.getLogger(__name__)
 
 
 class ReportService:
     """Service for managing veterinary reports"""
 
-    def __init__(self, report_dir):
+    def __init__(self, report_dir, index=None, transcription_dir=None):
         """
         Initialize report service
 
         Args:
             report_dir (Path): Directory containing reports
+            index (ReportIndex, optional): Metadata index (default: ReportIndex on config.REPORT_INDEX_DB)
+            transcription_dir (Path, optional): Directory containing transcriptions (indexed
+                together with reports that appear in the directory outside the app)
         """
         self.report_dir = Path(report_dir)
+        self.transcription_dir = transcription_dir
+        self.index = index or ReportIndex()
+        # Pick up reports added, edited or deleted outside the app since the last run
+        self.index.reconcile(self.report_dir, transcription_dir)
 
     def get_recent_reports(self, limit=10, offset=0):
         """
@@ -32,23 +42,10 @@ class ReportService:
         Returns:
             list: List of report dictionaries
         """
-        if not self.report_dir.exists():
-            logger.warning(f"Report directory does not exist: {self.report_dir}")
-            return []
-
         try:
-            reports = list(self.report_dir.glob("*.md"))
-            reports.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-
-            # Apply pagination
-            paginated_reports = reports[offset:offset + limit]
-
-            result = []
-            for report in paginated_reports:
-                report_info = self._parse_report_metadata(report)
-                if report_info:
-                    result.append(report_info)
-
+            result = [self._to_report_info(entry) for entry in self.index.list_reports(
+                self.report_dir, limit=limit, offset=offset
+            )]
             logger.debug(f"Retrieved {len(result)} reports (limit={limit}, offset={offset})")
             return result
 
@@ -56,112 +53,202 @@ class ReportService:
             logger.error(f"Error retrieving recent reports: {e}")
             return []
 
-    def _parse_report_metadata(self, report_path):
+    def count_reports(self, start=None, end=None):
         """
-        Parse report metadata from filename and content
+        Count reports, optionally within a date range
 
         Args:
-            report_path (Path): Path to report file
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
 
         Returns:
-            dict or None: Report metadata dictionary
+            int: Number of reports
         """
-        try:
-            # Parse filename: YYYYMMDD_HHMMSS_Nome_source.md
-            parts = report_path.stem.split('_', 3)
-
-            if len(parts) < 3:
-                logger.warning(f"Invalid filename format: {report_path.name}")
-                return None
-
-            date_str = parts[0]
-            time_str = parts[1]
-            paciente = parts[2] if len(parts) > 2 else "Desconhecido"
-
-            # Format date
-            try:
-                dt = datetime.strptime(f"{date_str}{time_str}", "%Y%m%d%H%M%S")
-                data_formatada = dt.strftime("%d/%m/%Y %H:%M")
-            except ValueError:
-                data_formatada = "Data inválida"
-                logger.warning(f"Invalid date format in filename: {report_path.name}")
-
-            # Read first lines to determine consultation type
-            motivo = self._extract_consultation_type(report_path)
-
-            return {
-                'data': data_formatada,
-                'paciente': paciente,
-                'motivo': motivo,
-                'arquivo': report_path.name,
-                'caminho': report_path
-            }
+        return self.index.count(self.report_dir, start=start, end=end)
 
-        except Exception as e:
-            logger.error(f"Error parsing report metadata for {report_path.name}: {e}")
-            return None
-
-    def _extract_consultation_type(self, report_path):
+    def _to_report_info(self, entry):
         """
-        Extract consultation type from report content
+        Convert an index entry to the report dictionary used by the interface
 
         Args:
-            report_path (Path): Path to report file
+            entry (dict): Report index entry
 
         Returns:
-            str: Consultation type
+            dict: Report metadata dictionary
         """
-        try:
-            with open(report_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-                if "Motivo do retorno:" in content:
-                    return "Retorno"
-                else:
-                    return "Consulta"
-
-        except Exception as e:
-            logger.error(f"Error reading report content: {e}")
-            return "N/A"
-
-    def search_reports(self, search_term=None, date_filter=None):
+        if entry['created_at']:
+            data_formatada = datetime.fromisoformat(entry['created_at']).strftime("%d/%m/%Y %H:%M")
+        else:
+            data_formatada = "Data inválida"
+
+        report_info = {
+            'data': data_formatada,
+            'paciente': entry['patient'],
+            'motivo': entry['report_type'],
+            'arquivo': Path(entry['filename']).name,
+            'caminho': Path(entry['directory']) / entry['filename'],
+            'origem': entry['source'],
+            'tamanho': entry['size'],
+            'especie': entry['species'],
+            'tutor': entry['tutor'],
+        }
+        if 'snippet' in entry:
+            report_info['trecho'] = entry['snippet']
+        return report_info
+
+    def search_reports(self, search_term=None, date_filter=None, order='recent', limit=1000, offset=0,
+                       start=None, end=None, species=None, tutor=None):
         """
         Search reports with filters
 
         Args:
             search_term (str, optional): Search term for patient name
             date_filter (str, optional): Date filter in DD/MM/YYYY format
+            order (str): 'recent', 'oldest' or 'patient'
+            limit (int): Maximum number of reports to return
+            offset (int): Number of reports to skip
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            species (str, optional): Species filter
+            tutor (str, optional): Tutor name filter
 
         Returns:
             list: Filtered list of report dictionaries
         """
         try:
-            all_reports = self.get_recent_reports(limit=1000)
+            day = datetime.strptime(date_filter, "%d/%m/%Y").date() if date_filter else None
+            if day is not None:
+                # A single day only lists that day's directory (sharded layout)
+                self.index.reconcile(self.report_dir, self.transcription_dir, day=day)
+            results = [self._to_report_info(entry) for entry in self.index.list_reports(
+                self.report_dir, limit=limit, offset=offset, patient=search_term, day=day, order=order,
+                start=start, end=end, species=species, tutor=tutor
+            )]
+
+            logger.debug(f"Search returned {len(results)} results")
+            return results
+
+        except Exception as e:
+            logger.error(f"Error searching reports: {e}")
+            return []
 
-            # Apply search term filter
-            if search_term:
-                all_reports = [
-                    r for r in all_reports
-                    if search_term.lower() in r['paciente'].lower()
-                ]
+    def full_text_search(self, query, start=None, end=None, species=None, tutor=None, order='relevance',
+                         limit=20, offset=0):
+        """
+        Search the text of reports and transcriptions (drugs, diagnoses, symptoms...)
 
-            # Apply date filter
-            if date_filter:
-                all_reports = [
-                    r for r in all_reports
-                    if date_filter in r['data']
-                ]
+        Args:
+            query (str): Search text
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            species (str, optional): Species filter
+            tutor (str, optional): Tutor name filter
+            order (str): 'relevance', 'recent', 'oldest' or 'patient'
+            limit (int): Maximum number of reports to return
+            offset (int): Number of reports to skip
 
-            logger.debug(f"Search returned {len(all_reports)} results")
-            return all_reports
+        Returns:
+            list: Report dictionaries (best matches first by default) with a 'trecho' snippet
+        """
+        try:
+            results = [self._to_report_info(entry) for entry in self.index.search(
+                self.report_dir, query, limit=limit, offset=offset,
+                start=start, end=end, species=species, tutor=tutor, order=order
+            )]
+            logger.debug(f"Full-text search returned {len(results)} results")
+            return results
 
         except Exception as e:
-            logger.error(f"Error searching reports: {e}")
+            logger.error(f"Error in full-text search: {e}")
             return []
 
+    def reconcile(self, day=None):
+        """
+        Re-sync the index with the report directory
+
+        Args:
+            day (date, optional): Only re-sync that day's directory (sharded layout)
+
+        Returns:
+            dict: Counts of 'added', 'updated', 'removed' and 'unchanged' reports
+        """
+        return self.index.reconcile(self.report_dir, self.transcription_dir, day=day)
+
+    def get_species(self):
+        """
+        Get the species found in the reports
+
+        Returns:
+            list: Species names
+        """
+        return self.index.species(self.report_dir)
+
+    def archive_reports(self, older_than_days=None, archiver=None, retrain=False):
+        """
+        Compress reports not modified for a while, keeping their index entries
+
+        Args:
+            older_than_days (float, optional): Age (default: config.ARCHIVE_AFTER_DAYS)
+            archiver (Archiver, optional): Codec settings (default: from config)
+            retrain (bool): Train a new shared dictionary
+
+        Returns:
+            dict: Archive statistics (see Archiver.archive)
+        """
+        archived = []
+        stats = (archiver or archive.Archiver()).archive(
+            self.report_dir, '.md', 'reports', older_than_days=older_than_days, retrain=retrain,
+            on_archive=lambda plain, target: archived.append((plain, target))
+        )
+        self.index.relocate(archived)
+        return stats
+
+    def migrate_layout(self, layout='sharded'):
+        """
+        Move the existing reports to a layout, keeping their index entries
+
+        Args:
+            layout (str): 'sharded' (YYYY/MM/DD/) or 'flat'
+
+        Returns:
+            dict: Counts of 'moved', 'skipped' and 'conflicts'
+        """
+        moves = []
+        counts = storage_layout.migrate(self.report_dir, '.md', layout,
+                                        on_move=lambda old, new: moves.append((old, new)))
+        self.index.relocate(moves)
+        logger.info(f"Reports migrated to the {layout} layout: {counts}")
+        return counts
+
+    def save_report(self, filename, content, transcription=None, patient_info=None, metrics=None):
+        """
+        Write a new report and add it to the index
+
+        In the sharded layout (config.STORAGE_LAYOUT) the report goes to its day's
+        directory (YYYY/MM/DD/, from the date in the filename).
+
+        Args:
+            filename (str): Report filename
+            content (str): Report content
+            transcription (str, optional): Transcription the report was generated from
+            patient_info (dict, optional): Patient data
+            metrics (dict, optional): Processing metrics (provider, tokens, cost, stage latency)
+
+        Returns:
+            Path: Path to the saved report
+        """
+        report_path = storage_layout.path_for(self.report_dir, filename)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.index.upsert(
+            report_path, content, transcription=transcription, patient_info=patient_info, metrics=metrics
+        )
+        logger.info(f"Report saved successfully: {report_path.name}")
+        return report_path
+
     def get_report_content(self, report_path):
         """
-        Get report file content
+        Get report file content (archived reports are decompressed transparently)
 
         Args:
             report_path (Path): Path to report file
@@ -170,8 +257,7 @@ class ReportService:
             str or None: Report content
         """
         try:
-            with open(report_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return archive.read_text(report_path)
         except Exception as e:
             logger.error(f"Error reading report {report_path}: {e}")
             return None
@@ -188,8 +274,13 @@ class ReportService:
             bool: True if successful, False otherwise
         """
         try:
+            report_path = archive.logical_path(report_path)
             with open(report_path, 'w', encoding='utf-8') as f:
                 f.write(new_content)
+            # An edited report leaves the archive (it is compressed again once it is old)
+            for suffix in storage_layout.ARCHIVE_SUFFIXES:
+                report_path.with_name(report_path.name + suffix).unlink(missing_ok=True)
+            self.index.upsert(report_path, new_content)
             logger.info(f"Report updated successfully: {report_path.name}")
             return True
         except Exception as e:
@@ -207,7 +298,8 @@ class ReportService:
             bool: True if successful, False otherwise
         """
         try:
-            report_path.unlink()
+            (storage_layout.locate(report_path) or report_path).unlink()
+            self.index.remove(report_path)
             logger.info(f"Report deleted successfully: {report_path.name}")
             return True
         except Exception as e:
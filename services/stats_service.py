@@ -6,20 +6,34 @@ from datetime import datetime
 from pathlib import Path
 import logging
 
+from services.daily_stats import DailyStats
+from services.report_index import ReportIndex
+from services.usage_ledger import UsageLedger
+
 logger = logging.getLogger(__name__)
 
 
 class StatsService:
     """Service for managing system statistics"""
 
-    def __init__(self, report_dir):
+    def __init__(self, report_dir, index=None, ledger=None):
         """
         Initialize stats service
 
         Args:
             report_dir (Path): Directory containing reports
+            index (ReportIndex, optional): Metadata index, kept in sync by its owner
+                (default: ReportIndex on config.REPORT_INDEX_DB, reconciled here)
+            ledger (UsageLedger, optional): Per-call usage ledger (default: config.USAGE_LEDGER_DB)
         """
         self.report_dir = Path(report_dir)
+        if index is None:
+            index = ReportIndex()
+            index.reconcile(self.report_dir)
+        self.index = index
+        # Materialized daily rollups, maintained by the index on every report write
+        self.daily = DailyStats(self.report_dir, db_path=index.db_path)
+        self.ledger = ledger or UsageLedger()
 
     def get_stats(self):
         """
@@ -37,21 +51,21 @@ class StatsService:
         }
 
         try:
-            # Count reports
-            if self.report_dir.exists():
-                reports = list(self.report_dir.glob("*.md"))
-                stats['total_relatorios'] = len(reports)
-
-                # Today's reports
-                hoje = datetime.now().strftime("%Y%m%d")
-                stats['relatorios_hoje'] = sum(
-                    1 for r in reports if r.stem.startswith(hoje)
-                )
-
-                # Cost estimation ($0.05 per report - should be configurable)
-                COST_PER_REPORT = 0.05
-                stats['custo_total'] = stats['total_relatorios'] * COST_PER_REPORT
-                stats['custo_hoje'] = stats['relatorios_hoje'] * COST_PER_REPORT
+            # Totals from the daily rollups (one row per day, no file access)
+            total = self.daily.totals()
+            stats['total_relatorios'] = total['reports']
+            stats['custo_total'] = total['cost_usd']
+
+            # Today's reports
+            hoje = datetime.now().date()
+            today = self.daily.totals(start=hoje, end=hoje)
+            stats['relatorios_hoje'] = today['reports']
+            stats['custo_hoje'] = today['cost_usd']
+
+            # Median report generation time
+            latency = self.daily.latency_percentiles().get('report')
+            if latency:
+                stats['tempo_medio'] = latency['p50']
 
             logger.debug(f"Stats calculated: {stats}")
             return stats
@@ -71,44 +85,94 @@ class StatsService:
         Returns:
             int: Number of reports in range
         """
-        if not self.report_dir.exists():
+        try:
+            return self.daily.totals(start=start_date, end=end_date)['reports']
+
+        except Exception as e:
+            logger.error(f"Error counting reports in date range: {e}")
             return 0
 
-        count = 0
+    def get_total_api_cost(self):
+        """
+        Calculate total API cost (token usage recorded when reports were generated)
+
+        Returns:
+            float: Total cost in USD
+        """
         try:
-            reports = list(self.report_dir.glob("*.md"))
-            for report in reports:
-                # Parse timestamp from filename: YYYYMMDD_HHMMSS_...
-                try:
-                    date_str = report.stem.split('_')[0]
-                    report_date = datetime.strptime(date_str, "%Y%m%d")
+            return self.daily.totals()['cost_usd']
+        except Exception as e:
+            logger.error(f"Error calculating API cost: {e}")
+            return 0.0
 
-                    if start_date <= report_date <= end_date:
-                        count += 1
-                except (ValueError, IndexError):
-                    continue
+    def get_daily_counts(self, days=30):
+        """
+        Get reports per day for the last days
 
-            return count
+        Args:
+            days (int): Number of days (including today)
 
+        Returns:
+            list: (date, count) tuples, oldest first
+        """
+        try:
+            return self.daily.last_days(days)
         except Exception as e:
-            logger.error(f"Error counting reports in date range: {e}")
-            return 0
+            logger.error(f"Error getting daily counts: {e}")
+            return []
 
-    def get_total_api_cost(self, cost_per_report=0.05):
+    def get_breakdown(self, dimension, start_date=None, end_date=None):
         """
-        Calculate total API cost
+        Get report count and cost per species, attendance type, provider or report type
 
         Args:
-            cost_per_report (float): Cost per report in USD
+            dimension (str): 'species', 'attendance', 'provider' or 'type'
+            start_date (datetime, optional): Start date
+            end_date (datetime, optional): End date
 
         Returns:
-            float: Total cost
+            dict: Value -> {'reports', 'cost_usd'} ('' when unknown)
         """
         try:
-            if self.report_dir.exists():
-                report_count = len(list(self.report_dir.glob("*.md")))
-                return report_count * cost_per_report
-            return 0.0
+            return self.daily.breakdown(dimension, start=start_date, end=end_date)
         except Exception as e:
-            logger.error(f"Error calculating API cost: {e}")
-            return 0.0
+            logger.error(f"Error getting {dimension} breakdown: {e}")
+            return {}
+
+    def get_latency_percentiles(self, start_date=None, end_date=None):
+        """
+        Get transcription and report generation latency percentiles
+
+        Args:
+            start_date (datetime, optional): Start date
+            end_date (datetime, optional): End date
+
+        Returns:
+            dict: Stage -> {'count', 'p50', 'p90', 'p99'} (seconds)
+        """
+        try:
+            return self.daily.latency_percentiles(start=start_date, end=end_date)
+        except Exception as e:
+            logger.error(f"Error getting latency percentiles: {e}")
+            return {}
+
+    def get_usage_summary(self, start_date=None, end_date=None, group_by=('provider', 'model', 'kind')):
+        """
+        Get provider calls, tokens, audio, cost and latency from the usage ledger
+
+        Unlike the report rollups, this includes every billed call (tutor summaries,
+        calls of consultations that failed before saving)
+
+        Args:
+            start_date (datetime, optional): Start date
+            end_date (datetime, optional): End date
+            group_by (tuple): Any of 'provider', 'model', 'kind', 'day'
+
+        Returns:
+            list: Group dicts (see UsageLedger.summary), most expensive first
+        """
+        try:
+            return self.ledger.summary(start=start_date, end=end_date, group_by=group_by)
+        except Exception as e:
+            logger.error(f"Error getting usage summary: {e}")
+            return []
@@ -0,0 +1,238 @@
+"""
+Storage Layout Module
+Flat or date-sharded (YYYY/MM/DD/) layout of the report and transcription directories, and path
+resolution across both layouts (files written before a migration keep being found)
+"""
+from datetime import date, datetime
+import logging
+import os
+import re
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+LAYOUTS = ('flat', 'sharded')
+
+# Files saved by the app start with their creation time (YYYYMMDD_HHMMSS_...)
+FILENAME_DAY_PATTERN = re.compile(r"^(\d{8})_")
+
+# Suffixes of archived (compressed) documents, see services.archive: x.md -> x.md.zst
+ARCHIVE_SUFFIXES = ('.zst', '.gz')
+
+SHARD_PARTS = (re.compile(r"^\d{4}$"), re.compile(r"^\d{2}$"), re.compile(r"^\d{2}$"))
+
+
+def filename_day(filename):
+    """
+    Day encoded at the start of a filename
+
+    Args:
+        filename (str): File name (YYYYMMDD_...)
+
+    Returns:
+        date or None: Day, or None if the name does not start with a date
+    """
+    match = FILENAME_DAY_PATTERN.match(Path(filename).name)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def shard_dir(root, day):
+    """
+    Directory of a day in the sharded layout
+
+    Args:
+        root (Path): Report or transcription directory
+        day (date): Day
+
+    Returns:
+        Path: root/YYYY/MM/DD
+    """
+    return Path(root) / f"{day.year:04d}" / f"{day.month:02d}" / f"{day.day:02d}"
+
+
+def _is_shard(parts, partial=False):
+    if not (0 < len(parts) <= 3 if partial else len(parts) == 3):
+        return False
+    return all(pattern.match(part) for pattern, part in zip(SHARD_PARTS, parts))
+
+
+def split_path(path):
+    """
+    Root directory and root-relative name of a file in either layout
+
+    Args:
+        path (Path): File path
+
+    Returns:
+        tuple: (root Path, relative name: 'file.md' or 'YYYY/MM/DD/file.md')
+    """
+    path = Path(path)
+    shard = path.parent.parts[-3:]
+    if _is_shard(shard):
+        return path.parents[3], "/".join((*shard, path.name))
+    return path.parent, path.name
+
+
+def path_for(root, filename, day=None, layout=None):
+    """
+    Where a new file is written (creating its day directory in the sharded layout)
+
+    Args:
+        root (Path): Report or transcription directory
+        filename (str): File name
+        day (date, optional): Day of the file (default: the date in the name, else today)
+        layout (str, optional): 'flat' or 'sharded' (default: config.STORAGE_LAYOUT)
+
+    Returns:
+        Path: File path
+    """
+    if (layout or config.STORAGE_LAYOUT) != 'sharded':
+        return Path(root) / filename
+    directory = shard_dir(root, day or filename_day(filename) or date.today())
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / filename
+
+
+def resolve(root, filename, day=None):
+    """
+    Existing file, looked up in both layouts, plain or archived
+
+    Args:
+        root (Path): Report or transcription directory
+        filename (str): File name (without archive suffix)
+        day (date, optional): Day the file belongs to, when the name carries no date
+
+    Returns:
+        Path or None: Existing file (x.md, or x.md.zst / x.md.gz once archived)
+    """
+    directories = [shard_dir(root, d) for d in dict.fromkeys((day, filename_day(filename))) if d]
+    directories.append(Path(root))
+    for directory in directories:
+        for name in (filename, *(filename + suffix for suffix in ARCHIVE_SUFFIXES)):
+            if (directory / name).is_file():
+                return directory / name
+    return None
+
+
+def locate(path):
+    """
+    Current location of a file recorded before a layout migration
+
+    Args:
+        path (Path): Recorded path (flat or sharded)
+
+    Returns:
+        Path or None: Existing file
+    """
+    path = Path(path)
+    if path.is_file():
+        return path
+    if path.suffix in ARCHIVE_SUFFIXES:
+        path = path.with_suffix('')
+    root, _ = split_path(path)
+    return resolve(root, path.name)
+
+
+def _scandir(directory):
+    try:
+        return list(os.scandir(directory))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def iter_files(root, suffix, day=None):
+    """
+    Files of a directory in both layouts
+
+    With `day`, only that day's directory is listed (flat files are not dated by location).
+
+    Args:
+        root (Path): Report or transcription directory
+        suffix (str or tuple): File suffix(es) ('.md', '.txt', archived '.md.zst'...)
+        day (date, optional): Only list this day's shard
+
+    Yields:
+        tuple: (relative name, os.DirEntry)
+    """
+    if day is not None:
+        prefix = shard_dir("", day).as_posix()
+        directories = [(prefix, shard_dir(root, day))]
+    else:
+        directories = [("", Path(root))]
+    while directories:
+        prefix, directory = directories.pop()
+        depth = prefix.count("/") + 1 if prefix else 0
+        for entry in _scandir(directory):
+            try:
+                if entry.is_file():
+                    if entry.name.endswith(suffix):
+                        yield f"{prefix}/{entry.name}" if prefix else entry.name, entry
+                elif depth < 3 and entry.is_dir() and SHARD_PARTS[depth].match(entry.name):
+                    directories.append((f"{prefix}/{entry.name}" if prefix else entry.name, Path(entry.path)))
+            except OSError:
+                continue
+
+
+def migrate(root, suffix, layout='sharded', on_move=None):
+    """
+    Move existing files to a layout (os.replace: a rename on the same volume, no copy)
+
+    Files whose name carries no date are sharded by their modification day. Archived
+    copies (suffix + ARCHIVE_SUFFIXES, e.g. '.md.zst') move with the plain files.
+
+    Args:
+        root (Path): Report or transcription directory
+        suffix (str): Plain file suffix ('.md', '.txt')
+        layout (str): Target layout, 'sharded' or 'flat'
+        on_move (callable, optional): on_move(old_path, new_path), called after each move
+            (e.g. to update an index)
+
+    Returns:
+        dict: Counts of 'moved', 'skipped' (already in place) and 'conflicts' (target exists)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    root = Path(root)
+    counts = {'moved': 0, 'skipped': 0, 'conflicts': 0}
+    suffixes = (suffix, *(suffix + archived for archived in ARCHIVE_SUFFIXES))
+    for relative, entry in list(iter_files(root, suffixes)):
+        source = Path(entry.path)
+        if layout == 'flat':
+            target = root / entry.name
+        else:
+            day = filename_day(entry.name)
+            if day is None:
+                try:
+                    day = date.fromtimestamp(entry.stat().st_mtime)
+                except OSError:
+                    continue
+            target = shard_dir(root, day) / entry.name
+        if target == source:
+            counts['skipped'] += 1
+            continue
+        if target.exists():
+            logger.warning(f"Not moving {relative}: {target} already exists")
+            counts['conflicts'] += 1
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        if on_move is not None:
+            on_move(source, target)
+        counts['moved'] += 1
+
+    if layout == 'flat':
+        # Day directories left empty by the move
+        for dirpath, _, _ in sorted(os.walk(root), key=lambda item: -len(item[0])):
+            if _is_shard(Path(dirpath).relative_to(root).parts, partial=True):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+    return counts
@@ -0,0 +1,82 @@
+"""
+Transcript Segments Module
+Splits long transcriptions into token-budgeted segments for map-reduce report generation
+"""
+import re
+
+# Approximate characters per token of Portuguese text for the Claude and Gemini tokenizers;
+# budgets only need to be roughly right, so no tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of a text
+
+    Args:
+        text (str): Text
+
+    Returns:
+        int: Approximate tokens
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _units(text, max_chars):
+    """Lines, then sentences, then word runs: the largest pieces that fit max_chars"""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if len(line) <= max_chars:
+            yield line
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            if len(sentence) <= max_chars:
+                yield sentence
+                continue
+            # A single run-on sentence (common in raw Whisper output): cut between words
+            piece = []
+            size = 0
+            for word in sentence.split():
+                if piece and size + 1 + len(word) > max_chars:
+                    yield " ".join(piece)
+                    piece, size = [], 0
+                size += len(word) + (1 if piece else 0)
+                piece.append(word)
+            if piece:
+                yield " ".join(piece)
+
+
+def split_by_token_budget(text, max_tokens):
+    """
+    Split a transcription into consecutive segments of at most ``max_tokens`` (estimated)
+
+    Cuts fall on line breaks when possible, otherwise between sentences, and only
+    inside a sentence when it alone exceeds the budget. Joining the segments with
+    newlines keeps every word in order.
+
+    Args:
+        text (str): Transcription
+        max_tokens (int): Token budget per segment
+
+    Returns:
+        list: Segment strings (a single segment when the text fits)
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    segments = []
+    current = []
+    size = 0
+    for unit in _units(text, max_chars):
+        if current and size + 1 + len(unit) > max_chars:
+            segments.append("\n".join(current))
+            current, size = [], 0
+        size += len(unit) + (1 if current else 0)
+        current.append(unit)
+    if current:
+        segments.append("\n".join(current))
+    return segments
@@ -0,0 +1,140 @@
+"""
+Transcription Cache Module
+Content-addressed on-disk cache of transcription results
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import config
+from utils import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Compute the SHA-256 of a file without loading it whole into memory
+
+    Args:
+        path (Path): File to hash
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """Stores transcription results keyed by audio content and model settings"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Initialize transcription cache
+
+        Args:
+            cache_dir (Path, optional): Cache directory (default: TRANSCRIPTION_DIR/.cache)
+            max_bytes (int, optional): Size limit before LRU eviction
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(config.TRANSCRIPTION_DIR) / ".cache"
+        self.max_bytes = (
+            int(config.TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_hash, provider, model, language, options=None):
+        """
+        Build the cache key for an audio file and transcription settings
+
+        Args:
+            audio_hash (str): SHA-256 of the audio bytes
+            provider (str): Transcription provider
+            model (str): Model name
+            language (str): Transcription language
+            options (dict, optional): Decoding options that affect the output
+
+        Returns:
+            str: Hex cache key
+        """
+        payload = json.dumps({
+            'audio': audio_hash,
+            'provider': provider,
+            'model': model,
+            'language': language,
+            'options': options or {},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Get a cached result
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict or None: Cached result with 'text', 'segments' and 'metadata'
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # Touch for LRU ordering
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, result, metadata=None):
+        """
+        Store a transcription result
+
+        Args:
+            key (str): Cache key
+            result (dict): Transcription result ('text' and optional 'segments')
+            metadata (dict, optional): Timing and provenance information
+        """
+        entry = {
+            'text': result.get('text', ''),
+            'segments': result.get('segments', []),
+            'language': result.get('language'),
+            'metadata': {**(metadata or {}), 'cached_at': time.time()},
+        }
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=float)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write transcription cache entry: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """Delete least-recently-used entries until the cache fits its size limit"""
+        evict_lru_files(self.cache_dir, "*/*.json", self.max_bytes)
@@ -1,51 +1,175 @@
 import os
+import shutil
 import logging
-import whisper
+import tempfile
+import time
+from datetime import datetime
 import google.generativeai as genai
 from pathlib import Path
 import config
 from abc import ABC, abstractmethod
+from services.model_registry import get_model_registry
+from services import audio_chunking
+from services.audio_preprocessing import encode_audio
+from services.transcription_cache import hash_file
+from services.gemini_uploads import get_upload_reaper
 
 class TranscriptionService(ABC):
+    provider = None
+    model_name = None
+
+    @abstractmethod
+    def transcribe(self, audio_path: Path, audio=None, progress=None, trimmed=False) -> dict:
+        """
+        Transcreve o arquivo de áudio. Se `audio` (PCM mono 16 kHz float32) for
+        informado, ele é usado no lugar do conteúdo do arquivo (ex: áudio sem silêncio).
+        `trimmed` indica que `audio` não tem mais o mesmo conteúdo do arquivo (silêncio
+        removido), então o arquivo não pode ser usado em seu lugar.
+        Se `progress` for informado, é chamado com os segundos de áudio já transcritos
+        (quando o provedor permite acompanhar o andamento).
+        """
+        pass
+
     @abstractmethod
-    def transcribe(self, audio_path: Path) -> dict:
+    def cache_params(self) -> dict:
+        """Parâmetros que afetam o resultado (usados na chave do cache de transcrições)"""
+        pass
+
+    def consultation_finished(self, audio_path: Path):
+        """Avisa que a consulta deste áudio foi concluída (libera recursos remotos, se houver)"""
         pass
 
+    def usage(self, result: dict) -> dict:
+        """
+        Uso da chamada que produziu `result` (provedor, modelo e tokens), no formato de
+        LLMService.last_usage; provedores sem contagem de tokens retornam zero tokens
+        """
+        return result.get('usage') or {
+            'provider': self.provider,
+            'model': self.model_name,
+            'input_tokens': 0,
+            'output_tokens': 0,
+        }
+
 class WhisperTranscriptionService(TranscriptionService):
-    def __init__(self, model_name=config.WHISPER_MODEL):
+    provider = "openai_whisper"
+
+    def __init__(self, model_name=config.WHISPER_MODEL, device=config.WHISPER_DEVICE, registry=None,
+                 chunked=config.WHISPER_CHUNKED, workers=config.WHISPER_WORKERS,
+                 chunk_seconds=config.WHISPER_CHUNK_SECONDS,
+                 overlap_seconds=config.WHISPER_CHUNK_OVERLAP_SECONDS):
         self.model_name = model_name
-        self.model = None
+        self.device = device
+        # Registro compartilhado pelo processo: o modelo é carregado uma única vez
+        # e reaproveitado entre instâncias, sessões e reruns do Streamlit
+        self.registry = registry or get_model_registry()
+        self.chunked = chunked
+        self.workers = workers
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+
+    def _decode_options(self) -> dict:
+        return {
+            'language': config.DEFAULT_LANGUAGE,
+            'verbose': False,
+            'fp16': False,
+            'beam_size': 1,
+            'best_of': 1,
+            'temperature': 0.0
+        }
 
-    def _load_model(self):
-        if self.model is None:
-            logging.info(f"Carregando modelo Whisper '{self.model_name}'...")
-            self.model = whisper.load_model(self.model_name)
+    def cache_params(self) -> dict:
+        options = self._decode_options()
+        if self.chunked:
+            # A divisão em blocos altera levemente o resultado
+            options.update(chunk_seconds=self.chunk_seconds, overlap_seconds=self.overlap_seconds)
+        return {
+            'provider': 'openai_whisper',
+            'model': self.model_name,
+            'language': config.DEFAULT_LANGUAGE,
+            'options': options
+        }
+
+    def usage(self, result: dict) -> dict:
+        # Modelo local: sem tokens faturados, custo pela tabela (whisper-<modelo>)
+        return {'provider': self.provider, 'model': f"whisper-{self.model_name}", 'input_tokens': 0, 'output_tokens': 0}
 
-    def transcribe(self, audio_path: Path) -> dict:
-        self._load_model()
+    def transcribe(self, audio_path: Path, audio=None, progress=None, trimmed=False) -> dict:
         logging.info(f"Iniciando transcrição Whisper: {audio_path.name}")
         
         try:
-            result = self.model.transcribe(
-                str(audio_path),
-                language=config.DEFAULT_LANGUAGE,
-                verbose=False,
-                fp16=False,
-                beam_size=1,
-                best_of=1,
-                temperature=0.0
-            )
+            if self.chunked:
+                if audio is None:
+                    import whisper
+                    audio = whisper.load_audio(str(audio_path))
+                # Só vale a pena dividir quando o áudio tem mais de um bloco e meio
+                if len(audio) > 1.5 * self.chunk_seconds * audio_chunking.SAMPLE_RATE:
+                    return audio_chunking.transcribe_chunked(
+                        audio,
+                        self.model_name,
+                        self.device,
+                        self._decode_options(),
+                        workers=self.workers,
+                        chunk_seconds=self.chunk_seconds,
+                        overlap_seconds=self.overlap_seconds,
+                        progress=progress
+                    )
+                source = audio
+            else:
+                source = str(audio_path) if audio is None else audio
+
+            with self.registry.lease(self.model_name, self.device) as model:
+                result = model.transcribe(source, **self._decode_options())
             return result
         except Exception as e:
             logging.error(f"Erro na transcrição Whisper: {e}")
             raise
 
 class GeminiTranscriptionService(TranscriptionService):
-    def __init__(self, api_key=config.GOOGLE_API_KEY):
+    provider = "google_gemini"
+    model_name = config.GEMINI_MODEL_FLASH
+
+    # Argumentos do ffmpeg por formato de upload: (extensão, argumentos de saída)
+    UPLOAD_FORMATS = {
+        'opus': ('.ogg', ['-c:a', 'libopus', '-application', 'voip']),
+        'flac': ('.flac', ['-c:a', 'flac'])
+    }
+    # Formatos sem perdas tentados, em ordem, quando o áudio sem silêncio precisa ser
+    # enviado e o formato configurado é "original" ou falha
+    LOSSLESS_FORMATS = (('.flac', ['-c:a', 'flac']), ('.wav', ['-c:a', 'pcm_s16le']))
+
+    def __init__(self, api_key=config.GOOGLE_API_KEY, uploader=None,
+                 upload_format=config.GEMINI_UPLOAD_FORMAT,
+                 opus_bitrate=config.GEMINI_UPLOAD_OPUS_BITRATE,
+                 transcode_min_bytes=config.GEMINI_TRANSCODE_MIN_BYTES,
+                 manifest=None, reaper=None, file_getter=None):
         if not api_key:
             raise ValueError("GOOGLE_API_KEY não configurada")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(config.GEMINI_MODEL_FLASH)
+        self.model = genai.GenerativeModel(self.model_name)
+        self.prompt = "Transcreva este áudio de consulta veterinária fielmente em português."
+        # Função de upload (substituível por um endpoint local nos testes)
+        self.uploader = uploader or genai.upload_file
+        self.upload_format = upload_format
+        self.opus_bitrate = opus_bitrate
+        self.transcode_min_bytes = transcode_min_bytes
+        # Manifesto de uploads: reaproveita arquivos ainda válidos no Gemini e
+        # o coletor apaga os que não são mais necessários
+        self.file_getter = file_getter or genai.get_file
+        if manifest is None:
+            reaper = reaper or get_upload_reaper(genai.delete_file)
+            manifest = reaper.manifest
+        self.manifest = manifest
+        self.reaper = reaper
+        self._active_uploads = {}
+
+    def cache_params(self) -> dict:
+        return {
+            'provider': 'google_gemini',
+            'model': config.GEMINI_MODEL_FLASH,
+            'language': config.DEFAULT_LANGUAGE,
+            'options': {'prompt': self.prompt}
+        }
     
     def _get_mime_type(self, audio_path: Path) -> str:
         """Detecta MIME type baseado na extensão do arquivo"""
@@ -59,28 +183,162 @@ class GeminiTranscriptionService(TranscriptionService):
         ext = audio_path.suffix.lower()
         return mime_types.get(ext, 'audio/mpeg')  # Default para mp3
 
-    def transcribe(self, audio_path: Path) -> dict:
+    def _upload_args(self):
+        """Extensão e argumentos do ffmpeg do formato de upload configurado"""
+        suffix, args = self.UPLOAD_FORMATS[self.upload_format]
+        if self.upload_format == 'opus':
+            args = args + ['-b:a', self.opus_bitrate]
+        return suffix, args
+
+    def _transcode_for_upload(self, audio_path: Path, audio, temp_dir: str, trimmed=False):
+        """
+        Recodifica o PCM em um formato compacto para voz e retorna o caminho a enviar.
+
+        Áudio sem silêncio (trimmed) é sempre enviado recodificado: o original traria o
+        silêncio de volta, e o Gemini cobra por segundo de áudio. Sem corte, o original tem
+        o mesmo conteúdo e é enviado quando a recodificação está desligada, não compensa
+        ou falha.
+        """
+        if audio is None:
+            return audio_path
+        if trimmed:
+            return self._encode_trimmed(audio_path, audio, temp_dir)
+
+        original_bytes = audio_path.stat().st_size
+        if self.upload_format not in self.UPLOAD_FORMATS:
+            return audio_path
+        if original_bytes < self.transcode_min_bytes:
+            logging.info(f"Upload sem recodificar ({original_bytes / 1024:.0f} KB abaixo do limite)")
+            return audio_path
+
+        suffix, args = self._upload_args()
+        encoded_path = Path(temp_dir) / f"{audio_path.stem}{suffix}"
+        try:
+            encode_audio(audio, encoded_path, extra_args=args)
+        except RuntimeError as e:
+            logging.warning(f"Recodificação para upload falhou, enviando original: {e}")
+            return audio_path
+
+        # Mesmo áudio nos dois arquivos: o recodificado só compensa se for menor
+        if encoded_path.stat().st_size >= original_bytes:
+            return audio_path
+        return encoded_path
+
+    def _encode_trimmed(self, audio_path: Path, audio, temp_dir: str):
+        """Áudio sem silêncio no formato configurado; se ele falhar (ou for "original"), em FLAC ou WAV"""
+        formats = [self._upload_args()] if self.upload_format in self.UPLOAD_FORMATS else []
+        formats += [fmt for fmt in self.LOSSLESS_FORMATS if fmt not in formats]
+        for suffix, args in formats:
+            encoded_path = Path(temp_dir) / f"{audio_path.stem}{suffix}"
+            try:
+                encode_audio(audio, encoded_path, extra_args=args)
+                return encoded_path
+            except RuntimeError as e:
+                logging.warning(f"Recodificação do áudio sem silêncio em {suffix} falhou: {e}")
+        raise RuntimeError(f"Não foi possível codificar o áudio sem silêncio de {audio_path.name}")
+
+    def _upload_key(self, audio_path: Path, audio) -> str:
+        """Chave do conteúdo enviado: áudio original + forma de recodificação"""
+        samples = 'original' if audio is None else len(audio)
+        return f"{hash_file(audio_path)}:{self.upload_format}:{self.opus_bitrate}:{samples}"
+
+    def _reuse_upload(self, upload_key: str):
+        """Retorna o arquivo remoto de um upload anterior ainda válido, se existir"""
+        remote_name = self.manifest.get_reusable(upload_key)
+        if remote_name is None:
+            return None
+        try:
+            audio_file = self.file_getter(remote_name)
+            logging.info(f"Reaproveitando upload no Gemini: {remote_name}")
+            return audio_file
+        except Exception as e:
+            logging.info(f"Upload {remote_name} não está mais disponível ({e}); enviando novamente")
+            self.manifest.forget(upload_key)
+            return None
+
+    def consultation_finished(self, audio_path: Path):
+        upload_key = self._active_uploads.pop(Path(audio_path), None)
+        if upload_key:
+            self.manifest.release(upload_key)
+            if self.reaper is not None:
+                self.reaper.wake()
+
+    def _usage(self, response) -> dict:
+        metadata = getattr(response, 'usage_metadata', None)
+        return {
+            'provider': self.provider,
+            'model': self.model_name,
+            'input_tokens': int(getattr(metadata, 'prompt_token_count', 0) or 0),
+            'output_tokens': int(getattr(metadata, 'candidates_token_count', 0) or 0),
+        }
+
+    def transcribe(self, audio_path: Path, audio=None, progress=None, trimmed=False) -> dict:
         logging.info(f"Iniciando transcrição Gemini: {audio_path.name}")
         
+        upload_key = self._upload_key(audio_path, audio)
+        audio_file = self._reuse_upload(upload_key)
+        if audio_file is not None:
+            response = self.model.generate_content([self.prompt, audio_file])
+            self._active_uploads[Path(audio_path)] = upload_key
+            original_bytes = audio_path.stat().st_size
+            return {'text': response.text, 'usage': self._usage(response), 'upload': {
+                'format': 'reused',
+                'remote_name': audio_file.name,
+                'original_bytes': original_bytes,
+                'uploaded_bytes': 0,
+                'bytes_saved': original_bytes,
+                'transcode_seconds': 0.0,
+                'upload_seconds': 0.0
+            }}
+
+        temp_dir = tempfile.mkdtemp(prefix="gemini_upload_")
         try:
+            # PCM do cache de ingestão (já sem silêncio, se o VAD cortou algo):
+            # recodificar em formato compacto, sem decodificar o original de novo
+            start = time.perf_counter()
+            upload_path = self._transcode_for_upload(audio_path, audio, temp_dir, trimmed=trimmed)
+            transcode_seconds = time.perf_counter() - start
+
             # Upload do arquivo para o Gemini com MIME type explícito
-            mime_type = self._get_mime_type(audio_path)
+            mime_type = self._get_mime_type(upload_path)
             logging.info(f"Fazendo upload do áudio para o Gemini (MIME: {mime_type})...")
-            audio_file = genai.upload_file(path=audio_path, mime_type=mime_type)
-            
-            # Prompt para transcrição
-            prompt = "Transcreva este áudio de consulta veterinária fielmente em português."
-            
-            response = self.model.generate_content([prompt, audio_file])
-            
-            # Limpeza (opcional, mas boa prática deletar arquivos da nuvem se não precisar)
-            # audio_file.delete() 
+            start = time.perf_counter()
+            audio_file = self.uploader(path=upload_path, mime_type=mime_type)
+            upload_seconds = time.perf_counter() - start
+            expires_at = getattr(audio_file, 'expiration_time', None)
+            self.manifest.record(
+                upload_key, audio_file.name,
+                expires_at if isinstance(expires_at, datetime) else None
+            )
+
+            original_bytes = audio_path.stat().st_size
+            uploaded_bytes = upload_path.stat().st_size
+            upload_stats = {
+                'format': upload_path.suffix.lstrip('.') if upload_path != audio_path else 'original',
+                'original_bytes': original_bytes,
+                'uploaded_bytes': uploaded_bytes,
+                'bytes_saved': original_bytes - uploaded_bytes,
+                'transcode_seconds': round(transcode_seconds, 3),
+                'upload_seconds': round(upload_seconds, 3)
+            }
+            logging.info(
+                f"Upload Gemini {audio_path.name}: {uploaded_bytes / 1024:.0f} KB "
+                f"({upload_stats['bytes_saved'] / 1024:.0f} KB economizados) em {upload_seconds:.1f}s"
+            )
             
-            return {'text': response.text}
+            response = self.model.generate_content([self.prompt, audio_file])
+
+            # O arquivo remoto fica registrado no manifesto: é reaproveitado em novas
+            # tentativas e apagado pelo coletor quando a consulta termina ou expira
+            self._active_uploads[Path(audio_path)] = upload_key
+
+            return {'text': response.text, 'usage': self._usage(response), 'upload': upload_stats}
             
         except Exception as e:
             logging.error(f"Erro na transcrição Gemini: {e}")
             raise
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 def get_transcription_service():
     provider = config.TRANSCRIPTION_PROVIDER
@@ -0,0 +1,277 @@
+"""
+Usage Ledger Module
+One compact row per provider call (transcription or LLM): tokens, audio seconds, latency and cost,
+linked to the report it contributed to
+"""
+from datetime import date, datetime, timedelta
+import logging
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+import config
+from services.llm_service import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+# Long transcriptions replace the 'report' call by one 'report_extract' call per segment
+# and a final 'report_synthesis' call (map-reduce)
+CALL_KINDS = ('transcription', 'report', 'report_extract', 'report_synthesis', 'tutor_summary')
+
+GROUP_COLUMNS = {
+    'provider': "provider",
+    'model': "model",
+    'kind': "kind",
+    'day': "date(ts, 'unixepoch', 'localtime')",
+}
+
+
+def call_cost(kind, usage):
+    """
+    Cost of one call from the configured price tables
+
+    Args:
+        kind (str): Call kind (transcription calls use config.TRANSCRIPTION_PRICES, the others config.LLM_PRICES)
+        usage (dict): 'model', 'input_tokens', 'output_tokens'
+
+    Returns:
+        float or None: USD, or None when the model has no configured price
+    """
+    return estimate_cost(usage, config.TRANSCRIPTION_PRICES if kind == 'transcription' else config.LLM_PRICES)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))]
+
+
+class UsageLedger:
+    """SQLite ledger of provider calls"""
+
+    def __init__(self, db_path=None):
+        """
+        Initialize usage ledger
+
+        Args:
+            db_path (Path, optional): SQLite file (default: config.USAGE_LEDGER_DB)
+        """
+        self.db_path = Path(db_path or config.USAGE_LEDGER_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    id INTEGER PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    consultation_id TEXT,
+                    report TEXT,
+                    kind TEXT NOT NULL,
+                    provider TEXT,
+                    model TEXT,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    audio_seconds REAL,
+                    latency_seconds REAL,
+                    ttft_seconds REAL,
+                    cached_input_tokens INTEGER NOT NULL DEFAULT 0,
+                    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost_usd REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage(ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_consultation ON usage(consultation_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_report ON usage(report)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, kind, usage, latency_seconds=None, audio_seconds=None, consultation_id=None, report=None,
+               ttft_seconds=None):
+        """
+        Record one provider call
+
+        Args:
+            kind (str): One of CALL_KINDS
+            usage (dict): 'provider', 'model', 'input_tokens', 'output_tokens' and optionally
+                'cached_input_tokens' / 'cache_write_tokens' (as in LLMService.last_usage)
+            latency_seconds (float, optional): Wall time of the call
+            audio_seconds (float, optional): Audio sent (transcription calls)
+            consultation_id (str, optional): Id linking the calls of one consultation until its report is saved
+            report (str or Path, optional): Report the call belongs to, when already known
+            ttft_seconds (float, optional): Time to the first streamed text (streaming LLM calls)
+
+        Returns:
+            float or None: Cost of the call (USD)
+        """
+        usage = {'input_tokens': 0, 'output_tokens': 0, **(usage or {})}
+        cost = call_cost(kind, usage)
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT INTO usage (ts, consultation_id, report, kind, provider, model, input_tokens, "
+                    "output_tokens, audio_seconds, latency_seconds, ttft_seconds, cached_input_tokens, "
+                    "cache_write_tokens, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), consultation_id, Path(report).name if report else None, kind,
+                     usage.get('provider'), usage.get('model'), usage.get('input_tokens') or 0,
+                     usage.get('output_tokens') or 0, audio_seconds, latency_seconds, ttft_seconds,
+                     usage.get('cached_input_tokens') or 0, usage.get('cache_write_tokens') or 0, cost)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Accounting must never break the processing itself
+            logger.warning(f"Could not record {kind} usage: {e}")
+        return cost
+
+    def link(self, consultation_id, report):
+        """
+        Attach the calls of a consultation to its saved report
+
+        Args:
+            consultation_id (str): Consultation id used when recording
+            report (str or Path): Report file
+
+        Returns:
+            dict: 'input_tokens', 'output_tokens' and 'cost_usd' of the consultation (None if no calls)
+        """
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE usage SET report = ? WHERE consultation_id = ?", (Path(report).name, consultation_id))
+            conn.commit()
+            row = conn.execute(
+                "SELECT COUNT(*) AS calls, SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+                "SUM(cost_usd) AS cost_usd FROM usage WHERE consultation_id = ?",
+                (consultation_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row['calls']:
+            return None
+        return {'input_tokens': row['input_tokens'], 'output_tokens': row['output_tokens'], 'cost_usd': row['cost_usd']}
+
+    def calls(self, report):
+        """
+        Calls linked to a report
+
+        Args:
+            report (str or Path): Report file
+
+        Returns:
+            list: Call dicts, oldest first
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM usage WHERE report = ? ORDER BY id", (Path(report).name,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def summary(self, start=None, end=None, group_by=('provider', 'model', 'kind')):
+        """
+        Aggregate calls per group (for choosing models against real spend and latency)
+
+        Args:
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+            group_by (tuple): Any of 'provider', 'model', 'kind', 'day'
+
+        Returns:
+            list: Dicts with the group columns plus 'calls', 'input_tokens', 'output_tokens',
+            'audio_seconds', 'cost_usd', 'unpriced_calls', 'latency_p50', 'latency_p90', 'latency_mean',
+            'ttft_p50' and 'ttft_p90' (None without streamed calls), 'cached_input_tokens' (input
+            tokens served from the prompt cache), 'cache_write_tokens', 'cache_hits' (calls with a
+            cache read) and 'cache_hit_rate' (most expensive first)
+        """
+        start_ts = datetime.combine(start, datetime.min.time()).timestamp() if start else 0
+        end_ts = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp() if end else time.time() + 1
+        columns = [GROUP_COLUMNS[name] for name in group_by]
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(f'{column} AS {name}' for column, name in zip(columns, group_by))}, "
+                "input_tokens, output_tokens, audio_seconds, latency_seconds, ttft_seconds, cached_input_tokens, "
+                "cache_write_tokens, cost_usd FROM usage WHERE ts >= ? AND ts < ?",
+                (start_ts, end_ts)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        groups = {}
+        for row in rows:
+            key = tuple(row[name] for name in group_by)
+            group = groups.setdefault(key, {
+                **dict(zip(group_by, key)), 'calls': 0, 'input_tokens': 0, 'output_tokens': 0,
+                'audio_seconds': 0.0, 'cost_usd': 0.0, 'unpriced_calls': 0, 'cached_input_tokens': 0,
+                'cache_write_tokens': 0, 'cache_hits': 0, '_latencies': [], '_ttfts': []
+            })
+            group['calls'] += 1
+            group['input_tokens'] += row['input_tokens']
+            group['output_tokens'] += row['output_tokens']
+            group['audio_seconds'] += row['audio_seconds'] or 0.0
+            group['cached_input_tokens'] += row['cached_input_tokens']
+            group['cache_write_tokens'] += row['cache_write_tokens']
+            if row['cached_input_tokens']:
+                group['cache_hits'] += 1
+            if row['cost_usd'] is None:
+                group['unpriced_calls'] += 1
+            else:
+                group['cost_usd'] += row['cost_usd']
+            if row['latency_seconds'] is not None:
+                group['_latencies'].append(row['latency_seconds'])
+            if row['ttft_seconds'] is not None:
+                group['_ttfts'].append(row['ttft_seconds'])
+
+        result = []
+        for group in groups.values():
+            latencies = group.pop('_latencies')
+            group['latency_p50'] = _percentile(latencies, 50)
+            group['latency_p90'] = _percentile(latencies, 90)
+            group['latency_mean'] = statistics.mean(latencies) if latencies else None
+            ttfts = group.pop('_ttfts')
+            group['ttft_p50'] = _percentile(ttfts, 50)
+            group['ttft_p90'] = _percentile(ttfts, 90)
+            group['cache_hit_rate'] = group['cache_hits'] / group['calls']
+            result.append(group)
+        result.sort(key=lambda g: (-g['cost_usd'], -g['calls']))
+        return result
+
+    def total_cost(self, start=None, end=None):
+        """
+        Total spend in a period
+
+        Args:
+            start (date, optional): First day (inclusive)
+            end (date, optional): Last day (inclusive)
+
+        Returns:
+            float: USD
+        """
+        return sum(group['cost_usd'] for group in self.summary(start, end, group_by=('kind',)))
+
+
+def last_days(days):
+    """
+    (start, end) dates covering the last days, including today
+
+    Args:
+        days (int): Number of days
+
+    Returns:
+        tuple: (date, date)
+    """
+    today = date.today()
+    return today - timedelta(days=days - 1), today
@@ -134,6 +134,9 @@ Gere um relatório veterinário estruturado.
     monkeypatch.setattr(config, 'REPORT_DIR', report_dir)
     monkeypatch.setattr(config, 'TEMPLATE_DIR', template_dir)
     monkeypatch.setattr(config, 'PROMPT_TEMPLATE_FILE', prompt_template)
+    monkeypatch.setattr(config, 'REPORT_INDEX_DB', temp_dir / "report_index.db")
+    monkeypatch.setattr(config, 'USAGE_LEDGER_DB', temp_dir / "usage_ledger.db")
+    monkeypatch.setattr(config, 'LLM_CACHE_DIR', temp_dir / "llm_cache")
 
     return {
         'audio_dir': audio_dir,
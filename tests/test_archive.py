@@ -0,0 +1,107 @@
+"""
+Testes para o arquivamento (compressão) de relatórios e transcrições antigos
+"""
+import os
+import time
+import pytest
+import config
+from services import archive, storage_layout
+from services.report_index import ReportIndex
+from services.report_service import ReportService
+
+TEMPLATE = """# RELATÓRIO DE CONSULTA VETERINÁRIA
+- **Paciente:** {nome} | **Espécie:** Canina | **Raça:** SRD
+- **Tutor:** Maria Souza
+## Anamnese
+Tutor relata {queixa} há {dias} dias. Alimentação com ração seca, vacinação em dia.
+## Exame físico
+Mucosas normocoradas, TPC < 2s, linfonodos sem alterações, hidratação adequada.
+## Conduta
+Prescrito {remedio} por {dias} dias. Retorno em 15 dias para reavaliação.
+"""
+
+
+@pytest.fixture
+def report_dir(temp_dir):
+    directory = temp_dir / "relatorios"
+    directory.mkdir()
+    return directory
+
+
+def _age(path, days):
+    old = time.time() - days * 86400
+    os.utime(path, (old, old))
+
+
+def _fill(service, count):
+    paths = []
+    for n in range(count):
+        paths.append(service.save_report(
+            f"202401{n % 28 + 1:02d}_1000{n:02d}_Pet{n}_consulta.md",
+            TEMPLATE.format(nome=f"Pet{n}", queixa=["vômito", "tosse", "prurido"][n % 3], dias=n % 9 + 1,
+                            remedio=["amoxicilina", "prednisolona", "omeprazol"][n % 3]),
+            metrics={'provider': "google_gemini", 'cost_usd': 0.01}
+        ))
+    return paths
+
+
+@pytest.mark.unit
+def test_zstd_archive_with_dictionary_is_read_transparently(report_dir, temp_dir, monkeypatch):
+    """Testa a compressão zstd com dicionário, leitura transparente, edição e exclusão"""
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(config, 'ARCHIVE_DICT_DIR', temp_dir / "dicionarios")
+    index = ReportIndex(temp_dir / "report_index.db")
+    service = ReportService(report_dir, index=index)
+    paths = _fill(service, 40)
+    for path in paths[:30]:
+        _age(path, 120)
+
+    archiver = archive.Archiver(codec='zstd', level=9, use_dictionary=True)
+    stats = service.archive_reports(older_than_days=90, archiver=archiver)
+    assert stats['files'] == 30
+    assert stats['dictionary'] is not None
+    assert stats['ratio'] > 3
+    assert not paths[0].exists()
+
+    # Índice segue válido sem reler os arquivos; leitura e busca transparentes
+    assert index.reconcile(report_dir) == {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 40}
+    assert service.get_report_content(paths[0]) == TEMPLATE.format(
+        nome="Pet0", queixa="vômito", dias=1, remedio="amoxicilina"
+    )
+    assert storage_layout.locate(paths[0]).name.endswith(".md.zst")
+    assert (temp_dir / "dicionarios" / f"reports-{stats['dictionary']}.zdict").exists()
+    assert len(service.full_text_search("prednisolona", limit=50)) == 13
+    assert index.get(paths[1])['cost_usd'] == pytest.approx(0.01)
+
+    # Editar tira o relatório do arquivo; apagar remove o arquivo comprimido
+    assert service.update_report(paths[0], "Revisão")
+    assert paths[0].read_text(encoding='utf-8') == "Revisão"
+    assert storage_layout.locate(paths[0]) == paths[0]
+    assert service.delete_report(paths[1])
+    assert storage_layout.locate(paths[1]) is None
+    assert service.count_reports() == 39
+
+    stored = archive.archive_stats(report_dir, '.md')
+    assert stored['archived']['files'] == 28
+    assert stored['plain']['files'] == 11
+    assert stored['ratio'] > 3
+
+
+@pytest.mark.unit
+def test_gzip_archive_of_transcriptions(report_dir, temp_dir):
+    """Testa a compressão gzip e a transcrição arquivada encontrada pelo índice"""
+    transcription_dir = temp_dir / "transcricoes"
+    transcription_dir.mkdir()
+    transcription = transcription_dir / "rex.mp3_transcricao.txt"
+    transcription.write_text("o tutor relatou tosse seca " * 50, encoding='utf-8')
+    _age(transcription, 200)
+
+    stats = archive.Archiver(codec='gzip', level=9).archive(transcription_dir, '.txt', 'transcriptions')
+    assert stats['files'] == 1 and stats['ratio'] > 5
+    assert (transcription_dir / "rex.mp3_transcricao.txt.gz").exists()
+    assert archive.read_text(transcription).startswith("o tutor relatou")
+
+    (report_dir / "20240103_080000_Rex_rex.mp3.md").write_text("Traqueíte", encoding='utf-8')
+    service = ReportService(report_dir, index=ReportIndex(temp_dir / "report_index.db"),
+                            transcription_dir=transcription_dir)
+    assert [r['paciente'] for r in service.full_text_search("tosse")] == ['Rex']
@@ -0,0 +1,123 @@
+"""
+Testes para a divisão e costura de blocos de áudio
+"""
+from concurrent.futures import Future
+import numpy as np
+import pytest
+from services import audio_chunking
+from services.audio_chunking import plan_chunks, stitch_chunks, SAMPLE_RATE
+
+
+class InlinePool:
+    """Executor síncrono no lugar do pool de processos (conta quantos pools são criados)"""
+    created = []
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.shut_down = False
+        InlinePool.created.append(self)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def _tone_with_silences(seconds, silence_at):
+    """Gera um sinal com 'fala' contínua e pequenos silêncios nos instantes indicados"""
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.3).astype(np.float32)
+    for t in silence_at:
+        start = int(t * SAMPLE_RATE)
+        audio[start:start + int(0.5 * SAMPLE_RATE)] = 0.0
+    return audio
+
+
+@pytest.mark.unit
+def test_plan_chunks_short_audio_single_window():
+    """Testa que áudio curto não é dividido"""
+    audio = np.zeros(10 * SAMPLE_RATE, dtype=np.float32)
+    assert plan_chunks(audio, chunk_seconds=30, overlap_seconds=1) == [(0, len(audio))]
+
+
+@pytest.mark.unit
+def test_plan_chunks_cuts_at_silence_with_overlap():
+    """Testa que os cortes caem nos silêncios e as janelas se sobrepõem"""
+    audio = _tone_with_silences(100, silence_at=[27, 55, 83])
+    windows = plan_chunks(audio, chunk_seconds=30, overlap_seconds=1)
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(audio)
+    for (start, end), (next_start, _) in zip(windows, windows[1:]):
+        # Corte dentro do silêncio e sobreposição de 1s
+        assert end - next_start == SAMPLE_RATE
+        cut_seconds = next_start / SAMPLE_RATE
+        assert any(t <= cut_seconds <= t + 0.5 for t in (27, 55, 83))
+
+
+@pytest.mark.unit
+def test_stitch_chunks_removes_duplicated_overlap_words():
+    """Testa que palavras repetidas na sobreposição são removidas"""
+    windows = [(0, 31 * SAMPLE_RATE), (30 * SAMPLE_RATE, 60 * SAMPLE_RATE)]
+    results = [
+        {'language': 'pt', 'segments': [
+            {'id': 0, 'start': 0.0, 'end': 10.0, 'text': ' Paciente com prurido.'},
+            {'id': 1, 'start': 28.0, 'end': 31.0, 'text': ' Prescrevo prednisolona'},
+        ]},
+        {'language': 'pt', 'segments': [
+            {'id': 0, 'start': 0.0, 'end': 2.0, 'text': ' prescrevo prednisolona 5mg'},
+            {'id': 1, 'start': 2.0, 'end': 6.0, 'text': ' a cada 12 horas.'},
+        ]},
+    ]
+
+    stitched = stitch_chunks(results, windows)
+
+    assert stitched['text'] == "Paciente com prurido. Prescrevo prednisolona 5mg a cada 12 horas."
+    assert [s['id'] for s in stitched['segments']] == [0, 1, 2, 3]
+    assert stitched['segments'][2]['start'] == 30.0
+    assert stitched['segments'][3]['end'] == 36.0
+
+
+@pytest.mark.unit
+def test_stitch_chunks_without_text_match_drops_covered_segments():
+    """Testa o descarte por tempo quando não há correspondência de palavras"""
+    windows = [(0, 31 * SAMPLE_RATE), (30 * SAMPLE_RATE, 60 * SAMPLE_RATE)]
+    results = [
+        {'segments': [{'start': 25.0, 'end': 30.8, 'text': ' Retorno em quinze dias.'}]},
+        {'segments': [
+            {'start': 0.0, 'end': 0.7, 'text': ' dias'},
+            {'start': 1.0, 'end': 4.0, 'text': ' Próxima etapa do exame.'},
+        ]},
+    ]
+
+    stitched = stitch_chunks(results, windows)
+
+    assert stitched['text'] == "Retorno em quinze dias. Próxima etapa do exame."
+
+
+@pytest.mark.unit
+def test_transcribe_chunked_reuses_worker_pool(monkeypatch):
+    """Testa que gravações seguidas reutilizam o mesmo pool (modelo carregado uma vez por worker)"""
+    InlinePool.created = []
+    monkeypatch.setattr(audio_chunking, 'ProcessPoolExecutor', InlinePool)
+    monkeypatch.setattr(audio_chunking, '_pools', {})
+    monkeypatch.setattr(audio_chunking, '_transcribe_chunk', lambda model, device, chunk, options: {
+        'text': " bloco", 'segments': [{'start': 0.0, 'end': len(chunk) / SAMPLE_RATE, 'text': " bloco"}]
+    })
+    audio = _tone_with_silences(100, [28, 57, 86])
+
+    for _ in range(3):
+        result = audio_chunking.transcribe_chunked(audio, "base", None, {}, workers=2,
+                                                   chunk_seconds=30, overlap_seconds=1)
+        assert result['segments']
+    assert len(InlinePool.created) == 1
+
+    audio_chunking.transcribe_chunked(audio, "small", None, {}, workers=2, chunk_seconds=30, overlap_seconds=1)
+    assert len(InlinePool.created) == 2
+
+    audio_chunking.shutdown_pools()
+    assert all(pool.shut_down for pool in InlinePool.created)
+    assert audio_chunking._pools == {}
@@ -0,0 +1,99 @@
+"""
+Testes para a remoção de silêncio (VAD por energia)
+"""
+import numpy as np
+import pytest
+from services.audio_preprocessing import (
+    SAMPLE_RATE,
+    TimestampMap,
+    detect_speech_regions,
+    trim_silence,
+)
+
+
+def _speech_and_silence(layout):
+    """Monta um sinal a partir de [(segundos, tem_fala), ...]"""
+    rng = np.random.default_rng(1)
+    parts = []
+    for seconds, speech in layout:
+        n = int(seconds * SAMPLE_RATE)
+        if speech:
+            parts.append((rng.standard_normal(n) * 0.2).astype(np.float32))
+        else:
+            parts.append((rng.standard_normal(n) * 0.0005).astype(np.float32))
+    return np.concatenate(parts)
+
+
+@pytest.mark.unit
+def test_detect_speech_regions_skips_long_silence():
+    """Testa que silêncios longos separam regiões de fala"""
+    audio = _speech_and_silence([(3, True), (10, False), (4, True)])
+
+    regions = detect_speech_regions(audio, threshold_db=-45, min_silence_seconds=2.0, padding_seconds=0.0)
+
+    assert len(regions) == 2
+    assert regions[0][0] == 0
+    assert abs(regions[1][0] / SAMPLE_RATE - 13) < 0.1
+
+
+@pytest.mark.unit
+def test_detect_speech_regions_keeps_short_pauses():
+    """Testa que pausas curtas (respiração, entre frases) não cortam a fala"""
+    audio = _speech_and_silence([(3, True), (0.8, False), (3, True)])
+
+    regions = detect_speech_regions(audio, threshold_db=-45, min_silence_seconds=2.0, padding_seconds=0.0)
+
+    assert len(regions) == 1
+
+
+@pytest.mark.unit
+def test_trim_silence_reports_removed_seconds():
+    """Testa a contabilização dos segundos removidos"""
+    audio = _speech_and_silence([(2, True), (20, False), (2, True), (6, False)])
+
+    trim = trim_silence(audio, threshold_db=-45, min_silence_seconds=2.0, padding_seconds=0.0)
+
+    stats = trim.stats()
+    assert stats['original_seconds'] == 30.0
+    assert abs(stats['removed_seconds'] - 26.0) < 0.2
+    assert len(trim.audio) == int(round(trim.kept_seconds * SAMPLE_RATE))
+
+
+@pytest.mark.unit
+def test_timestamp_map_returns_original_times():
+    """Testa o mapeamento de tempos do áudio cortado para o original"""
+    # Regiões mantidas: 0-2s e 22-24s do original
+    regions = [(0, 2 * SAMPLE_RATE), (22 * SAMPLE_RATE, 24 * SAMPLE_RATE)]
+    tmap = TimestampMap(regions)
+
+    assert tmap.to_original(1.0) == 1.0
+    assert tmap.to_original(2.5) == 22.5
+    segments = tmap.map_segments([{'start': 1.5, 'end': 3.0, 'text': ' ok'}])
+    assert segments[0]['start'] == 1.5
+    assert segments[0]['end'] == 23.0
+
+
+# ============================================================================
+# Testes do cache de ingestão (PCM decodificado uma única vez)
+# ============================================================================
+
+@pytest.mark.unit
+def test_audio_ingestor_decodes_once(temp_dir):
+    """Testa que o ffmpeg só é chamado na primeira leitura de cada áudio"""
+    from unittest.mock import patch
+    from services.audio_ingest import AudioIngestor
+
+    audio_file = temp_dir / "consulta.mp3"
+    audio_file.write_bytes(b"conteudo qualquer")
+    pcm = np.linspace(-0.5, 0.5, SAMPLE_RATE * 2, dtype=np.float32)
+    ingestor = AudioIngestor(cache_dir=temp_dir / "pcm", max_bytes=10 ** 9)
+
+    with patch('services.audio_ingest.decode_audio', return_value=pcm) as mock_decode:
+        first = ingestor.load(audio_file)
+        second = ingestor.load(audio_file)
+
+    assert mock_decode.call_count == 1
+    assert first.audio_hash == second.audio_hash
+    assert second.duration_seconds == 2.0
+    assert isinstance(second.samples, np.memmap)
+    np.testing.assert_array_equal(np.asarray(second.samples), pcm)
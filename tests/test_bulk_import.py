@@ -0,0 +1,105 @@
+"""
+Testes para o manifesto de importação em lote
+"""
+import csv
+import json
+import pytest
+from datetime import datetime
+import config
+from services.bulk_import import ManifestError, build_summary, load_manifest
+from services.llm_service import split_prompt_template
+from services.pipeline import PipelineItem
+
+
+def _write_csv(path, rows):
+    fields = sorted({key for row in rows for key in row})
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.mark.unit
+def test_load_csv_manifest(temp_dir, sample_patient_info):
+    """Testa a leitura de um manifesto CSV com caminhos relativos"""
+    (temp_dir / "consulta1.mp3").write_bytes(b"audio")
+    (temp_dir / "consulta2.txt").write_text("Paciente com otite.", encoding='utf-8')
+    manifest = temp_dir / "lote.csv"
+    _write_csv(manifest, [
+        {**sample_patient_info, 'audio': 'consulta1.mp3'},
+        {**sample_patient_info, 'transcricao': 'consulta2.txt', 'data_consulta': ''},
+    ])
+
+    items = load_manifest(manifest)
+
+    assert len(items) == 2
+    assert items[0].audio_path == temp_dir / "consulta1.mp3"
+    assert items[1].transcription_text == "Paciente com otite."
+    assert items[1].source_name == "consulta2"
+    assert items[1].patient_info['data_consulta'] == datetime.now().strftime("%d/%m/%Y")
+
+
+@pytest.mark.unit
+def test_invalid_rows_are_all_reported(temp_dir, sample_patient_info):
+    """Testa que todas as linhas inválidas são apontadas antes de processar qualquer uma"""
+    (temp_dir / "ok.mp3").write_bytes(b"audio")
+    manifest = temp_dir / "lote.jsonl"
+    rows = [
+        {**sample_patient_info, 'audio': 'ok.mp3'},
+        {**sample_patient_info, 'audio': 'faltando.mp3'},
+        {**sample_patient_info, 'paciente_nome': '', 'audio': 'ok.mp3'},
+        {**sample_patient_info},
+    ]
+    manifest.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows) + "\n{quebrado\n",
+                        encoding='utf-8')
+
+    with pytest.raises(ManifestError) as exc:
+        load_manifest(manifest)
+
+    errors = exc.value.errors
+    assert len(errors) == 4
+    assert errors[0].startswith("linha 2:") and "não encontrado" in errors[0]
+    assert "Nome do paciente" in errors[1]
+    assert "exatamente uma" in errors[2]
+    assert "JSON inválido" in errors[3]
+
+
+@pytest.mark.unit
+def test_build_summary_totals_and_costs(sample_patient_info):
+    """Testa os totais, custos e falhas do resumo"""
+    ok = PipelineItem(sample_patient_info, transcription_text="a", source_name="ok")
+    ok.report_path = "/tmp/ok.md"
+    ok.usage = {'provider': 'google_gemini', 'model': 'gemini-2.5-pro',
+                'input_tokens': 1_000_000, 'output_tokens': 100_000}
+    failed = PipelineItem(sample_patient_info, transcription_text="b", source_name="erro")
+    failed.error, failed.failed_stage = "timeout", "report"
+    started = datetime(2025, 1, 1, 22, 0, 0)
+
+    summary = build_summary("lote.csv", [ok, failed], {}, started, datetime(2025, 1, 1, 22, 1, 30))
+
+    assert summary['wall_seconds'] == 90.0
+    assert summary['totals'] == {'items': 2, 'succeeded': 1, 'skipped': 0, 'failed': 1}
+    assert summary['cost']['estimated_usd'] == pytest.approx(2.25)
+    assert summary['failures'] == [{'name': 'erro', 'stage': 'report', 'error': 'timeout'}]
+    json.dumps(summary)
+
+
+@pytest.mark.unit
+def test_manifest_row_renders_report_template(temp_dir, sample_patient_info):
+    """Testa que uma linha do manifesto preenche o template real do relatório (campos opcionais vazios)"""
+    (temp_dir / "rex.txt").write_text("Tutor relata prurido.", encoding='utf-8')
+    manifest = temp_dir / "lote.csv"
+    _write_csv(manifest, [
+        {**sample_patient_info, 'transcricao': 'rex.txt'},
+        {**sample_patient_info, 'transcricao': 'rex.txt', 'vet_nome': 'Dra. Ana', 'exame_fc': '120 bpm'},
+    ])
+    _prefix, template = split_prompt_template(config.PROMPT_TEMPLATE_FILE.read_text(encoding='utf-8'))
+
+    plain, filled = load_manifest(manifest)
+    prompt = template.format(transcricao=plain.transcription_text, **plain.patient_info)
+    assert "Tutor relata prurido." in prompt
+    assert "- Nome: \n" in prompt
+
+    prompt = template.format(transcricao=filled.transcription_text, **filled.patient_info)
+    assert "- Nome: Dra. Ana" in prompt
+    assert "- Frequência Cardíaca: 120 bpm" in prompt
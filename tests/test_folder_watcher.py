@@ -0,0 +1,114 @@
+"""
+Testes para o monitoramento da pasta de áudios
+"""
+import json
+import os
+import pytest
+from unittest.mock import MagicMock
+from services import folder_watcher
+from services.folder_watcher import FolderWatcher, WatchDaemon
+from services.job_journal import JobJournal
+from services.transcription_cache import hash_file
+
+
+@pytest.mark.unit
+def test_file_is_reported_only_after_it_stops_growing(temp_dir):
+    """Testa que o arquivo só é entregue depois de parar de crescer"""
+    ready = []
+    watcher = FolderWatcher(temp_dir, ready.append, stable_seconds=5, use_inotify=False)
+    audio = temp_dir / "consulta.mp3"
+    audio.write_bytes(b"parte 1")
+    (temp_dir / "notas.txt").write_text("ignorado")
+
+    watcher.scan()
+    assert watcher.check(now=0) == []
+    with open(audio, 'ab') as f:
+        f.write(b" parte 2")
+    assert watcher.check(now=4) == []
+    assert watcher.check(now=8) == []
+    assert watcher.check(now=9.5) == [audio]
+
+    # Já entregue: novas varreduras não entregam de novo
+    watcher.scan()
+    assert watcher.check(now=20) == []
+    assert watcher.check(now=30) == []
+    assert ready == [audio]
+
+    # Arquivo removido sai do registro de entregues
+    audio.unlink()
+    watcher.scan()
+    assert watcher._reported == {}
+
+
+def _daemon(temp_dir):
+    system = MagicMock()
+    pipeline = MagicMock(queue_size=10)
+    journal = JobJournal(temp_dir / "jobs.db")
+    return WatchDaemon(system, journal, directory=temp_dir, pipeline=pipeline, use_inotify=False)
+
+
+@pytest.mark.unit
+def test_daemon_waits_for_patient_sidecar(temp_dir, sample_patient_info):
+    """Testa que a gravação aguarda o arquivo com os dados do paciente"""
+    daemon = _daemon(temp_dir)
+    audio = temp_dir / "consulta.mp3"
+    audio.write_bytes(b"audio")
+
+    daemon.enqueue(audio)
+    assert daemon._queue.empty()
+
+    (temp_dir / "consulta.json").write_text(json.dumps(sample_patient_info), encoding='utf-8')
+    daemon.retry_waiting()
+
+    item = daemon._queue.get_nowait()
+    assert item.audio_path == audio
+    assert item.patient_info['paciente_nome'] == sample_patient_info['paciente_nome']
+    assert item.audio_hash == hash_file(audio)
+
+
+@pytest.mark.unit
+def test_daemon_skips_files_processed_before_restart(temp_dir, sample_patient_info):
+    """Testa que arquivos com relatório salvo não são reprocessados após reiniciar"""
+    daemon = _daemon(temp_dir)
+    audio = temp_dir / "consulta.mp3"
+    audio.write_bytes(b"audio")
+    (temp_dir / "consulta.json").write_text(json.dumps(sample_patient_info), encoding='utf-8')
+    report = temp_dir / "relatorio.md"
+    report.write_text("# Relatório")
+    audio_hash = hash_file(audio)
+    daemon.journal.start(audio_hash, audio.name)
+    daemon.journal.advance(audio_hash, 'saved', report_path=report)
+
+    daemon.enqueue(audio)
+
+    assert daemon._queue.empty()
+
+
+@pytest.mark.unit
+def test_invalid_sidecar_is_retried_only_after_it_changes(temp_dir, sample_patient_info, monkeypatch):
+    """Testa que um sidecar inválido não é relido (nem o áudio recalculado) até mudar"""
+    hashed = []
+    monkeypatch.setattr(folder_watcher, 'hash_file', lambda path: hashed.append(path) or "h" * 64)
+    warnings = []
+    monkeypatch.setattr(folder_watcher.logger, 'warning', warnings.append)
+    daemon = _daemon(temp_dir)
+    audio = temp_dir / "consulta.mp3"
+    audio.write_bytes(b"audio")
+    sidecar = temp_dir / "consulta.json"
+    sidecar.write_text('{"paciente_nome": "Bo', encoding='utf-8')  # ainda sendo gravado
+
+    daemon.enqueue(audio)
+    for _ in range(3):
+        daemon.retry_waiting()
+    assert daemon._queue.empty()
+    assert hashed == []
+    assert len(warnings) == 1
+
+    sidecar.write_text(json.dumps(sample_patient_info), encoding='utf-8')
+    os.utime(sidecar, ns=(1, 1))  # assinatura diferente mesmo no mesmo instante
+    daemon.retry_waiting()
+
+    item = daemon._queue.get_nowait()
+    assert item.patient_info['vet_nome'] == ''
+    assert hashed == [audio]
+    assert daemon._waiting == {}
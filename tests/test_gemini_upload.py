@@ -0,0 +1,190 @@
+"""
+Testes para a preparação e o upload de áudio no Gemini
+"""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from services.transcription_service import GeminiTranscriptionService
+from services.gemini_uploads import UploadManifest, UploadReaper
+
+
+class LocalUploadEndpoint:
+    """Substituto local do endpoint de upload do Gemini"""
+
+    def __init__(self):
+        self.uploads = []
+
+    def __call__(self, path, mime_type):
+        self.uploads.append({'name': path.name, 'bytes': path.stat().st_size, 'mime_type': mime_type})
+        remote = MagicMock(expiration_time=None)
+        remote.name = f"files/{len(self.uploads)}"
+        return remote
+
+
+def _fake_encoder(size):
+    def encode(audio, output_path, sample_rate=16000, extra_args=None):
+        output_path.write_bytes(b"\0" * size)
+    return encode
+
+
+@pytest.fixture
+def gemini_service(temp_dir):
+    endpoint = LocalUploadEndpoint()
+    service = GeminiTranscriptionService(
+        api_key="fake-key",
+        uploader=endpoint,
+        transcode_min_bytes=1000,
+        manifest=UploadManifest(temp_dir / "uploads.db"),
+        file_getter=lambda name: MagicMock(name=name)
+    )
+    service.model = MagicMock()
+    service.model.generate_content.return_value = MagicMock(text="Transcrição da consulta")
+    return service, endpoint
+
+
+@pytest.mark.unit
+def test_large_file_is_transcoded_before_upload(gemini_service, temp_dir):
+    """Testa que arquivos grandes são recodificados em Opus antes do upload"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "consulta.wav"
+    audio_path.write_bytes(b"\0" * 50_000)
+
+    with patch('services.transcription_service.encode_audio', side_effect=_fake_encoder(5_000)) as enc:
+        result = service.transcribe(audio_path, audio=np.zeros(16000, dtype=np.float32))
+
+    assert '-b:a' in enc.call_args.kwargs['extra_args']
+    assert endpoint.uploads == [{'name': 'consulta.ogg', 'bytes': 5_000, 'mime_type': 'audio/ogg'}]
+    assert result['text'] == "Transcrição da consulta"
+    assert result['upload']['bytes_saved'] == 45_000
+    assert result['upload']['format'] == 'ogg'
+    assert result['upload']['upload_seconds'] >= 0
+
+
+@pytest.mark.unit
+def test_small_file_is_uploaded_as_is(gemini_service, temp_dir):
+    """Testa que arquivos abaixo do limite são enviados sem recodificar"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "curto.mp3"
+    audio_path.write_bytes(b"\0" * 500)
+
+    with patch('services.transcription_service.encode_audio') as enc:
+        result = service.transcribe(audio_path, audio=np.zeros(16000, dtype=np.float32))
+
+    assert not enc.called
+    assert endpoint.uploads[0]['name'] == 'curto.mp3'
+    assert result['upload']['format'] == 'original'
+    assert result['upload']['bytes_saved'] == 0
+
+
+@pytest.mark.unit
+def test_original_is_kept_when_transcode_is_not_smaller(gemini_service, temp_dir):
+    """Testa que o original é enviado quando a recodificação não reduz o tamanho"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "compacto.m4a"
+    audio_path.write_bytes(b"\0" * 2_000)
+
+    with patch('services.transcription_service.encode_audio', side_effect=_fake_encoder(3_000)):
+        result = service.transcribe(audio_path, audio=np.zeros(16000, dtype=np.float32))
+
+    assert endpoint.uploads[0] == {'name': 'compacto.m4a', 'bytes': 2_000, 'mime_type': 'audio/mp4'}
+    assert result['upload']['format'] == 'original'
+
+
+@pytest.mark.unit
+def test_trimmed_audio_is_always_encoded(gemini_service, temp_dir):
+    """Testa que o áudio sem silêncio é enviado mesmo abaixo do limite e maior que o original"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "curto.mp3"
+    audio_path.write_bytes(b"\0" * 500)
+
+    with patch('services.transcription_service.encode_audio', side_effect=_fake_encoder(800)):
+        result = service.transcribe(audio_path, audio=np.zeros(8000, dtype=np.float32), trimmed=True)
+
+    assert endpoint.uploads == [{'name': 'curto.ogg', 'bytes': 800, 'mime_type': 'audio/ogg'}]
+    assert result['upload']['format'] == 'ogg'
+
+
+@pytest.mark.unit
+def test_trimmed_audio_falls_back_to_lossless(gemini_service, temp_dir):
+    """Testa que, sem Opus (ou com formato "original"), o áudio sem silêncio vai em FLAC ou WAV"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "consulta.wav"
+    audio_path.write_bytes(b"\0" * 50_000)
+    encoder = _fake_encoder(20_000)
+
+    def no_opus(audio, output_path, sample_rate=16000, extra_args=None):
+        if 'libopus' in extra_args:
+            raise RuntimeError("Unknown encoder 'libopus'")
+        encoder(audio, output_path)
+
+    with patch('services.transcription_service.encode_audio', side_effect=no_opus):
+        service.transcribe(audio_path, audio=np.zeros(8000, dtype=np.float32), trimmed=True)
+        service.upload_format = 'original'
+        service.transcribe(audio_path, audio=np.zeros(4000, dtype=np.float32), trimmed=True)
+
+    assert [upload['name'] for upload in endpoint.uploads] == ['consulta.flac', 'consulta.flac']
+
+    def broken(audio, output_path, sample_rate=16000, extra_args=None):
+        raise RuntimeError("ffmpeg indisponível")
+
+    with patch('services.transcription_service.encode_audio', side_effect=broken):
+        with pytest.raises(RuntimeError, match="sem silêncio"):
+            service.transcribe(audio_path, audio=np.zeros(2000, dtype=np.float32), trimmed=True)
+    assert len(endpoint.uploads) == 2
+
+
+# ============================================================================
+# Testes do manifesto de uploads (reaproveitamento e limpeza)
+# ============================================================================
+
+@pytest.mark.unit
+def test_retry_reuses_valid_upload(gemini_service, temp_dir):
+    """Testa que uma nova tentativa com o mesmo áudio não reenvia o arquivo"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "consulta.mp3"
+    audio_path.write_bytes(b"\0" * 500)
+
+    first = service.transcribe(audio_path)
+    second = service.transcribe(audio_path)
+
+    assert len(endpoint.uploads) == 1
+    assert first['upload']['format'] == 'original'
+    assert second['upload']['format'] == 'reused'
+    assert second['upload']['uploaded_bytes'] == 0
+
+
+@pytest.mark.unit
+def test_finished_consultation_upload_is_reaped(gemini_service, temp_dir):
+    """Testa que o upload é apagado pelo coletor quando a consulta termina"""
+    service, endpoint = gemini_service
+    audio_path = temp_dir / "consulta.mp3"
+    audio_path.write_bytes(b"\0" * 500)
+    deleted = []
+    reaper = UploadReaper(service.manifest, deleted.append, interval_seconds=3600)
+
+    service.transcribe(audio_path)
+    assert reaper.sweep() == 0
+
+    service.consultation_finished(audio_path)
+    assert reaper.sweep() == 1
+    assert deleted == ["files/1"]
+
+    # Depois de liberado, um novo processamento envia novamente
+    service.transcribe(audio_path)
+    assert len(endpoint.uploads) == 2
+
+
+@pytest.mark.unit
+def test_expired_upload_is_not_reused_and_is_reaped(temp_dir):
+    """Testa que uploads expirados não são reaproveitados e são removidos"""
+    from datetime import datetime, timedelta, timezone
+    manifest = UploadManifest(temp_dir / "uploads.db")
+    manifest.record("chave", "files/velho", datetime.now(timezone.utc) - timedelta(minutes=1))
+
+    assert manifest.get_reusable("chave") is None
+
+    def already_gone(name):
+        raise Exception("404 File not found")
+
+    assert UploadReaper(manifest, already_gone).sweep() == 1
+    assert manifest.due_for_deletion() == []
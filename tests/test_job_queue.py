@@ -0,0 +1,72 @@
+"""
+Testes para a fila de processamento em segundo plano
+"""
+import threading
+import time
+import pytest
+from services.job_queue import JobQueue, JobStore
+
+
+def _wait_for(store, job_id, status, timeout=5):
+    for _ in range(int(timeout / 0.02)):
+        job = store.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} não chegou a '{status}'")
+
+
+@pytest.mark.unit
+def test_submit_returns_immediately_and_job_completes(temp_dir, sample_patient_info):
+    """Testa que o envio retorna um id na hora e o progresso fica no store"""
+    release = threading.Event()
+    seen_progress = []
+
+    def runner(job, report_progress):
+        report_progress('transcribing', 0.1, "Transcrevendo áudio...")
+        seen_progress.append(store.get(job['job_id'])['stage'])
+        release.wait(5)
+        return temp_dir / "relatorio.md"
+
+    store = JobStore(temp_dir / "jobs.db")
+    job_queue = JobQueue(store, runner, workers=1)
+    job_queue.start()
+
+    job_id = job_queue.submit('audio', {'audio_path': 'consulta.mp3', 'patient_info': sample_patient_info},
+                              owner='vet1')
+    running = _wait_for(store, job_id, 'running')
+    assert running['payload']['patient_info'] == sample_patient_info
+
+    release.set()
+    done = _wait_for(store, job_id, 'done')
+    assert seen_progress == ['transcribing']
+    assert done['progress'] == 1.0
+    assert done['report_path'] == str(temp_dir / "relatorio.md")
+    assert [job['job_id'] for job in store.list_jobs(owner='vet1')] == [job_id]
+
+
+@pytest.mark.unit
+def test_failed_job_records_error(temp_dir):
+    """Testa que erros do processamento ficam registrados no job"""
+    def runner(job, report_progress):
+        raise RuntimeError("cota da API excedida")
+
+    store = JobStore(temp_dir / "jobs.db")
+    job_queue = JobQueue(store, runner, workers=1)
+    job_queue.start()
+
+    job = _wait_for(store, job_queue.submit('text', {'transcription': 'x'}), 'failed')
+    assert job['error'] == "cota da API excedida"
+
+
+@pytest.mark.unit
+def test_interrupted_jobs_are_resumed_on_start(temp_dir):
+    """Testa que jobs interrompidos por reinício do servidor voltam para a fila"""
+    store = JobStore(temp_dir / "jobs.db")
+    job_id = store.create('text', {'transcription': 'x'})
+    store.update(job_id, status='running', progress=0.5)
+
+    job_queue = JobQueue(store, lambda job, report_progress: temp_dir / "ok.md", workers=1)
+    job_queue.start()
+
+    assert _wait_for(store, job_id, 'done')['report_path'] == str(temp_dir / "ok.md")
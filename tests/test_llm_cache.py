@@ -0,0 +1,98 @@
+"""
+Testes para o cache de respostas do LLM
+"""
+import os
+import time
+import pytest
+from services.llm_cache import ResponseCache
+from services.llm_service import LLMService
+
+REPORT = "## Anamnese\nTutor relata prurido intenso há 10 dias.\n" * 80
+
+
+class StubLLM(LLMService):
+    """LLM local com latência fixa, para medir o caminho do cache sem rede"""
+    provider = "stub"
+    model_name = "stub-model"
+    latency = 0.2
+
+    def __init__(self, response_cache):
+        super().__init__(response_cache=response_cache)
+        self.calls = 0
+
+    def _generate(self, prompt, system_prompt=None, prefix=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        self._record_usage(3_000, 900)
+        return REPORT
+
+
+@pytest.mark.unit
+def test_make_key_changes_with_request():
+    """Testa que provedor, modelo, amostragem e prompts entram na chave"""
+    base = ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.3, 4000, "Rex", "sistema")
+
+    assert base == ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.3, 4000, "Rex", "sistema")
+    assert base != ResponseCache.make_key("google_gemini", "claude-sonnet", 0.3, 4000, "Rex", "sistema")
+    assert base != ResponseCache.make_key("anthropic_claude", "claude-haiku", 0.3, 4000, "Rex", "sistema")
+    assert base != ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.7, 4000, "Rex", "sistema")
+    assert base != ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.3, 2000, "Rex", "sistema")
+    assert base != ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.3, 4000, "Bob", "sistema")
+    assert base != ResponseCache.make_key("anthropic_claude", "claude-sonnet", 0.3, 4000, "Rex")
+
+
+@pytest.mark.unit
+def test_put_get_and_ttl(temp_dir):
+    """Testa a leitura do texto salvo e a expiração pelo TTL"""
+    cache = ResponseCache(cache_dir=temp_dir, ttl_seconds=60)
+    cache.put("a" * 64, "Relatório do Rex", {'input_tokens': 120, 'output_tokens': 300})
+
+    entry = cache.get("a" * 64)
+    assert entry['text'] == "Relatório do Rex"
+    assert entry['usage']['output_tokens'] == 300
+    assert cache.get("b" * 64) is None
+
+    expired = ResponseCache(cache_dir=temp_dir, ttl_seconds=0)
+    time.sleep(0.01)
+    assert expired.get("a" * 64) is None
+    assert not list(temp_dir.glob("*/*.json"))
+
+
+@pytest.mark.unit
+def test_lru_eviction_keeps_recently_used(temp_dir):
+    """Testa que o limite de tamanho remove primeiro as entradas menos usadas"""
+    cache = ResponseCache(cache_dir=temp_dir, max_bytes=2500)
+    keys = [c * 64 for c in "abc"]
+    for n, key in enumerate(keys[:2]):
+        cache.put(key, "x" * 1000)
+        old = time.time() - 100 + n
+        os.utime(cache._entry_path(key), (old, old))
+
+    assert cache.get(keys[0]) is not None  # passa a ser o mais recente
+    cache.put(keys[2], "x" * 1000)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+@pytest.mark.slow
+def test_benchmark_hit_path_against_stub_llm(temp_dir):
+    """Compara a latência de uma requisição repetida (cache) com a chamada ao LLM local"""
+    service = StubLLM(ResponseCache(cache_dir=temp_dir))
+    prompts = [f"Paciente {n}: prurido" for n in range(5)]
+
+    start = time.perf_counter()
+    for prompt in prompts:
+        service.generate_report(prompt, prefix="Instruções fixas\n")
+    miss = (time.perf_counter() - start) / len(prompts)
+
+    start = time.perf_counter()
+    for _ in range(20):
+        for prompt in prompts:
+            assert service.generate_report(prompt, prefix="Instruções fixas\n") == REPORT
+    hit = (time.perf_counter() - start) / (20 * len(prompts))
+
+    print(f"\nLLM local: {miss * 1000:.1f} ms | cache: {hit * 1000:.2f} ms ({miss / hit:.0f}x)")
+    assert service.calls == len(prompts)
+    assert hit < miss / 20
@@ -0,0 +1,116 @@
+"""
+Testes para a geração de relatórios em streaming e o prefixo cacheável dos prompts
+"""
+import pytest
+import config
+import utils
+from services.llm_service import LLMService, estimate_cost, split_prompt_template
+
+
+class FakeStreamingService(LLMService):
+    provider = "fake"
+    model_name = "fake-model"
+
+    def __init__(self, failures_before_text=0, fail_after_text=False):
+        super().__init__()
+        self.calls = 0
+        self.failures_before_text = failures_before_text
+        self.fail_after_text = fail_after_text
+
+    def _generate(self, prompt, system_prompt=None, prefix=None):
+        return "".join(self._stream(prompt, system_prompt, prefix))
+
+    def _stream(self, prompt, system_prompt=None, prefix=None):
+        self.calls += 1
+        self.prefix = prefix
+        if self.calls <= self.failures_before_text:
+            raise ConnectionError("conexão recusada")
+        yield "## Anamnese\n"
+        if self.fail_after_text:
+            raise ConnectionError("conexão perdida")
+        yield "Tutor relata prurido."
+        self._record_usage(1_200, 8)
+
+
+@pytest.fixture(autouse=True)
+def response_cache_dir(temp_dir, monkeypatch):
+    monkeypatch.setattr(config, 'LLM_CACHE_DIR', temp_dir / "llm_cache")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(utils, '_should_retry', lambda e: isinstance(e, ConnectionError))
+    monkeypatch.setattr(utils.time, 'sleep', lambda seconds: None)
+
+
+@pytest.mark.unit
+def test_stream_retries_only_before_the_first_text(no_backoff):
+    """Testa o streaming: nova tentativa antes do primeiro trecho, uso e tempo até o primeiro trecho"""
+    service = FakeStreamingService(failures_before_text=2)
+    chunks = list(service.generate_report_stream("prompt", prefix="Instruções fixas\n"))
+
+    assert chunks == ["## Anamnese\n", "Tutor relata prurido."]
+    assert service.calls == 3
+    assert service.prefix == "Instruções fixas\n"
+    assert service.last_usage['input_tokens'] == 1_200
+    assert service.last_usage['cached_input_tokens'] == 0
+    assert service.last_ttft is not None and service.last_ttft >= 0
+
+    # Depois do primeiro trecho o erro chega ao chamador (o texto parcial já foi entregue)
+    broken = FakeStreamingService(fail_after_text=True)
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in broken.generate_report_stream("prompt"):
+            received.append(chunk)
+    assert received == ["## Anamnese\n"]
+    assert broken.calls == 1
+    assert broken.last_usage is None
+
+
+@pytest.mark.unit
+def test_template_split_and_cached_token_pricing(monkeypatch):
+    """Testa a separação do prefixo fixo do template e o custo com tokens do cache de prompt"""
+    template = "Instruções {{fixas}}\n=== DADOS DA CONSULTA ===\n- Nome: {paciente_nome}\n{transcricao}"
+    prefix, rest = split_prompt_template(template)
+    assert prefix == "Instruções {fixas}\n"
+    assert rest.format(paciente_nome="Rex", transcricao="tosse") == "=== DADOS DA CONSULTA ===\n- Nome: Rex\ntosse"
+
+    # Campo antes do marcador (template antigo) ou sem marcador: nada é separado
+    assert split_prompt_template("- Nome: {paciente_nome}\n=== DADOS DA CONSULTA ===\n{transcricao}")[0] == ""
+    assert split_prompt_template("{transcricao}") == ("", "{transcricao}")
+
+    monkeypatch.setattr(config, 'LLM_PRICES', {'sonnet': (3.0, 15.0)})
+    usage = {'provider': "anthropic_claude", 'model': "sonnet", 'input_tokens': 3_000, 'output_tokens': 1_000}
+    full = estimate_cost(usage)
+    assert full == pytest.approx((3_000 * 3.0 + 1_000 * 15.0) / 1e6)
+    # 2000 tokens lidos do cache (10% do preço) e, na primeira chamada, gravados (125%)
+    assert estimate_cost({**usage, 'cached_input_tokens': 2_000}) == pytest.approx(full - 2_000 * 3.0 * 0.9 / 1e6)
+    assert estimate_cost({**usage, 'cache_write_tokens': 2_000}) == pytest.approx(full + 2_000 * 3.0 * 0.25 / 1e6)
+
+
+@pytest.mark.unit
+def test_repeated_request_is_served_from_the_response_cache():
+    """Testa o cache de respostas: mesma requisição sem nova chamada, bypass e streaming"""
+    service = FakeStreamingService()
+    text = service.generate_report("Rex: prurido", prefix="Instruções\n")
+    assert service.calls == 1
+
+    assert service.generate_report("Rex: prurido", prefix="Instruções\n") == text
+    assert list(service.generate_report_stream("Rex: prurido", prefix="Instruções\n")) == [text]
+    assert service.calls == 1
+    assert service.last_usage['cached_response'] is True
+    assert service.last_usage['input_tokens'] == 0
+
+    # Outro prompt, ou "Gerar novamente" (use_cache=False), chama o provedor
+    service.generate_report("Rex: tosse", prefix="Instruções\n")
+    list(service.generate_report_stream("Rex: prurido", prefix="Instruções\n", use_cache=False))
+    assert service.calls == 3
+    assert 'cached_response' not in service.last_usage
+
+    # Resposta interrompida no meio não entra no cache
+    broken = FakeStreamingService(fail_after_text=True)
+    with pytest.raises(ConnectionError):
+        list(broken.generate_report_stream("Bob: vômito"))
+    broken.fail_after_text = False
+    list(broken.generate_report_stream("Bob: vômito"))
+    assert broken.calls == 2
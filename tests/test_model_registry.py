@@ -0,0 +1,109 @@
+"""
+Testes para o registro de modelos Whisper
+"""
+import threading
+import pytest
+from unittest.mock import MagicMock
+from services.model_registry import WhisperModelRegistry
+
+
+def _fake_loader(calls):
+    def loader(model_name, device):
+        calls.append((model_name, device))
+        model = MagicMock(name=f"model-{model_name}")
+        model.parameters.side_effect = Exception("sem torch")
+        return model
+    return loader
+
+
+@pytest.mark.unit
+def test_registry_loads_once_and_counts_hits():
+    """Testa que o modelo é carregado uma única vez e reaproveitado"""
+    calls = []
+    registry = WhisperModelRegistry(loader=_fake_loader(calls), memory_budget_mb=10_000)
+
+    with registry.lease('base') as first:
+        pass
+    with registry.lease('base') as second:
+        pass
+
+    assert first is second
+    assert calls == [('base', None)]
+    stats = registry.stats()
+    assert stats['loads'] == 1
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+@pytest.mark.unit
+def test_registry_keys_by_device():
+    """Testa que o mesmo modelo em dispositivos diferentes é carregado separadamente"""
+    calls = []
+    registry = WhisperModelRegistry(loader=_fake_loader(calls), memory_budget_mb=10_000)
+
+    registry.acquire('base', 'cpu')
+    registry.acquire('base', 'cuda')
+
+    assert len(calls) == 2
+    assert registry.stats()['models']['base@cpu']['refcount'] == 1
+
+
+@pytest.mark.unit
+def test_registry_evicts_idle_models_over_budget():
+    """Testa que modelos ociosos são descarregados quando o orçamento estoura"""
+    calls = []
+    # base (~145 MB) + small (~480 MB) não cabem em 500 MB
+    registry = WhisperModelRegistry(loader=_fake_loader(calls), memory_budget_mb=500)
+
+    with registry.lease('base'):
+        pass
+    with registry.lease('small'):
+        pass
+
+    stats = registry.stats()
+    assert stats['evictions'] == 1
+    assert list(stats['models']) == ['small@auto']
+
+
+@pytest.mark.unit
+def test_registry_never_evicts_models_in_use():
+    """Testa que modelos com referências ativas não são descarregados"""
+    calls = []
+    registry = WhisperModelRegistry(loader=_fake_loader(calls), memory_budget_mb=100)
+
+    registry.acquire('base')
+    registry.acquire('small')
+
+    assert registry.stats()['evictions'] == 0
+    registry.release('base')
+    assert 'base@auto' not in registry.stats()['models']
+
+
+@pytest.mark.unit
+def test_registry_concurrent_acquire_loads_once():
+    """Testa que acessos concorrentes ao mesmo modelo compartilham um único carregamento"""
+    calls = []
+    registry = WhisperModelRegistry(loader=_fake_loader(calls), memory_budget_mb=10_000)
+
+    threads = [threading.Thread(target=registry.acquire, args=('base',)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert registry.stats()['models']['base@auto']['refcount'] == 8
+
+
+@pytest.mark.unit
+def test_registry_failed_load_releases_reference():
+    """Testa que uma falha no carregamento não deixa referência pendurada"""
+    def failing_loader(model_name, device):
+        raise RuntimeError("falha ao carregar")
+
+    registry = WhisperModelRegistry(loader=failing_loader)
+
+    with pytest.raises(RuntimeError):
+        registry.acquire('base')
+
+    assert registry.stats()['models'] == {}
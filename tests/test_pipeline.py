@@ -0,0 +1,207 @@
+"""
+Testes para o pipeline de processamento em lote
+"""
+import threading
+import time
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from services.pipeline import BatchPipeline, PipelineItem
+
+
+class FakeSystem:
+    """Sistema de processamento falso que registra a concorrência de cada etapa"""
+
+    def __init__(self, report_seconds=0.05, fail_on=None, report_dir=None):
+        self.report_seconds = report_seconds
+        self.report_dir = report_dir
+        self.fail_on = fail_on
+        self.audio_ingestor = MagicMock()
+        self.audio_ingestor.load.side_effect = lambda path, audio_hash=None: MagicMock(
+            audio_hash=audio_hash or f"hash-{Path(path).stem}"
+        )
+        self.transcription_service = MagicMock()
+        self.llm_service = MagicMock(last_usage=None)
+        self.saved = []
+        self._lock = threading.Lock()
+        self.active_reports = 0
+        self.max_active_reports = 0
+        self.transcribed = []
+        self.reports_generated = 0
+
+    def transcribe_audio(self, audio_path, consultation_id=None):
+        if audio_path.stem == self.fail_on:
+            raise RuntimeError("áudio corrompido")
+        self.transcribed.append(audio_path.stem)
+        return {'text': f"transcrição de {audio_path.stem}"}
+
+    def generate_report(self, transcription_text, patient_info, consultation_id=None):
+        with self._lock:
+            self.active_reports += 1
+            self.reports_generated += 1
+            self.max_active_reports = max(self.max_active_reports, self.active_reports)
+        time.sleep(self.report_seconds)
+        with self._lock:
+            self.active_reports -= 1
+        return f"# Relatório\n{transcription_text}"
+
+    def save_report(self, report_text, patient_name, audio_filename, transcription=None, patient_info=None,
+                    metrics=None, consultation_id=None):
+        self.saved.append((patient_name, audio_filename))
+        if self.report_dir is None:
+            return Path(f"/tmp/{audio_filename}.md")
+        report_path = self.report_dir / f"{audio_filename}.md"
+        report_path.write_text(report_text, encoding='utf-8')
+        return report_path
+
+
+def _items(sample_patient_info, n):
+    return [PipelineItem(sample_patient_info, audio_path=Path(f"consulta{i}.mp3")) for i in range(n)]
+
+
+@pytest.mark.unit
+def test_pipeline_processes_all_items(sample_patient_info):
+    """Testa que todos os itens passam por todas as etapas"""
+    system = FakeSystem()
+    pipeline = BatchPipeline(system, report_workers=2, queue_size=1, use_processes=False)
+
+    results = pipeline.run(_items(sample_patient_info, 5))
+
+    assert len(results) == 5
+    assert all(item.succeeded for item in results)
+    assert sorted(name for _, name in system.saved) == [f"consulta{i}" for i in range(5)]
+    assert system.transcription_service.consultation_finished.call_count == 5
+    assert set(results[0].timings) == {'decode', 'transcribe', 'report', 'save'}
+
+
+@pytest.mark.unit
+def test_pipeline_respects_stage_concurrency(sample_patient_info):
+    """Testa o limite de chamadas simultâneas ao LLM"""
+    system = FakeSystem(report_seconds=0.1)
+    pipeline = BatchPipeline(system, report_workers=3, use_processes=False)
+
+    pipeline.run(_items(sample_patient_info, 9))
+
+    assert system.max_active_reports == 3
+    stats = pipeline.stats_summary()
+    assert stats['report']['processed'] == 9
+    assert stats['report']['items_per_minute'] > 0
+
+
+@pytest.mark.unit
+def test_pipeline_isolates_failures(sample_patient_info):
+    """Testa que a falha de um item não interrompe os demais"""
+    system = FakeSystem(fail_on="consulta1")
+    pipeline = BatchPipeline(system, use_processes=False)
+
+    results = pipeline.run(_items(sample_patient_info, 3))
+
+    failed = [item for item in results if not item.succeeded]
+    assert len(failed) == 1
+    assert failed[0].failed_stage == 'transcribe'
+    assert "corrompido" in failed[0].error
+    assert pipeline.stats_summary()['transcribe']['failed'] == 1
+    assert len(system.saved) == 2
+
+
+@pytest.mark.unit
+def test_pipeline_skips_transcription_for_text_items(sample_patient_info):
+    """Testa que itens com transcrição pronta vão direto para o relatório"""
+    system = FakeSystem()
+    system.transcribe_audio = MagicMock()
+    pipeline = BatchPipeline(system, use_processes=False)
+
+    results = pipeline.run([
+        PipelineItem(sample_patient_info, transcription_text="texto pronto", source_name="manual")
+    ])
+
+    assert results[0].succeeded
+    assert not system.transcribe_audio.called
+    assert not system.audio_ingestor.load.called
+    assert system.saved == [(sample_patient_info['paciente_nome'], "manual")]
+
+
+# ============================================================================
+# Testes do diário de jobs (retomada e idempotência)
+# ============================================================================
+
+@pytest.fixture
+def audio_files(temp_dir):
+    files = []
+    for i in range(3):
+        path = temp_dir / f"consulta{i}.mp3"
+        path.write_bytes(f"áudio {i}".encode('utf-8'))
+        files.append(path)
+    return files
+
+
+def _journal_run(system, journal, files, patient_info, force=False):
+    pipeline = BatchPipeline(system, use_processes=False, journal=journal, force=force)
+    return pipeline.run([PipelineItem(patient_info, audio_path=f) for f in files])
+
+
+@pytest.mark.unit
+def test_rerun_resumes_at_reached_stage(temp_dir, audio_files, sample_patient_info):
+    """Testa que uma nova execução reaproveita transcrições de uma execução interrompida"""
+    from services.job_journal import JobJournal
+    journal = JobJournal(temp_dir / "jobs.db")
+
+    failing = FakeSystem(report_dir=temp_dir)
+    failing.generate_report = MagicMock(side_effect=RuntimeError("API indisponível"))
+    _journal_run(failing, journal, audio_files, sample_patient_info)
+    assert journal.summary()['transcribed'] == 3
+    assert journal.summary()['failed'] == 3
+
+    system = FakeSystem(report_dir=temp_dir)
+    results = _journal_run(system, journal, audio_files, sample_patient_info)
+
+    assert all(item.succeeded for item in results)
+    assert all(item.resumed_from == 'transcribed' for item in results)
+    assert system.transcribed == []
+    assert system.reports_generated == 3
+    assert journal.summary()['saved'] == 3
+
+
+@pytest.mark.unit
+def test_saved_files_are_skipped_unless_forced(temp_dir, audio_files, sample_patient_info):
+    """Testa que arquivos com relatório salvo não são reprocessados (exceto com force)"""
+    from services.job_journal import JobJournal
+    journal = JobJournal(temp_dir / "jobs.db")
+    _journal_run(FakeSystem(report_dir=temp_dir), journal, audio_files, sample_patient_info)
+
+    system = FakeSystem(report_dir=temp_dir)
+    results = _journal_run(system, journal, audio_files, sample_patient_info)
+    assert all(item.skipped and item.succeeded for item in results)
+    assert system.reports_generated == 0
+    assert system.saved == []
+
+    forced = FakeSystem(report_dir=temp_dir)
+    _journal_run(forced, journal, audio_files[:1], sample_patient_info, force=True)
+    assert forced.transcribed == ["consulta0"]
+    assert forced.reports_generated == 1
+
+
+@pytest.mark.unit
+def test_saved_report_reused_only_for_same_patient_info(temp_dir, audio_files, sample_patient_info):
+    """Testa que o relatório do diário só é reaproveitado com as mesmas informações do paciente"""
+    from services.job_journal import JobJournal
+    journal = JobJournal(temp_dir / "jobs.db")
+
+    failing = FakeSystem(report_dir=temp_dir)
+    failing.save_report = MagicMock(side_effect=OSError("disco cheio"))
+    _journal_run(failing, journal, audio_files[:2], sample_patient_info)
+    assert journal.summary()['report_generated'] == 2
+
+    # Mesmas informações: o relatório já gerado é salvo sem nova chamada ao LLM
+    same = FakeSystem(report_dir=temp_dir)
+    results = _journal_run(same, journal, audio_files[:1], dict(reversed(sample_patient_info.items())))
+    assert [item.resumed_from for item in results] == ['report_generated']
+    assert same.reports_generated == 0
+
+    # Informações corrigidas: só a transcrição é reaproveitada
+    corrected = FakeSystem(report_dir=temp_dir)
+    results = _journal_run(corrected, journal, audio_files[1:2], {**sample_patient_info, 'paciente_nome': 'Rex'})
+    assert [item.resumed_from for item in results] == ['transcribed']
+    assert corrected.transcribed == []
+    assert corrected.reports_generated == 1
+    assert corrected.saved == [('Rex', "consulta1")]
@@ -0,0 +1,157 @@
+"""
+Testes para os eventos de progresso e a estimativa de tempo restante
+"""
+import pytest
+from services.progress import ProgressStore, ProgressTracker
+
+
+@pytest.fixture
+def store(temp_dir):
+    return ProgressStore(temp_dir / "jobs.db")
+
+
+def _past_run(store, job_id, transcription_seconds, audio_seconds, report_seconds):
+    store.record(job_id, 'plan', detail=['transcribing', 'generating_report'], ts=0)
+    store.record(job_id, 'end', stage='transcribing', duration=transcription_seconds,
+                 audio_seconds_total=audio_seconds, ts=1)
+    store.record(job_id, 'end', stage='generating_report', duration=report_seconds, ts=2)
+
+
+@pytest.mark.unit
+def test_snapshot_uses_audio_progress_and_history(store):
+    """Testa o andamento e o tempo restante a partir do histórico por etapa"""
+    # Histórico: 0.5s por segundo de áudio na transcrição, 20s para o relatório
+    _past_run(store, "antigo1", 50, 100, 20)
+    _past_run(store, "antigo2", 100, 200, 20)
+
+    store.record("job", 'plan', detail=['transcribing', 'generating_report'], ts=1000)
+    store.record("job", 'start', stage='transcribing', ts=1000)
+    store.record("job", 'progress', stage='transcribing', audio_seconds_done=300,
+                 audio_seconds_total=600, ts=1150)
+
+    snapshot = store.snapshot("job", now=1150)
+
+    # Transcrição: 300s esperados, metade feita; relatório: 20s pendentes
+    assert snapshot['status'] == 'running'
+    assert snapshot['stage'] == 'transcribing'
+    assert snapshot['eta_seconds'] == pytest.approx(170)
+    assert snapshot['fraction'] == pytest.approx(150 / 320, abs=1e-3)
+    assert snapshot['audio_seconds_done'] == 300
+
+
+@pytest.mark.unit
+def test_tracker_records_stages_and_tokens(store):
+    """Testa os eventos de início/fim, tokens e o callback de progresso"""
+    updates = []
+    tracker = ProgressTracker("job", ['generating_report', 'saving'], store=store,
+                              callback=lambda stage, fraction, message: updates.append((stage, fraction)))
+
+    with tracker.stage('generating_report'):
+        tracker.update('generating_report', tokens=850)
+    with tracker.stage('saving'):
+        pass
+
+    snapshot = store.snapshot("job")
+    assert snapshot['status'] == 'done'
+    assert snapshot['fraction'] == 1.0
+    assert snapshot['tokens'] == 850
+    assert [e['event'] for e in store.events("job")] == ['plan', 'start', 'progress', 'end', 'start', 'end']
+    assert updates[-1] == ('saving', 1.0)
+    assert set(store.latency_stats()) == {'generating_report', 'saving'}
+
+
+@pytest.mark.unit
+def test_callback_progress_without_reading_events(store, monkeypatch):
+    """Testa que o callback usa o estado do próprio tracker, sem reler os eventos do job"""
+    _past_run(store, "antigo", 50, 100, 20)
+    monkeypatch.setattr(store, 'events', lambda job_id: pytest.fail("eventos relidos a cada evento"))
+    updates = []
+    tracker = ProgressTracker("job", ['transcribing', 'generating_report'], store=store,
+                              callback=lambda stage, fraction, message: updates.append((stage, fraction, message)))
+
+    with tracker.stage('transcribing'):
+        tracker.update('transcribing', audio_seconds_done=100, audio_seconds_total=200)
+        stage, fraction, message = updates[-1]
+        # Transcrição: 100s esperados (0.5s por segundo de áudio), metade feita; relatório: 20s
+        assert stage == 'transcribing'
+        assert fraction == pytest.approx(50 / 120, abs=1e-3)
+        assert message == "Transcrevendo áudio (restam ~70s)"
+
+
+@pytest.mark.unit
+def test_failed_stage_and_cached_runs(store):
+    """Testa o registro de erro e que resultados em cache não entram no histórico"""
+    tracker = ProgressTracker("job", ['transcribing'], store=store)
+    with pytest.raises(RuntimeError):
+        with tracker.stage('transcribing'):
+            raise RuntimeError("falha no upload")
+    assert store.snapshot("job")['status'] == 'failed'
+    assert store.snapshot("job")['error'] == "falha no upload"
+
+    cached = ProgressTracker("cache", ['transcribing'], store=store)
+    with cached.stage('transcribing'):
+        cached.mark_cached('transcribing')
+        cached.update('transcribing', audio_seconds_done=600, audio_seconds_total=600)
+
+    assert store.latency_stats() == {}
+
+
+@pytest.mark.unit
+def test_streamed_text_is_buffered_and_rebuilt(store, monkeypatch):
+    """Testa a prévia do texto em geração: gravação em lotes, descartada ao fim da etapa"""
+    clock = [100.0]
+    monkeypatch.setattr('services.progress.time.perf_counter', lambda: clock[0])
+    tracker = ProgressTracker("job", ['generating_report'], store=store)
+
+    tracker.start('generating_report')
+    for piece in ("# Relatório", "\n## Anamnese", "\nPrurido há 3 dias."):
+        tracker.stream_text('generating_report', piece)
+        clock[0] += 0.1
+
+    # Primeiro trecho gravado na hora; os seguintes aguardam o próximo lote
+    snapshot = store.snapshot("job")
+    assert snapshot['partial_text'] == "# Relatório"
+    assert snapshot['ttft_seconds'] >= 0
+
+    clock[0] += 0.5
+    tracker.stream_text('generating_report', "\nRetorno em 15 dias.")
+    assert store.snapshot("job")['partial_text'] == (
+        "# Relatório\n## Anamnese\nPrurido há 3 dias.\nRetorno em 15 dias."
+    )
+
+    # O relatório fica salvo em arquivo: a prévia não é mantida
+    tracker.end('generating_report')
+    assert store.snapshot("job")['partial_text'] is None
+    assert [e['event'] for e in store.events("job")] == ['plan', 'start', 'end']
+
+
+@pytest.mark.unit
+def test_prune_drops_idle_jobs(store):
+    """Testa que só os eventos de jobs sem atividade há mais que a retenção são apagados"""
+    day = 86400
+    _past_run(store, "antigo", 50, 100, 20)
+    store.record("recente", 'plan', detail=['generating_report'], ts=0)
+    store.record("recente", 'end', stage='generating_report', duration=20, ts=29 * day)
+
+    assert store.prune(retention_days=30, now=40 * day) == 3
+    assert store.events("antigo") == []
+    assert len(store.events("recente")) == 2
+    assert store.prune(retention_days=0, now=1000 * day) == 0
+
+
+@pytest.mark.unit
+def test_phases_inside_a_stage(store):
+    """Testa as fases do relatório longo (extração e síntese) no snapshot e no histórico"""
+    tracker = ProgressTracker("job", ['generating_report'], store=store)
+    with tracker.stage('generating_report'):
+        tracker.phase('generating_report', 'extract', 12.5, {'segments': 4})
+        tracker.phase('generating_report', 'synthesis', 30.0)
+
+    snapshot = store.snapshot("job")
+    assert snapshot['status'] == 'done'
+    assert snapshot['phases'] == {'extract': 12.5, 'synthesis': 30.0}
+
+    stats = store.latency_stats()
+    assert stats['generating_report:extract']['p50'] == 12.5
+    assert stats['generating_report:synthesis']['count'] == 1
+    assert 'generating_report' in stats
@@ -0,0 +1,207 @@
+"""
+Testes para o índice de metadados dos relatórios
+"""
+from datetime import date, datetime
+import pytest
+from services.report_index import ReportIndex
+from services.report_service import ReportService
+from services.stats_service import StatsService
+from services.usage_ledger import UsageLedger
+
+
+@pytest.fixture
+def report_dir(temp_dir):
+    directory = temp_dir / "relatorios"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def index(temp_dir):
+    return ReportIndex(temp_dir / "report_index.db")
+
+
+@pytest.fixture
+def ledger(temp_dir):
+    return UsageLedger(temp_dir / "usage_ledger.db")
+
+
+@pytest.mark.unit
+def test_save_update_delete_keep_index_in_sync(report_dir, index):
+    """Testa que gravar, editar e apagar relatórios atualizam o índice"""
+    service = ReportService(report_dir, index=index)
+    rex = service.save_report("20240115_103000_Rex_consulta.mp3.md", "# Relatório\nMotivo do retorno: vômito")
+    service.save_report("20240116_090000_Mimi_texto.md", "# Relatório\nPrimeira consulta")
+
+    reports = service.get_recent_reports(limit=10)
+    assert [r['paciente'] for r in reports] == ['Mimi', 'Rex']
+    assert reports[1]['motivo'] == "Retorno"
+    assert reports[1]['data'] == "15/01/2024 10:30"
+    assert reports[1]['origem'] == "consulta.mp3"
+    assert reports[1]['caminho'] == rex.resolve()
+
+    assert service.update_report(rex, "# Relatório corrigido")
+    entry = index.get(rex)
+    assert entry['report_type'] == "Consulta"
+    assert entry['size'] == len("# Relatório corrigido".encode('utf-8'))
+
+    assert service.delete_report(rex)
+    assert [r['paciente'] for r in service.get_recent_reports()] == ['Mimi']
+
+
+@pytest.mark.unit
+def test_search_pagination_and_counts(report_dir, index, ledger):
+    """Testa filtros, ordenação, paginação e contagens por período"""
+    service = ReportService(report_dir, index=index)
+    for day, name in [(10, "Rex"), (11, "Bob"), (11, "Rexona"), (12, "Ana")]:
+        service.save_report(f"202403{day}_120000_{name}_texto.md", "conteúdo")
+
+    assert [r['paciente'] for r in service.get_recent_reports(limit=2, offset=1)] == ['Rexona', 'Bob']
+    assert [r['paciente'] for r in service.search_reports(search_term="rex")] == ['Rexona', 'Rex']
+    assert [r['paciente'] for r in service.search_reports(date_filter="11/03/2024", order='patient')] == ['Bob', 'Rexona']
+    assert service.search_reports(order='oldest')[0]['paciente'] == 'Rex'
+
+    stats = StatsService(report_dir, index=index, ledger=ledger)
+    assert stats.get_report_count_by_date_range(datetime(2024, 3, 11), datetime(2024, 3, 12)) == 3
+    assert service.count_reports(start=date(2024, 3, 12)) == 1
+    assert stats.get_stats()['total_relatorios'] == 4
+
+
+@pytest.mark.unit
+def test_existing_reports_are_imported_on_startup(report_dir, index):
+    """Testa que relatórios anteriores ao índice são importados ao iniciar"""
+    (report_dir / "20240101_080000_Thor_texto.md").write_text("Motivo do retorno: check-up", encoding='utf-8')
+    (report_dir / "notas.md").write_text("fora do padrão", encoding='utf-8')
+
+    service = ReportService(report_dir, index=index)
+    assert [r['motivo'] for r in service.get_recent_reports()] == ["Retorno"]
+    # Fora do padrão: só na busca, fora da listagem e da contagem
+    assert service.count_reports() == 1
+
+
+@pytest.mark.unit
+def test_reconcile_picks_up_changes_made_outside_the_app(report_dir, index, temp_dir):
+    """Testa que cópias, edições e exclusões feitas direto na pasta chegam ao índice"""
+    transcription_dir = temp_dir / "transcricoes"
+    transcription_dir.mkdir()
+    service = ReportService(report_dir, index=index, transcription_dir=transcription_dir)
+    thor = service.save_report("20240101_080000_Thor_texto.md", "Consulta de rotina")
+    luna = service.save_report("20240102_080000_Luna_texto.md", "Vacinação")
+    assert index.reconcile(report_dir) == {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 2}
+
+    # Edição manual, exclusão e cópia de um relatório (com transcrição) para a pasta
+    thor.write_text("Motivo do retorno: claudicação", encoding='utf-8')
+    luna.unlink()
+    (transcription_dir / "bob.mp3_transcricao.txt").write_text("tosse seca", encoding='utf-8')
+    (report_dir / "20240103_080000_Bob_bob.mp3.md").write_text("Traqueíte", encoding='utf-8')
+
+    assert service.reconcile() == {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': 0}
+    assert [(r['paciente'], r['motivo']) for r in service.get_recent_reports()] == [
+        ('Bob', "Consulta"), ('Thor', "Retorno")
+    ]
+    assert [r['paciente'] for r in service.full_text_search("tosse")] == ['Bob']
+    assert service.full_text_search("vacinacao") == []
+    assert index.reconcile(report_dir)['unchanged'] == 2
+
+
+@pytest.mark.unit
+def test_full_text_search_with_filters(report_dir, index):
+    """Testa a busca no texto de relatórios e transcrições, com trechos e filtros"""
+    service = ReportService(report_dir, index=index)
+    service.save_report(
+        "20240301_100000_Rex_consulta.mp3.md",
+        "- **Paciente:** Rex | **Espécie:** Canina | **Raça:** SRD\n- **Tutor:** Maria Souza\n"
+        "Diagnóstico: otite externa. Prescrito amoxicilina 250mg.",
+        transcription="o tutor relatou vômito há dois dias"
+    )
+    service.save_report(
+        "20240305_100000_Mimi_texto.md", "Otite média tratada com enrofloxacina.",
+        patient_info={'paciente_especie': "Felina", 'tutor_nome': "João Lima"}
+    )
+
+    # Palavras parciais e sem acento, no relatório e na transcrição
+    results = service.full_text_search("amoxi otite")
+    assert [r['paciente'] for r in results] == ['Rex']
+    assert "**amoxicilina**" in results[0]['trecho']
+    assert [r['paciente'] for r in service.full_text_search("vomito")] == ['Rex']
+
+    assert [r['paciente'] for r in service.full_text_search("otite", order='recent')] == ['Mimi', 'Rex']
+    assert [r['paciente'] for r in service.full_text_search("otite", species="felina")] == ['Mimi']
+    assert [r['paciente'] for r in service.full_text_search("otite", tutor="maria")] == ['Rex']
+    assert service.full_text_search("otite", start=date(2024, 3, 2), end=date(2024, 3, 4)) == []
+    assert service.get_species() == ['Canina', 'Felina']
+
+    # Edição mantém a transcrição indexada; exclusão remove da busca
+    rex = report_dir / "20240301_100000_Rex_consulta.mp3.md"
+    service.update_report(rex, "Diagnóstico: dermatite.")
+    assert service.full_text_search("otite", species="canina") == []
+    assert [r['paciente'] for r in service.full_text_search("vomito")] == ['Rex']
+    service.delete_report(rex)
+    assert service.full_text_search("vomito") == []
+    assert service.full_text_search('"" OR *') == []
+
+
+@pytest.mark.unit
+def test_daily_rollups_follow_saves_edits_and_deletes(report_dir, index, ledger):
+    """Testa os agregados diários (espécie, atendimento, provedor, custo e latência)"""
+    service = ReportService(report_dir, index=index)
+    stats = StatsService(report_dir, index=index, ledger=ledger)
+    metrics = {'provider': "google_gemini", 'model': "gemini-pro", 'input_tokens': 1000,
+               'output_tokens': 500, 'cost_usd': 0.02, 'transcription_seconds': 40, 'report_seconds': 12}
+    rex = service.save_report(
+        "20240301_100000_Rex_a.md", "Consulta",
+        patient_info={'paciente_especie': "Canina", 'tipo_atendimento': "Presencial"}, metrics=metrics
+    )
+    service.save_report(
+        "20240301_110000_Mimi_b.md", "Consulta",
+        patient_info={'paciente_especie': "Felina", 'tipo_atendimento': "Videoconferência"},
+        metrics={**metrics, 'cost_usd': 0.03, 'report_seconds': 25}
+    )
+    # Relatório salvo por fora do app: entra nas contagens, sem custo nem latência
+    (report_dir / "20240302_090000_Thor_c.md").write_text("**Espécie:** canina\n**Modalidade:** Presencial")
+    service.reconcile()
+
+    assert stats.get_breakdown('species') == {
+        'canina': {'reports': 2, 'cost_usd': pytest.approx(0.02)},
+        'felina': {'reports': 1, 'cost_usd': pytest.approx(0.03)},
+    }
+    assert {k: v['reports'] for k, v in stats.get_breakdown('attendance').items()} == {
+        'presencial': 2, 'videoconferência': 1
+    }
+    assert {k: v['reports'] for k, v in stats.get_breakdown('provider').items()} == {'google_gemini': 2, '': 1}
+    assert stats.get_total_api_cost() == pytest.approx(0.05)
+    assert stats.get_report_count_by_date_range(datetime(2024, 3, 1), datetime(2024, 3, 1)) == 2
+
+    latency = stats.get_latency_percentiles()
+    assert latency['transcription'] == {'count': 2, 'p50': 45, 'p90': 45, 'p99': 45}
+    assert latency['report'] == {'count': 2, 'p50': 15, 'p90': 30, 'p99': 30}
+
+    # Edição mantém as métricas; exclusão tira a contribuição dos agregados
+    service.update_report(rex, "Motivo do retorno: revisão")
+    assert stats.get_breakdown('type') == {'Consulta': {'reports': 2, 'cost_usd': pytest.approx(0.03)},
+                                           'Retorno': {'reports': 1, 'cost_usd': pytest.approx(0.02)}}
+    service.delete_report(rex)
+    assert stats.get_total_api_cost() == pytest.approx(0.03)
+    assert stats.get_latency_percentiles()['transcription']['count'] == 1
+    assert [count for _, count in stats.daily.last_days(3, today=date(2024, 3, 3))] == [1, 1, 0]
+
+
+@pytest.mark.unit
+def test_tutor_summaries_are_not_indexed_as_reports(report_dir, index, ledger):
+    """Testa que o resumo do tutor não entra no índice, nas listagens nem nos agregados"""
+    service = ReportService(report_dir, index=index)
+    stats = StatsService(report_dir, index=index, ledger=ledger)
+    rex = service.save_report("20240301_100000_Rex_a.md", "Consulta",
+                              patient_info={'paciente_especie': "Canina"})
+    summary = service.save_report(f"{rex.stem}_resumo_tutor.md", "Olá! O Rex está bem.")
+    # Resumo copiado por fora do app e arquivo fora do padrão de nome
+    (report_dir / "20240302_090000_Thor_c_resumo_tutor.md").write_text("Resumo")
+    (report_dir / "notas.md").write_text("**Espécie:** canina")
+    service.reconcile()
+
+    assert summary.exists()
+    assert index.get(summary) is None
+    assert stats.daily.totals()['reports'] == 1
+    assert set(stats.get_breakdown('species')) == {'canina'}
+    assert [r['paciente'] for r in service.get_recent_reports()] == ['Rex']
+    assert service.count_reports() == 1
@@ -0,0 +1,108 @@
+"""
+Testes para a organização das pastas em subpastas por data (AAAA/MM/DD)
+"""
+from datetime import date
+import pytest
+import config
+from services import archive, storage_layout
+from services.report_index import ReportIndex
+from services.report_service import ReportService
+
+
+@pytest.fixture
+def report_dir(temp_dir):
+    directory = temp_dir / "relatorios"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def index(temp_dir):
+    return ReportIndex(temp_dir / "report_index.db")
+
+
+@pytest.mark.unit
+def test_sharded_reports_are_saved_listed_and_reconciled_by_day(report_dir, index, temp_dir, monkeypatch):
+    """Testa a gravação em AAAA/MM/DD, a busca por dia e a transcrição na subpasta do dia"""
+    monkeypatch.setattr(config, 'STORAGE_LAYOUT', 'sharded')
+    transcription_dir = temp_dir / "transcricoes"
+    service = ReportService(report_dir, index=index, transcription_dir=transcription_dir)
+
+    rex = service.save_report("20240301_100000_Rex_a.md", "Consulta")
+    assert rex == report_dir / "2024" / "03" / "01" / "20240301_100000_Rex_a.md"
+    assert service.get_recent_reports()[0]['arquivo'] == "20240301_100000_Rex_a.md"
+    assert service.get_recent_reports()[0]['caminho'] == rex.resolve()
+
+    # Arquivos copiados direto para a subpasta de um dia (com a transcrição na subpasta do mesmo dia)
+    storage_layout.path_for(transcription_dir, "bob.mp3_transcricao.txt", day=date(2024, 3, 2)).write_text(
+        "tosse seca", encoding='utf-8'
+    )
+    storage_layout.path_for(report_dir, "20240302_090000_Bob_bob.mp3.md").write_text("Traqueíte", encoding='utf-8')
+    (report_dir / "2024" / "03" / "01" / "20240301_110000_Mimi_b.md").write_text("Vacina", encoding='utf-8')
+
+    # Busca por um dia: só a pasta desse dia é lida
+    assert [r['paciente'] for r in service.search_reports(date_filter="02/03/2024")] == ['Bob']
+    assert [r['paciente'] for r in service.full_text_search("tosse")] == ['Bob']
+    assert [r['paciente'] for r in service.get_recent_reports()] == ['Bob', 'Rex']
+
+    assert service.reconcile() == {'added': 1, 'updated': 0, 'removed': 0, 'unchanged': 2}
+    assert service.update_report(rex, "Motivo do retorno: revisão")
+    assert service.delete_report(rex)
+    assert [r['paciente'] for r in service.get_recent_reports()] == ['Bob', 'Mimi']
+
+
+@pytest.mark.unit
+def test_migration_moves_files_and_keeps_index_entries(report_dir, index, temp_dir):
+    """Testa a migração da pasta plana para subpastas e de volta, sem perder métricas"""
+    # Sem data no nome: vai para a subpasta do dia da modificação
+    (report_dir / "notas.md").write_text("fora do padrão", encoding='utf-8')
+    service = ReportService(report_dir, index=index)
+    rex = service.save_report("20240301_100000_Rex_a.md", "Consulta", transcription="otite",
+                              metrics={'provider': "google_gemini", 'cost_usd': 0.02})
+    service.save_report("20240415_100000_Thor_b.md", "Retorno")
+
+    assert service.migrate_layout('sharded') == {'moved': 3, 'skipped': 0, 'conflicts': 0}
+    moved = report_dir / "2024" / "03" / "01" / rex.name
+    assert moved.is_file() and not rex.exists()
+    assert storage_layout.locate(rex) == moved
+    assert storage_layout.resolve(report_dir, rex.name) == moved
+    assert index.get(moved)['cost_usd'] == pytest.approx(0.02)
+    assert [r['paciente'] for r in service.full_text_search("otite")] == ['Rex']
+    assert index.reconcile(report_dir)['unchanged'] == 3
+
+    assert service.migrate_layout('sharded')['skipped'] == 3
+    assert service.migrate_layout('flat')['moved'] == 3
+    assert rex.is_file()
+    assert not (report_dir / "2024").exists()
+    assert index.get(rex)['provider'] == "google_gemini"
+    assert index.reconcile(report_dir) == {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 3}
+
+
+@pytest.mark.unit
+def test_migration_moves_archived_files(report_dir, index, temp_dir):
+    """Testa que relatórios e transcrições arquivados (comprimidos) mudam de pasta junto com os demais"""
+    transcription_dir = temp_dir / "transcricoes"
+    transcription_dir.mkdir()
+    (transcription_dir / "rex.mp3_transcricao.txt").write_text("tosse seca " * 50, encoding='utf-8')
+    (transcription_dir / "thor.mp3_transcricao.txt").write_text("otite", encoding='utf-8')
+    service = ReportService(report_dir, index=index, transcription_dir=transcription_dir)
+    rex = service.save_report("20240301_100000_Rex_rex.mp3.md", "Traqueíte", metrics={'cost_usd': 0.02})
+    thor = service.save_report("20240415_100000_Thor_thor.mp3.md", "Otite")
+
+    gzip = archive.Archiver(codec='gzip')
+    service.archive_reports(older_than_days=0, archiver=gzip)
+    gzip.archive(transcription_dir, '.txt', 'transcriptions', older_than_days=0)
+    service.update_report(thor, "Otite externa")  # volta a ser um arquivo simples
+
+    assert service.migrate_layout('sharded') == {'moved': 2, 'skipped': 0, 'conflicts': 0}
+    assert storage_layout.migrate(transcription_dir, '.txt', 'sharded')['moved'] == 2
+    moved = report_dir / "2024" / "03" / "01" / (rex.name + ".gz")
+    assert moved.is_file()
+    assert list(report_dir.glob("*.md*")) == []
+    assert list(transcription_dir.glob("*.txt*")) == []
+
+    # Entrada do índice acompanha o arquivo comprimido, sem reler nem perder métricas
+    assert storage_layout.locate(rex) == moved
+    assert index.get(moved.with_suffix(""))['cost_usd'] == pytest.approx(0.02)
+    assert service.get_report_content(moved.with_suffix("")) == "Traqueíte"
+    assert index.reconcile(report_dir, transcription_dir)['unchanged'] == 2
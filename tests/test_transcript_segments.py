@@ -0,0 +1,43 @@
+"""
+Testes para a divisão de transcrições longas em trechos
+"""
+import pytest
+from services.transcript_segments import CHARS_PER_TOKEN, estimate_tokens, split_by_token_budget
+
+
+@pytest.mark.unit
+def test_short_transcription_is_a_single_segment():
+    """Testa que uma transcrição dentro do limite não é dividida"""
+    text = "Tutor relata vômito há dois dias."
+    assert estimate_tokens(text) == -(-len(text) // CHARS_PER_TOKEN)
+    assert split_by_token_budget(text, 100) == [text]
+    assert split_by_token_budget("  ", 100) == []
+
+
+@pytest.mark.unit
+def test_segments_respect_budget_and_keep_every_word():
+    """Testa cortes em linhas e frases, o limite de tokens e a ordem das palavras"""
+    lines = [f"Minuto {n}: anestesista informa FC {60 + n} bpm. Cirurgião pede mais gaze." for n in range(200)]
+    text = "\n".join(lines)
+
+    segments = split_by_token_budget(text, 500)
+
+    assert len(segments) > 1
+    assert all(estimate_tokens(segment) <= 500 for segment in segments)
+    assert " ".join(" ".join(segments).split()) == " ".join(text.split())
+    # Cortes entre linhas: nenhuma linha dividida
+    assert all(line in lines for segment in segments for line in segment.splitlines())
+
+
+@pytest.mark.unit
+def test_run_on_text_is_cut_between_sentences_then_words():
+    """Testa transcrição sem quebras de linha (Whisper) e frase maior que o limite"""
+    sentences = " ".join(f"O tutor relata episódio {n} de tosse seca." for n in range(100))
+    run_on = " ".join(["palavra"] * 400)
+
+    segments = split_by_token_budget(sentences + " " + run_on, 100)
+
+    assert all(estimate_tokens(segment) <= 100 for segment in segments)
+    assert segments[0].startswith("O tutor relata episódio 0")
+    assert all(segment.endswith(".") for segment in segments[:3])
+    assert " ".join(" ".join(segments).split()) == " ".join((sentences + " " + run_on).split())
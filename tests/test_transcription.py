@@ -1,12 +1,51 @@
 """
 Testes para a classe VeterinaryTranscription
 """
+import shutil
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock, mock_open
 from transcribe_consult import VeterinaryTranscription
+from services.llm_service import LLMService
+from services.usage_ledger import UsageLedger
 import anthropic
 
+TEMPLATES = Path(__file__).resolve().parent.parent / "templates"
+
+
+class FakeLLM(LLMService):
+    """LLM local: relatório e resumo do tutor fixos, sem rede"""
+    provider = "fake"
+    model_name = "fake-model"
+
+    def __init__(self, fail_summary=False):
+        super().__init__()
+        self.fail_summary = fail_summary
+
+    def _generate(self, prompt, system_prompt=None, prefix=None):
+        if prefix and "resumo" in prefix:
+            if self.fail_summary:
+                raise RuntimeError("resumo indisponível")
+            self._record_usage(800, 150)
+            return "Olá! O Bob está bem."
+        self._record_usage(1_200, 400)
+        return "# Relatório Veterinário\n\nPaciente: Bob"
+
+
+@pytest.fixture
+def fake_system(mock_env_vars, setup_test_dirs, temp_dir, monkeypatch):
+    """Sistema com um FakeLLM (fake_system.llm_service) e os templates de resumo do tutor"""
+    import config
+    for name in ("prompt_resumo_tutor.txt", "prompt_resumo_tutor_transcricao.txt"):
+        shutil.copy(TEMPLATES / name, setup_test_dirs['template_dir'] / name)
+    monkeypatch.setattr(config, 'JOB_STORE_DB', temp_dir / "app_jobs.db")
+
+    def build(**llm_options):
+        with patch('transcribe_consult.get_transcription_service', return_value=MagicMock()), \
+                patch('transcribe_consult.get_llm_service', return_value=FakeLLM(**llm_options)):
+            return VeterinaryTranscription(load_whisper=False)
+    return build
+
 
 # ============================================================================
 # Testes de Inicialização
@@ -344,3 +383,95 @@ def test_full_workflow_from_audio(mock_env_vars, setup_test_dirs, sample_patient
             import config
             transcription_files = list(config.TRANSCRIPTION_DIR.glob("*.txt"))
             assert len(transcription_files) > 0
+
+
+# ============================================================================
+# Testes do Registro de Uso
+# ============================================================================
+
+@pytest.mark.unit
+def test_cached_response_not_recorded_in_ledger(fake_system, sample_patient_info, sample_transcription):
+    """Testa que uma resposta servida do cache não entra no registro de uso"""
+    system = fake_system()
+
+    first = system.process_from_text(sample_transcription, sample_patient_info, echo_report=False)
+    second = system.process_from_text(
+        sample_transcription, sample_patient_info, source_name="repetida", echo_report=False
+    )
+
+    assert system.llm_service.last_usage['cached_response']
+    ledger = UsageLedger()
+    assert [call['kind'] for call in ledger.calls(first)] == ['report']
+    assert ledger.calls(second) == []
+    (row,) = ledger.summary(group_by=('kind',))
+    assert row['calls'] == 1
+
+
+# ============================================================================
+# Testes do Resumo do Tutor Concorrente
+# ============================================================================
+
+@pytest.fixture
+def concurrent_summary(monkeypatch):
+    """Resumo do tutor gerado ao lado do relatório (TUTOR_SUMMARY_MODE='concurrent')"""
+    import config
+    monkeypatch.setattr(config, 'TUTOR_SUMMARY_MODE', 'concurrent')
+
+
+@pytest.fixture
+def full_patient_info(sample_patient_info):
+    """Informações do paciente com os campos opcionais vazios (como na coleta pelo terminal)"""
+    from services.bulk_import import OPTIONAL_PATIENT_FIELDS
+    return {**sample_patient_info, **{field: '' for field in OPTIONAL_PATIENT_FIELDS}}
+
+
+@pytest.mark.unit
+def test_concurrent_summary_stage_before_saving(fake_system, concurrent_summary, full_patient_info,
+                                                 sample_transcription):
+    """Testa que a espera pelo resumo é uma etapa própria, entre o relatório e a gravação"""
+    from services.progress import ProgressStore
+    system = fake_system()
+
+    system.process_from_text(sample_transcription, full_patient_info, job_id="job-resumo", echo_report=False)
+
+    started = [event['stage'] for event in ProgressStore().events("job-resumo") if event['event'] == 'start']
+    assert started == ['generating_report', 'tutor_summary', 'saving']
+
+
+@pytest.mark.unit
+def test_concurrent_summary_saved_outside_index(fake_system, concurrent_summary, full_patient_info,
+                                                sample_transcription):
+    """Testa que o resumo é salvo ao lado do relatório, mas fora do índice e das contagens"""
+    system = fake_system()
+
+    report_path = system.process_from_text(sample_transcription, full_patient_info, echo_report=False)
+
+    summary_path = report_path.with_name(report_path.stem + "_resumo_tutor.md")
+    assert summary_path.read_text(encoding='utf-8') == "Olá! O Bob está bem."
+    assert system.report_service.count_reports() == 1
+    assert [report['arquivo'] for report in system.report_service.search_reports()] == [report_path.name]
+
+
+@pytest.mark.unit
+def test_concurrent_summary_failure_keeps_report(fake_system, concurrent_summary, full_patient_info,
+                                                 sample_transcription):
+    """Testa que uma falha no resumo não impede a gravação do relatório"""
+    system = fake_system(fail_summary=True)
+
+    report_path = system.process_from_text(sample_transcription, full_patient_info, echo_report=False)
+
+    assert report_path.exists()
+    assert not report_path.with_name(report_path.stem + "_resumo_tutor.md").exists()
+
+
+@pytest.mark.unit
+def test_concurrent_summary_linked_to_report(fake_system, concurrent_summary, full_patient_info,
+                                             sample_transcription):
+    """Testa que a chamada do resumo entra no registro de uso vinculada ao relatório"""
+    system = fake_system()
+
+    report_path = system.process_from_text(sample_transcription, full_patient_info, echo_report=False)
+
+    calls = UsageLedger().calls(report_path)
+    assert sorted(call['kind'] for call in calls) == ['report', 'tutor_summary']
+    assert len({call['consultation_id'] for call in calls}) == 1
@@ -0,0 +1,71 @@
+"""
+Testes para o cache de transcrições
+"""
+import os
+import time
+import pytest
+from services.transcription_cache import TranscriptionCache, hash_file
+
+
+@pytest.mark.unit
+def test_hash_file_depends_only_on_content(temp_dir):
+    """Testa que o hash depende apenas do conteúdo do arquivo"""
+    a = temp_dir / "a.mp3"
+    b = temp_dir / "b.mp3"
+    a.write_bytes(b"mesmo audio")
+    b.write_bytes(b"mesmo audio")
+
+    assert hash_file(a) == hash_file(b)
+
+
+@pytest.mark.unit
+def test_make_key_changes_with_settings():
+    """Testa que mudanças de provedor, modelo ou opções geram chaves diferentes"""
+    base = TranscriptionCache.make_key("abc", "openai_whisper", "base", "pt", {'beam_size': 1})
+
+    assert base == TranscriptionCache.make_key("abc", "openai_whisper", "base", "pt", {'beam_size': 1})
+    assert base != TranscriptionCache.make_key("abc", "openai_whisper", "small", "pt", {'beam_size': 1})
+    assert base != TranscriptionCache.make_key("abc", "google_gemini", "base", "pt", {'beam_size': 1})
+    assert base != TranscriptionCache.make_key("abc", "openai_whisper", "base", "pt", {'beam_size': 5})
+
+
+@pytest.mark.unit
+def test_put_and_get_roundtrip_with_segments(temp_dir):
+    """Testa que texto, segmentos e metadados são preservados"""
+    cache = TranscriptionCache(cache_dir=temp_dir)
+    result = {
+        'text': 'Paciente com otite.',
+        'segments': [{'id': 0, 'start': 0.0, 'end': 2.5, 'text': ' Paciente com otite.'}],
+        'language': 'pt'
+    }
+
+    cache.put("k" * 64, result, {'transcription_seconds': 12.3})
+    cached = cache.get("k" * 64)
+
+    assert cached['text'] == result['text']
+    assert cached['segments'] == result['segments']
+    assert cached['metadata']['transcription_seconds'] == 12.3
+    assert cache.get("x" * 64) is None
+
+
+@pytest.mark.unit
+def test_eviction_removes_least_recently_used(temp_dir):
+    """Testa que a remoção por tamanho começa pelas entradas menos usadas"""
+    cache = TranscriptionCache(cache_dir=temp_dir, max_bytes=10 ** 9)
+    for name in ("a", "b", "c"):
+        cache.put(name * 64, {'text': 'x' * 1000})
+
+    # "a" é a mais antiga, mas foi lida recentemente; "b" passa a ser a LRU
+    old = time.time() - 100
+    for name in ("a", "b", "c"):
+        os.utime(cache._entry_path(name * 64), (old, old))
+    cache.get("a" * 64)
+    os.utime(cache._entry_path("c" * 64), (old + 50, old + 50))
+
+    # Espaço exato para duas entradas ("a" e "c"); os tamanhos variam com o timestamp gravado
+    cache.max_bytes = sum(cache._entry_path(name * 64).stat().st_size for name in ("a", "c"))
+    cache._evict()
+
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) is not None
+    assert cache.get("c" * 64) is not None
@@ -0,0 +1,72 @@
+"""
+Testes para o registro de uso por chamada aos provedores
+"""
+from datetime import date, timedelta
+import pytest
+import config
+from services.usage_ledger import UsageLedger
+
+
+@pytest.fixture
+def ledger(temp_dir):
+    return UsageLedger(temp_dir / "usage_ledger.db")
+
+
+def _usage(provider, model, input_tokens, output_tokens):
+    return {'provider': provider, 'model': model, 'input_tokens': input_tokens, 'output_tokens': output_tokens}
+
+
+@pytest.mark.unit
+def test_calls_are_priced_and_linked_to_the_report(ledger, monkeypatch):
+    """Testa o custo por tabela de preços e o vínculo das chamadas com o relatório"""
+    monkeypatch.setattr(config, 'TRANSCRIPTION_PRICES', {'flash': (1.0, 2.0)})
+    monkeypatch.setattr(config, 'LLM_PRICES', {'pro': (2.0, 10.0)})
+
+    assert ledger.record('transcription', _usage('google_gemini', 'flash', 100_000, 5_000),
+                         latency_seconds=30, audio_seconds=600, consultation_id="c1") == pytest.approx(0.11)
+    ledger.record('report', _usage('google_gemini', 'pro', 10_000, 2_000), latency_seconds=12, consultation_id="c1")
+    ledger.record('report', _usage('google_gemini', 'pro', 10_000, 2_000), consultation_id="outra")
+
+    totals = ledger.link("c1", "/relatorios/20240301_100000_Rex_a.md")
+    assert totals == {'input_tokens': 110_000, 'output_tokens': 7_000, 'cost_usd': pytest.approx(0.15)}
+    assert ledger.link("sem-chamadas", "x.md") is None
+
+    # Resumo do tutor: registrado direto com o relatório de origem; modelo sem preço fica sem custo
+    ledger.record('tutor_summary', _usage('anthropic_claude', 'desconhecido', 3_000, 400),
+                  report="20240301_100000_Rex_a.md")
+    calls = ledger.calls("20240301_100000_Rex_a.md")
+    assert [c['kind'] for c in calls] == ['transcription', 'report', 'tutor_summary']
+    assert calls[0]['audio_seconds'] == 600
+    assert calls[2]['cost_usd'] is None
+
+
+@pytest.mark.unit
+def test_summary_groups_and_periods(ledger, monkeypatch):
+    """Testa a agregação por provedor/modelo/tipo, latência e filtro de período"""
+    monkeypatch.setattr(config, 'LLM_PRICES', {'pro': (2.0, 10.0), 'sonnet': (3.0, 15.0)})
+    for latency in (10, 20, 30, 40):
+        ledger.record('report', _usage('google_gemini', 'pro', 1_000, 100), latency_seconds=latency)
+    ledger.record('report', _usage('anthropic_claude', 'sonnet', 1_000_000, 100_000), latency_seconds=50)
+    ledger.record('report', _usage('anthropic_claude', 'outro', 10, 10), ttft_seconds=1.5)
+    ledger.record('report', {**_usage('anthropic_claude', 'outro', 2_010, 10), 'cached_input_tokens': 2_000})
+
+    groups = ledger.summary()
+    assert [(g['provider'], g['model']) for g in groups] == [
+        ('anthropic_claude', 'sonnet'), ('google_gemini', 'pro'), ('anthropic_claude', 'outro')
+    ]
+    gemini = groups[1]
+    assert gemini['calls'] == 4
+    assert gemini['input_tokens'] == 4_000
+    assert gemini['cost_usd'] == pytest.approx(4 * 0.003)
+    assert (gemini['latency_p50'], gemini['latency_p90']) == (30, 40)
+    assert groups[2]['unpriced_calls'] == 2
+    assert (groups[2]['cache_hits'], groups[2]['cache_hit_rate']) == (1, 0.5)
+    assert groups[2]['cached_input_tokens'] == 2_000
+    assert groups[2]['latency_p50'] is None
+    assert (groups[2]['ttft_p50'], gemini['ttft_p50']) == (1.5, None)
+
+    by_provider = {g['provider']: g['calls'] for g in ledger.summary(group_by=('provider',))}
+    assert by_provider == {'anthropic_claude': 3, 'google_gemini': 4}
+    assert [g['day'] for g in ledger.summary(group_by=('day',))] == [date.today().strftime("%Y-%m-%d")]
+    assert ledger.total_cost() == pytest.approx(4.5 + 0.012)
+    assert ledger.summary(end=date.today() - timedelta(days=1)) == []
@@ -6,14 +6,33 @@ Versão: 1.3
 """
 
 import sys
+import time
+import uuid
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 import config
 from utils import setup_ffmpeg, validate_patient_info
 from services.transcription_service import get_transcription_service
-from services.llm_service import get_llm_service
+from services.llm_service import get_llm_service, split_prompt_template
+from services.transcript_segments import estimate_tokens, split_by_token_budget
+from services.transcription_cache import TranscriptionCache, hash_file
+from services.audio_preprocessing import SAMPLE_RATE, trim_silence, vad_settings
+from services.audio_ingest import AudioIngestor
+from services.pipeline import BatchPipeline, PipelineItem
+from services.job_journal import JobJournal
+from services.bulk_import import (
+    OPTIONAL_PATIENT_FIELDS, ManifestError, build_summary, load_manifest, write_summary
+)
+from services.folder_watcher import WatchDaemon
+from services.progress import ProgressStore, ProgressTracker
+from services.report_index import TUTOR_SUMMARY_SUFFIX, report_metrics
+from services import archive, storage_layout
+from services.report_service import ReportService
+from services.usage_ledger import UsageLedger, last_days
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -62,9 +81,25 @@ class VeterinaryTranscription:
             logging.error(f"Erro ao inicializar serviços: {e}")
             raise
 
-        # Carregar templates de prompt
-        self.prompt_template = self._load_prompt_template()
+        # Cache de transcrições por conteúdo do áudio
+        self.transcription_cache = TranscriptionCache() if config.TRANSCRIPTION_CACHE_ENABLED else None
+        # Decodificação única do áudio (PCM compartilhado por VAD, Whisper e Gemini)
+        self.audio_ingestor = AudioIngestor()
+        # Relatórios salvos (arquivo + índice de metadados)
+        self.report_service = ReportService(config.REPORT_DIR, transcription_dir=config.TRANSCRIPTION_DIR)
+        # Registro de uso (tokens, áudio, latência e custo) de cada chamada aos provedores
+        self.usage_ledger = UsageLedger()
+
+        # Carregar templates de prompt; as instruções fixas do relatório vão como prefixo
+        # idêntico em toda chamada (cache de prompt do provedor), os dados da consulta depois
+        self.prompt_prefix, self.prompt_template = split_prompt_template(self._load_prompt_template())
         self.prompt_resumo_tutor = self._load_prompt_resumo_tutor()
+        # Resumo do tutor a partir da transcrição (modo concorrente: o relatório ainda não existe)
+        self.summary_prefix, self.summary_template = split_prompt_template(
+            self._load_prompt_resumo_tutor_transcricao()
+        )
+        # Extração de fatos por trecho (transcrições longas), com o mesmo formato prefixo + dados
+        self.fact_prefix, self.fact_template = split_prompt_template(self._load_fact_extraction_template())
         logging.info("Sistema inicializado com sucesso")
 
     def _load_prompt_template(self):
@@ -77,6 +112,27 @@ class VeterinaryTranscription:
                 f"ERRO - Template não encontrado: {config.PROMPT_TEMPLATE_FILE}"
             )
 
+    def _load_prompt_resumo_tutor_transcricao(self):
+        """Carrega o template de resumo do tutor gerado a partir da transcrição"""
+        template_path = config.TEMPLATE_DIR / "prompt_resumo_tutor_transcricao.txt"
+        if template_path.exists():
+            with open(template_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        else:
+            raise FileNotFoundError(
+                f"ERRO - Template de resumo (transcrição) não encontrado: {template_path}"
+            )
+
+    def _load_fact_extraction_template(self):
+        """Carrega o template de extração de fatos clínicos (relatório de transcrições longas)"""
+        if config.FACT_EXTRACTION_TEMPLATE_FILE.exists():
+            with open(config.FACT_EXTRACTION_TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+                return f.read()
+        else:
+            raise FileNotFoundError(
+                f"ERRO - Template de extração não encontrado: {config.FACT_EXTRACTION_TEMPLATE_FILE}"
+            )
+
     def _load_prompt_resumo_tutor(self):
         """Carrega o template de prompt para resumo do tutor"""
         template_path = config.TEMPLATE_DIR / "prompt_resumo_tutor.txt"
@@ -88,18 +144,83 @@ class VeterinaryTranscription:
                 f"ERRO - Template de resumo não encontrado: {template_path}"
             )
 
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio_path, tracker=None, consultation_id=None):
         """
         Transcreve áudio usando o serviço configurado
+
+        tracker (ProgressTracker, opcional) recebe os segundos de áudio transcritos;
+        a chamada ao provedor entra no registro de uso com consultation_id (resultados
+        do cache não geram custo e não são registrados)
         """
         print(f"\nTranscrevendo: {audio_path.name}")
         logging.info(f"Iniciando transcrição: {audio_path.name}")
 
         try:
-            result = self.transcription_service.transcribe(audio_path)
+            # Hash do conteúdo: chave do cache de transcrições e do cache de PCM
+            audio_hash = hash_file(audio_path)
+
+            cache_key = None
+            result = None
+            if self.transcription_cache is not None:
+                cache_params = self.transcription_service.cache_params()
+                if config.VAD_ENABLED:
+                    cache_params['options'] = {**cache_params['options'], 'vad': vad_settings()}
+                cache_key = self.transcription_cache.make_key(audio_hash, **cache_params)
+                result = self.transcription_cache.get(cache_key)
+                if result is not None:
+                    print("OK - Transcrição encontrada no cache")
+                    logging.info(f"Cache de transcrição (hit): {audio_path.name}")
+                    if tracker is not None:
+                        audio_seconds = result.get('metadata', {}).get('audio_seconds')
+                        tracker.mark_cached('transcribing')
+                        tracker.update('transcribing', audio_seconds_done=audio_seconds,
+                                       audio_seconds_total=audio_seconds)
+
+            if result is None:
+                start = time.perf_counter()
+                audio = self._load_pcm(audio_path, audio_hash)
+                progress = None
+                if tracker is not None:
+                    audio_seconds = len(audio) / SAMPLE_RATE if audio is not None else None
+                    tracker.update('transcribing', audio_seconds_done=0.0, audio_seconds_total=audio_seconds)
+                    progress = lambda done: tracker.update('transcribing', audio_seconds_done=done)
+                call_start = time.perf_counter()
+                if config.VAD_ENABLED and audio is not None:
+                    result = self._transcribe_without_silence(audio_path, audio, progress)
+                else:
+                    result = self.transcription_service.transcribe(audio_path, audio=audio, progress=progress)
+                call_seconds = time.perf_counter() - call_start
+                if tracker is not None:
+                    tracker.update('transcribing', audio_seconds_done=audio_seconds)
+                elapsed = time.perf_counter() - start
+                segments = result.get('segments') or []
+                self.usage_ledger.record(
+                    'transcription', self.transcription_service.usage(result), latency_seconds=call_seconds,
+                    audio_seconds=(
+                        result['vad']['kept_seconds'] if result.get('vad')
+                        else len(audio) / SAMPLE_RATE if audio is not None
+                        else segments[-1]['end'] if segments else None
+                    ),
+                    consultation_id=consultation_id
+                )
+                result.pop('usage', None)
+                if cache_key is not None:
+                    self.transcription_cache.put(cache_key, result, {
+                        'audio_file': audio_path.name,
+                        'audio_sha256': audio_hash,
+                        'transcription_seconds': round(elapsed, 3),
+                        'audio_seconds': (
+                            len(audio) / SAMPLE_RATE if audio is not None
+                            else segments[-1]['end'] if segments else None
+                        ),
+                        'vad': result.get('vad'),
+                        'upload': result.get('upload')
+                    })
 
             # Salvar transcrição
-            transcription_file = config.TRANSCRIPTION_DIR / f"{audio_path.stem}_transcricao.txt"
+            transcription_file = storage_layout.path_for(
+                config.TRANSCRIPTION_DIR, f"{audio_path.stem}_transcricao.txt"
+            )
             with open(transcription_file, 'w', encoding='utf-8') as f:
                 f.write(result['text'])
 
@@ -112,6 +233,50 @@ class VeterinaryTranscription:
             logging.error(f"Erro ao transcrever áudio {audio_path.name}: {e}")
             raise
 
+    def _load_pcm(self, audio_path, audio_hash):
+        """
+        Decodifica o áudio uma única vez (PCM mono 16 kHz em cache).
+        Retorna None se o ffmpeg não conseguir decodificar; o provedor recebe o arquivo original.
+        """
+        try:
+            return self.audio_ingestor.load(audio_path, audio_hash).samples
+        except RuntimeError as e:
+            logging.warning(f"Não foi possível decodificar {audio_path.name}: {e}")
+            return None
+
+    def _transcribe_without_silence(self, audio_path, audio, progress=None):
+        """
+        Remove trechos de silêncio antes de transcrever e mapeia os tempos dos
+        segmentos de volta para o áudio original
+        """
+        trim = trim_silence(audio)
+        stats = trim.stats()
+
+        if trim.kept_seconds == 0 or trim.removed_seconds < config.VAD_MIN_REMOVED_SECONDS:
+            # Pouco (ou nenhum) silêncio: transcrever o áudio completo
+            result = self.transcription_service.transcribe(audio_path, audio=audio, progress=progress)
+            stats['removed_seconds'] = 0.0
+            stats['kept_seconds'] = stats['original_seconds']
+        else:
+            print(f"Silêncio removido: {trim.removed_seconds:.0f}s de {trim.original_seconds:.0f}s")
+            trimmed_progress = None
+            if progress is not None:
+                # Andamento em segundos do áudio original (proporcional ao áudio sem silêncio)
+                scale = trim.original_seconds / trim.kept_seconds
+                trimmed_progress = lambda done: progress(min(done * scale, trim.original_seconds))
+            result = self.transcription_service.transcribe(
+                audio_path, audio=trim.audio, progress=trimmed_progress, trimmed=True
+            )
+            if result.get('segments'):
+                result['segments'] = trim.timestamp_map.map_segments(result['segments'])
+
+        logging.info(
+            f"VAD {audio_path.name}: {stats['removed_seconds']:.1f}s de silêncio removidos "
+            f"(original {stats['original_seconds']:.1f}s)"
+        )
+        result['vad'] = stats
+        return result
+
     def collect_patient_info(self):
         """
         Coleta informações do paciente de forma interativa
@@ -135,6 +300,8 @@ class VeterinaryTranscription:
             # Data padrão = hoje
             if not info['data_consulta']:
                 info['data_consulta'] = datetime.now().strftime("%d/%m/%Y")
+            # Campos opcionais do template (veterinário, exame clínico, medicação, exames)
+            info.update({field: '' for field in OPTIONAL_PATIENT_FIELDS})
 
             # Validar informações
             try:
@@ -148,32 +315,169 @@ class VeterinaryTranscription:
                 if retry != 's':
                     raise
 
-    def generate_report(self, transcription_text, patient_info):
+    def _record_llm_call(self, kind, start, consultation_id=None, report_path=None):
         """
-        Gera relatório estruturado usando o serviço LLM configurado
+        Registra a última chamada ao LLM (nesta thread) no registro de uso. Respostas do cache
+        não são chamadas ao provedor: sem tokens nem latência real, ficam fora do registro.
+        """
+        usage = self.llm_service.last_usage or {
+            'provider': self.llm_service.provider, 'model': self.llm_service.model_name
+        }
+        if usage.get('cached_response'):
+            return
+        self.usage_ledger.record(
+            kind, usage, latency_seconds=time.perf_counter() - start,
+            consultation_id=consultation_id, report=report_path, ttft_seconds=self.llm_service.last_ttft
+        )
+
+    def _stream_llm(self, kind, prompt, consultation_id=None, report_path=None, prefix=None, use_cache=True):
+        """
+        Trechos da resposta do LLM; ao final, registra a chamada (tempo até o primeiro trecho,
+        tokens lidos do cache de prompt). use_cache=False ignora o cache de respostas.
+        """
+        start = time.perf_counter()
+        yield from self.llm_service.generate_report_stream(prompt, prefix=prefix, use_cache=use_cache)
+        ttft = self.llm_service.last_ttft
+        if ttft is not None:
+            logging.info(f"Primeiro trecho ({kind}) em {ttft:.2f}s, concluído em {time.perf_counter() - start:.1f}s")
+        usage = self.llm_service.last_usage
+        if prefix and usage:
+            logging.info(f"Cache de prompt ({kind}): {usage.get('cached_input_tokens', 0)} de "
+                         f"{usage['input_tokens']} tokens de entrada lidos do cache, "
+                         f"{usage.get('cache_write_tokens', 0)} gravados")
+        self._record_llm_call(kind, start, consultation_id=consultation_id, report_path=report_path)
+
+    def stream_report(self, transcription_text, patient_info, consultation_id=None, use_cache=True,
+                      on_phase=None):
+        """
+        Gera relatório estruturado em streaming: devolve os trechos à medida que o LLM responde
+
+        Concatenados, os trechos formam o mesmo texto de generate_report. A chamada entra
+        no registro de uso (com o tempo até o primeiro trecho) quando o iterador termina.
+        Com use_cache=False o LLM é chamado mesmo que a mesma requisição esteja no cache.
+
+        Transcrições acima de LONG_TRANSCRIPT_TOKEN_THRESHOLD seguem em duas fases (ver
+        _stream_long_report); on_phase(fase, segundos, detalhe), se fornecido, recebe a
+        duração de cada uma. Só a síntese é transmitida em trechos.
         """
         print(f"\nGerando relatorio com {config.LLM_PROVIDER}...")
         logging.info(f"Iniciando geração de relatório via {config.LLM_PROVIDER}")
 
-        # Montar prompt com dados do paciente
-        prompt = self.prompt_template.format(
-            transcricao=transcription_text,
-            **patient_info
-        )
-
         try:
-            report = self.llm_service.generate_report(prompt)
+            segments = self._long_transcript_segments(transcription_text)
+            if segments:
+                yield from self._stream_long_report(
+                    segments, patient_info, consultation_id=consultation_id, use_cache=use_cache,
+                    on_phase=on_phase
+                )
+            else:
+                # Montar prompt com dados do paciente
+                prompt = self.prompt_template.format(
+                    transcricao=transcription_text,
+                    **patient_info
+                )
+                yield from self._stream_llm(
+                    'report', prompt, consultation_id=consultation_id, prefix=self.prompt_prefix,
+                    use_cache=use_cache
+                )
             logging.info("Relatório gerado com sucesso")
-            return report
 
         except Exception as e:
             logging.error(f"Erro ao gerar relatório: {e}")
             print(f"ERRO - Erro ao gerar relatório: {str(e)}")
             raise
 
-    def generate_tutor_summary(self, report_text, patient_info):
+    def generate_report(self, transcription_text, patient_info, consultation_id=None, on_text=None,
+                        use_cache=True, on_phase=None):
         """
-        Gera resumo para o tutor
+        Gera relatório estruturado usando o serviço LLM configurado
+
+        A chamada entra no registro de uso com consultation_id; on_text(trecho), se fornecido,
+        recebe o texto à medida que é gerado (ver stream_report). A mesma requisição repetida
+        vem do cache de respostas, salvo use_cache=False.
+        """
+        parts = []
+        for text in self.stream_report(transcription_text, patient_info, consultation_id=consultation_id,
+                                       use_cache=use_cache, on_phase=on_phase):
+            parts.append(text)
+            if on_text is not None:
+                on_text(text)
+        return "".join(parts)
+
+    def _long_transcript_segments(self, transcription_text):
+        """Trechos da transcrição acima de LONG_TRANSCRIPT_TOKEN_THRESHOLD (None: relatório numa chamada só)"""
+        threshold = config.LONG_TRANSCRIPT_TOKEN_THRESHOLD
+        if threshold <= 0 or estimate_tokens(transcription_text) <= threshold:
+            return None
+        segments = split_by_token_budget(transcription_text, config.LONG_TRANSCRIPT_SEGMENT_TOKENS)
+        return segments if len(segments) > 1 else None
+
+    def extract_segment_facts(self, segment, part, total_parts, patient_info, consultation_id=None,
+                              use_cache=True):
+        """
+        Extrai os fatos clínicos de um trecho de uma transcrição longa
+
+        A chamada entra no registro de uso como 'report_extract'.
+
+        Returns:
+            str: Fatos clínicos do trecho, em tópicos
+        """
+        prompt = self.fact_template.format(
+            trecho=segment, parte=part, total_partes=total_parts, **patient_info
+        )
+        return "".join(self._stream_llm(
+            'report_extract', prompt, consultation_id=consultation_id, prefix=self.fact_prefix,
+            use_cache=use_cache
+        ))
+
+    def _stream_long_report(self, segments, patient_info, consultation_id=None, use_cache=True, on_phase=None):
+        """
+        Relatório de uma transcrição longa em duas fases (map-reduce)
+
+        1. Extração: fatos clínicos de cada trecho, em até LONG_TRANSCRIPT_WORKERS chamadas paralelas
+        2. Síntese: os fatos, em ordem, ocupam o lugar da transcrição no template do relatório
+
+        Nenhuma chamada recebe a transcrição inteira, e a síntese parte de um texto bem menor.
+        """
+        total = len(segments)
+        print(f"Transcrição longa: extraindo fatos clínicos de {total} partes...")
+        start = time.perf_counter()
+        workers = max(1, min(config.LONG_TRANSCRIPT_WORKERS, total))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-extract") as executor:
+            futures = [
+                executor.submit(self.extract_segment_facts, segment, part, total, patient_info,
+                                consultation_id=consultation_id, use_cache=use_cache)
+                for part, segment in enumerate(segments, 1)
+            ]
+            facts = [future.result() for future in futures]
+        extract_seconds = time.perf_counter() - start
+        logging.info(f"Extração de fatos: {total} partes em {extract_seconds:.1f}s ({workers} em paralelo)")
+        if on_phase is not None:
+            on_phase('extract', extract_seconds, {'segments': total, 'workers': workers})
+
+        facts_text = (
+            f"[Transcrição longa dividida em {total} partes consecutivas. Abaixo, os fatos clínicos "
+            f"extraídos de cada parte, em ordem cronológica; se partes divergirem, vale a mais recente.]\n\n"
+            + "\n\n".join(f"### Parte {part} de {total}\n{text.strip()}" for part, text in enumerate(facts, 1))
+        )
+        prompt = self.prompt_template.format(transcricao=facts_text, **patient_info)
+        start = time.perf_counter()
+        yield from self._stream_llm(
+            'report_synthesis', prompt, consultation_id=consultation_id, prefix=self.prompt_prefix,
+            use_cache=use_cache
+        )
+        synthesis_seconds = time.perf_counter() - start
+        logging.info(f"Síntese do relatório longo em {synthesis_seconds:.1f}s")
+        if on_phase is not None:
+            on_phase('synthesis', synthesis_seconds, None)
+
+    def stream_tutor_summary(self, report_text, patient_info, report_path=None, consultation_id=None,
+                             use_cache=True):
+        """
+        Gera resumo para o tutor em streaming (trechos à medida que o LLM responde)
+
+        A chamada entra no registro de uso vinculada a report_path (relatório de origem) ou,
+        antes de o relatório existir, a consultation_id
         """
         print("\nGerando resumo para o tutor...")
         logging.info("Iniciando geração de resumo para tutor")
@@ -185,35 +489,136 @@ class VeterinaryTranscription:
         )
 
         try:
-            summary = self.llm_service.generate_report(prompt)
+            yield from self._stream_llm(
+                'tutor_summary', prompt, consultation_id=consultation_id, report_path=report_path,
+                use_cache=use_cache
+            )
             logging.info("Resumo para tutor gerado")
-            return summary
 
         except Exception as e:
             logging.error(f"Erro ao gerar resumo para tutor: {e}")
             print(f"ERRO - Erro ao gerar resumo: {str(e)}")
             raise
 
-    def save_report(self, report_text, patient_name, audio_filename):
+    def generate_tutor_summary(self, report_text, patient_info, report_path=None, consultation_id=None,
+                               use_cache=True):
+        """
+        Gera resumo para o tutor
+
+        A chamada entra no registro de uso vinculada a report_path (relatório de origem)
+        """
+        return "".join(self.stream_tutor_summary(
+            report_text, patient_info, report_path=report_path, consultation_id=consultation_id,
+            use_cache=use_cache
+        ))
+
+    def generate_tutor_summary_from_transcription(self, transcription_text, patient_info, consultation_id=None,
+                                                  use_cache=True):
+        """
+        Gera resumo para o tutor a partir da transcrição (prompt próprio, antes de o relatório existir)
+
+        A chamada entra no registro de uso vinculada a consultation_id
+        """
+        logging.info("Iniciando geração de resumo para tutor a partir da transcrição")
+        prompt = self.summary_template.format(transcricao=transcription_text, **patient_info)
+        try:
+            summary = "".join(self._stream_llm(
+                'tutor_summary', prompt, consultation_id=consultation_id, prefix=self.summary_prefix,
+                use_cache=use_cache
+            ))
+            logging.info("Resumo para tutor gerado")
+            return summary
+        except Exception as e:
+            logging.error(f"Erro ao gerar resumo para tutor: {e}")
+            raise
+
+    def _stages(self, *stages):
+        """Etapas de progresso de um processamento; no modo concorrente, a espera pelo resumo antes de salvar"""
+        stages = list(stages)
+        if config.TUTOR_SUMMARY_MODE == 'concurrent':
+            stages.insert(stages.index('saving'), 'tutor_summary')
+        return stages
+
+    def _start_tutor_summary(self, transcription_text, patient_info, consultation_id, use_cache=True):
+        """
+        Com TUTOR_SUMMARY_MODE='concurrent', começa o resumo do tutor ao lado do relatório
+
+        O resumo parte da transcrição (o relatório ainda não existe), com o prompt
+        prompt_resumo_tutor_transcricao.txt, numa thread própria: o tempo total fica próximo
+        do maior dos dois, não da soma.
+
+        Returns:
+            Future or None: Texto do resumo (None fora do modo concorrente)
+        """
+        if config.TUTOR_SUMMARY_MODE != 'concurrent':
+            return None
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tutor-summary")
+        future = executor.submit(
+            self.generate_tutor_summary_from_transcription, transcription_text, patient_info,
+            consultation_id=consultation_id, use_cache=use_cache
+        )
+        executor.shutdown(wait=False)
+        return future
+
+    def _wait_tutor_summary(self, future):
+        """Resultado do resumo concorrente; uma falha não impede o relatório (o resumo pode ser pedido depois)"""
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logging.warning(f"Resumo do tutor concorrente falhou, fica para a interface: {e}")
+            return None
+
+    def save_tutor_summary(self, summary_text, report_path):
+        """
+        Salva o resumo do tutor ao lado do relatório (<relatório>_resumo_tutor.md)
+
+        Returns:
+            Path: Resumo salvo
+        """
+        return self.report_service.save_report(tutor_summary_filename(report_path), summary_text)
+
+    def save_report(self, report_text, patient_name, audio_filename, transcription=None, patient_info=None,
+                    metrics=None, consultation_id=None):
         """
         Salva o relatório em arquivo
+
+        A transcrição e os dados do paciente, se fornecidos, entram no índice de busca
+        junto com o relatório; as métricas (services.report_index.report_metrics) alimentam as
+        estatísticas diárias. Com consultation_id, as chamadas registradas da consulta são
+        vinculadas ao relatório e seus tokens e custo (transcrição + relatório) entram nas métricas.
         """
         # Nome do arquivo: data_paciente_audio.md
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safe_patient_name = "".join(c for c in patient_name if c.isalnum() or c in (' ', '-', '_')).strip()
 
         report_filename = f"{timestamp}_{safe_patient_name}_{audio_filename}.md"
-        report_path = config.REPORT_DIR / report_filename
 
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(report_text)
+        if consultation_id is not None:
+            totals = self.usage_ledger.link(consultation_id, report_filename)
+            if totals is not None:
+                metrics = {**(metrics or {}), **totals}
+
+        # Grava o arquivo e registra os metadados no índice de relatórios
+        report_path = self.report_service.save_report(
+            report_filename, report_text, transcription=transcription, patient_info=patient_info,
+            metrics=metrics
+        )
 
         print(f"OK - Relatório salvo: {report_path.name}")
         return report_path
 
-    def process_consultation(self, audio_path, patient_info=None):
+    def process_consultation(self, audio_path, patient_info=None, progress_callback=None, job_id=None,
+                             echo_report=True, regenerate=False):
         """
         Processa uma consulta completa: transcrição + relatório
+
+        Cada etapa registra eventos de progresso (início/fim, segundos de áudio, tokens e o
+        texto do relatório à medida que é gerado) no banco de jobs; progress_callback(etapa,
+        fração, mensagem), se fornecido, recebe o andamento e a estimativa de tempo restante a
+        cada evento. Com echo_report, o relatório também aparece no terminal enquanto é gerado.
+        regenerate=True chama o LLM mesmo que a mesma requisição esteja no cache de respostas.
         """
         print("\n" + "="*60)
         print(f"PROCESSANDO CONSULTA: {audio_path.name}")
@@ -223,21 +628,61 @@ class VeterinaryTranscription:
         if patient_info is None:
             patient_info = self.collect_patient_info()
 
+        tracker = ProgressTracker(
+            job_id or f"cli-{uuid.uuid4().hex}",
+            self._stages('transcribing', 'generating_report', 'saving'),
+            callback=progress_callback
+        )
+
         # Passo 2: Transcrever áudio
-        transcription_result = self.transcribe_audio(audio_path)
+        with tracker.stage('transcribing'):
+            transcription_result = self.transcribe_audio(
+                audio_path, tracker=tracker, consultation_id=tracker.job_id
+            )
 
-        # Passo 3: Gerar relatório
-        report = self.generate_report(
-            transcription_result['text'],
-            patient_info
+        # Passo 3: Gerar relatório (e, no modo concorrente, o resumo do tutor ao mesmo tempo)
+        tutor_summary = self._start_tutor_summary(
+            transcription_result['text'], patient_info, tracker.job_id, use_cache=not regenerate
         )
+        with tracker.stage('generating_report'):
+            report = self.generate_report(
+                transcription_result['text'],
+                patient_info,
+                consultation_id=tracker.job_id,
+                on_text=self._report_text_sink(tracker, echo_report),
+                use_cache=not regenerate,
+                on_phase=self._report_phase_sink(tracker)
+            )
+            if echo_report:
+                print()
+            self._track_tokens(tracker)
+
+        # Antes de salvar (o custo do resumo entra nas métricas da consulta), numa etapa própria:
+        # a espera não conta como latência do relatório
+        if tutor_summary is not None:
+            with tracker.stage('tutor_summary'):
+                tutor_summary = self._wait_tutor_summary(tutor_summary)
 
         # Passo 4: Salvar relatório
-        report_path = self.save_report(
-            report,
-            patient_info['paciente_nome'],
-            audio_path.stem
-        )
+        with tracker.stage('saving'):
+            report_path = self.save_report(
+                report,
+                patient_info['paciente_nome'],
+                audio_path.stem,
+                transcription=transcription_result['text'],
+                patient_info=patient_info,
+                metrics=report_metrics(
+                    self.llm_service.last_usage,
+                    transcription_seconds=tracker.duration('transcribing'),
+                    report_seconds=tracker.duration('generating_report')
+                ),
+                consultation_id=tracker.job_id
+            )
+            if tutor_summary:
+                self.save_tutor_summary(tutor_summary, report_path)
+
+        # Recursos remotos da transcrição (ex: upload no Gemini) podem ser liberados
+        self.transcription_service.consultation_finished(audio_path)
 
         print("\n" + "="*60)
         print("OK - PROCESSAMENTO CONCLUÍDO COM SUCESSO!")
@@ -246,9 +691,36 @@ class VeterinaryTranscription:
 
         return report_path
 
-    def batch_process(self):
+    def _report_text_sink(self, tracker, echo):
+        """Destino dos trechos do relatório: eventos de progresso (prévia na interface) e o terminal"""
+        def on_text(text):
+            tracker.stream_text('generating_report', text)
+            if echo:
+                print(text, end='', flush=True)
+        return on_text
+
+    def _report_phase_sink(self, tracker):
+        """Fases do relatório de transcrições longas (extração, síntese) como eventos de progresso"""
+        def on_phase(name, seconds, detail):
+            tracker.phase('generating_report', name, seconds, detail)
+        return on_phase
+
+    def _track_tokens(self, tracker):
+        """Registra os tokens gerados pela última chamada ao LLM (nesta thread)"""
+        usage = self.llm_service.last_usage
+        if usage and usage.get('cached_response'):
+            # Resposta do cache: a duração não entra no histórico de latência
+            tracker.mark_cached('generating_report')
+        elif usage:
+            tracker.update('generating_report', tokens=usage['output_tokens'])
+
+    def batch_process(self, force=False):
         """
-        Processa todos os áudios na pasta audios/
+        Processa todos os áudios na pasta audios/ em pipeline concorrente
+        (decodificação -> transcrição -> relatório -> gravação).
+
+        O diário de jobs registra a etapa alcançada por cada arquivo: uma nova execução
+        retoma de onde parou e ignora áudios que já têm relatório salvo (exceto com force=True).
         """
         audio_files = []
         for ext in config.AUDIO_EXTENSIONS:
@@ -256,20 +728,52 @@ class VeterinaryTranscription:
 
         if not audio_files:
             print(f"AVISO - Nenhum áudio encontrado em {config.AUDIO_DIR}")
-            return
+            return []
 
         print(f"\nEncontrados {len(audio_files)} arquivo(s) de audio")
 
+        journal = JobJournal()
+
+        # Coletar os dados de todos os pacientes antes, para o processamento rodar sem pausas
+        items = []
         for audio_file in audio_files:
-            try:
-                self.process_consultation(audio_file)
-            except Exception as e:
-                print(f"ERRO - Erro ao processar {audio_file.name}: {str(e)}")
+            if not force and journal.is_done(hash_file(audio_file)):
+                print(f"OK - {audio_file.name} já processado, ignorando")
                 continue
+            print(f"\nArquivo: {audio_file.name}")
+            try:
+                items.append(PipelineItem(self.collect_patient_info(), audio_path=audio_file))
+            except ValueError as e:
+                print(f"AVISO - {audio_file.name} ignorado: {e}")
+
+        if not items:
+            return []
+
+        pipeline = BatchPipeline(self, journal=journal, force=force)
+        results = pipeline.run(items)
+
+        succeeded = [item for item in results if item.succeeded]
+        print("\n" + "="*60)
+        print(f"LOTE CONCLUÍDO: {len(succeeded)}/{len(items)} consulta(s) processada(s)")
+        print("="*60)
+        for item in results:
+            if item.succeeded:
+                resumed = f" (retomado após '{item.resumed_from}')" if item.resumed_from else ""
+                print(f"OK - {item.name}: {item.report_path.name}{resumed}")
+            else:
+                print(f"ERRO - Erro ao processar {item.name} ({item.failed_stage}): {item.error}")
+        for stage, stats in pipeline.stats_summary().items():
+            print(f"  {stage}: {stats['processed']} ok, {stats['failed']} erro(s), "
+                  f"{stats['items_per_minute']}/min, média {stats['avg_seconds']}s")
+
+        return results
 
-    def process_from_text(self, transcription_text, patient_info=None, source_name="transcrição_manual"):
+    def process_from_text(self, transcription_text, patient_info=None, source_name="transcrição_manual",
+                          progress_callback=None, job_id=None, echo_report=True, regenerate=False):
         """
         Processa relatório a partir de texto de transcrição já existente
+
+        Registra eventos de progresso como process_consultation (inclusive regenerate)
         """
         print("\n" + "="*60)
         print("PROCESSANDO TRANSCRICAO EXISTENTE")
@@ -279,25 +783,59 @@ class VeterinaryTranscription:
         if patient_info is None:
             patient_info = self.collect_patient_info()
 
+        tracker = ProgressTracker(
+            job_id or f"cli-{uuid.uuid4().hex}",
+            self._stages('generating_report', 'saving'),
+            callback=progress_callback
+        )
+
         # Passo 2: Salvar transcrição fornecida
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        transcription_file = config.TRANSCRIPTION_DIR / f"{timestamp}_{source_name}_transcricao.txt"
+        transcription_file = storage_layout.path_for(
+            config.TRANSCRIPTION_DIR, f"{timestamp}_{source_name}_transcricao.txt"
+        )
         with open(transcription_file, 'w', encoding='utf-8') as f:
             f.write(transcription_text)
         print(f"OK - Transcrição salva: {transcription_file.name}")
 
-        # Passo 3: Gerar relatório
-        report = self.generate_report(
-            transcription_text,
-            patient_info
+        # Passo 3: Gerar relatório (e, no modo concorrente, o resumo do tutor ao mesmo tempo)
+        tutor_summary = self._start_tutor_summary(
+            transcription_text, patient_info, tracker.job_id, use_cache=not regenerate
         )
+        with tracker.stage('generating_report'):
+            report = self.generate_report(
+                transcription_text,
+                patient_info,
+                consultation_id=tracker.job_id,
+                on_text=self._report_text_sink(tracker, echo_report),
+                use_cache=not regenerate,
+                on_phase=self._report_phase_sink(tracker)
+            )
+            if echo_report:
+                print()
+            self._track_tokens(tracker)
+
+        # Antes de salvar (o custo do resumo entra nas métricas da consulta), numa etapa própria:
+        # a espera não conta como latência do relatório
+        if tutor_summary is not None:
+            with tracker.stage('tutor_summary'):
+                tutor_summary = self._wait_tutor_summary(tutor_summary)
 
         # Passo 4: Salvar relatório
-        report_path = self.save_report(
-            report,
-            patient_info['paciente_nome'],
-            source_name
-        )
+        with tracker.stage('saving'):
+            report_path = self.save_report(
+                report,
+                patient_info['paciente_nome'],
+                source_name,
+                transcription=transcription_text,
+                patient_info=patient_info,
+                metrics=report_metrics(
+                    self.llm_service.last_usage, report_seconds=tracker.duration('generating_report')
+                ),
+                consultation_id=tracker.job_id
+            )
+            if tutor_summary:
+                self.save_tutor_summary(tutor_summary, report_path)
 
         print("\n" + "="*60)
         print("OK - PROCESSAMENTO CONCLUÍDO COM SUCESSO!")
@@ -344,7 +882,12 @@ class VeterinaryTranscription:
 
         elif choice == "2":
             # Listar arquivos .txt disponíveis
-            txt_files = list(config.TRANSCRIPTION_DIR.glob("*.txt"))
+            txt_files = sorted(
+                (Path(entry.path) for _, entry in storage_layout.iter_files(
+                    config.TRANSCRIPTION_DIR, (".txt", *(".txt" + s for s in storage_layout.ARCHIVE_SUFFIXES))
+                )),
+                key=lambda path: path.name
+            )
 
             if not txt_files:
                 # Procurar em outras pastas
@@ -366,8 +909,8 @@ class VeterinaryTranscription:
                 file_choice = int(input("\nEscolha o número do arquivo: ")) - 1
                 selected_file = txt_files[file_choice]
 
-                with open(selected_file, 'r', encoding='utf-8') as f:
-                    transcription = f.read()
+                # Transcrições antigas podem estar arquivadas (comprimidas)
+                transcription = archive.read_text(selected_file)
 
                 print(f"\nOK - Arquivo lido: {selected_file.name} ({len(transcription)} caracteres)")
                 return transcription
@@ -386,8 +929,346 @@ class VeterinaryTranscription:
             print("\nERRO - Opção inválida!")
             return None
 
-def main():
+def tutor_summary_filename(report_path):
+    """Nome do resumo do tutor de um relatório (mesma pasta do relatório)"""
+    return Path(report_path).stem + TUTOR_SUMMARY_SUFFIX
+
+
+def run_consultation_job(job, report_progress):
+    """
+    Executa um job da fila de processamento em segundo plano (services.job_queue)
+
+    Args:
+        job (dict): Job com 'kind' ('audio' ou 'text') e 'payload'
+        report_progress (callable): report_progress(etapa, fração, mensagem)
+
+    Returns:
+        Path: Relatório salvo
+    """
+    payload = job['payload']
+    report_progress('starting', 0.05, "Inicializando sistema...")
+    if job['kind'] == 'audio':
+        system = VeterinaryTranscription(load_whisper=True)
+        return system.process_consultation(
+            Path(payload['audio_path']),
+            payload['patient_info'],
+            progress_callback=report_progress,
+            job_id=job['job_id'],
+            echo_report=False,
+            regenerate=payload.get('regenerate', False)
+        )
+    system = VeterinaryTranscription(load_whisper=False)
+    return system.process_from_text(
+        payload['transcription'],
+        payload['patient_info'],
+        source_name=payload.get('source_name', "transcrição_manual"),
+        progress_callback=report_progress,
+        job_id=job['job_id'],
+        echo_report=False,
+        regenerate=payload.get('regenerate', False)
+    )
+
+
+def build_arg_parser():
+    """Argumentos de linha de comando (sem subcomando = menu interativo)"""
+    parser = argparse.ArgumentParser(
+        description="Sistema de Documentação de Consultas Veterinárias"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    bulk = subparsers.add_parser(
+        "bulk",
+        help="Processa em lote, sem interação, os arquivos listados em um manifesto CSV/JSONL"
+    )
+    bulk.add_argument("manifest", type=Path, help="Manifesto .csv ou .jsonl (colunas audio/transcricao + dados do paciente)")
+    bulk.add_argument("--summary", type=Path, default=None,
+                      help="Arquivo JSON do resumo (padrão: <manifesto>_resumo_<data>.json)")
+    bulk.add_argument("--force", action="store_true",
+                      help="Reprocessa arquivos que já têm relatório salvo")
+    bulk.add_argument("--report-workers", type=int, default=None,
+                      help="Chamadas simultâneas ao LLM")
+    bulk.add_argument("--transcribe-workers", type=int, default=None,
+                      help="Transcrições simultâneas")
+
+    watch = subparsers.add_parser(
+        "watch",
+        help="Monitora a pasta de áudios e processa cada gravação assim que terminar de chegar"
+    )
+    watch.add_argument("--directory", type=Path, default=None,
+                       help="Pasta monitorada (padrão: audios/)")
+    watch.add_argument("--stable-seconds", type=float, default=None,
+                       help="Segundos sem mudança de tamanho para considerar o arquivo completo")
+    watch.add_argument("--poll-interval", type=float, default=None,
+                       help="Intervalo entre verificações (segundos)")
+    watch.add_argument("--polling", action="store_true",
+                       help="Usa verificação periódica mesmo com inotify disponível")
+
+    status = subparsers.add_parser(
+        "status",
+        help="Mostra o andamento dos processamentos (com tempo restante) e a latência histórica por etapa"
+    )
+    status.add_argument("job_id", nargs="?", default=None, help="Job específico (padrão: os mais recentes)")
+    status.add_argument("--limit", type=int, default=10, help="Número de jobs listados")
+
+    migrate = subparsers.add_parser(
+        "migrate-layout",
+        help="Move relatórios e transcrições existentes para subpastas AAAA/MM/DD (ou de volta)"
+    )
+    migrate.add_argument("--to", choices=storage_layout.LAYOUTS, default="sharded",
+                         help="Organização de destino (padrão: sharded)")
+
+    archive_cmd = subparsers.add_parser(
+        "archive",
+        help="Comprime relatórios e transcrições antigos (continuam legíveis) e mostra taxa de compressão e latência de leitura"
+    )
+    archive_cmd.add_argument("--older-than-days", type=float, default=None,
+                             help="Idade mínima em dias sem modificação (padrão: ARCHIVE_AFTER_DAYS)")
+    archive_cmd.add_argument("--codec", choices=sorted(archive.CODEC_SUFFIXES), default=None,
+                             help="Compressão (padrão: ARCHIVE_CODEC)")
+    archive_cmd.add_argument("--no-dictionary", action="store_true",
+                             help="Não usa dicionário zstd compartilhado")
+    archive_cmd.add_argument("--retrain", action="store_true",
+                             help="Treina um novo dicionário mesmo se já houver um")
+    archive_cmd.add_argument("--stats", action="store_true",
+                             help="Apenas mostra o espaço ocupado e a latência de leitura, sem comprimir")
+
+    usage = subparsers.add_parser(
+        "usage",
+        help="Resume o uso dos provedores (chamadas, tokens, áudio, custo e latência) no período"
+    )
+    usage.add_argument("--days", type=int, default=30, help="Dias considerados, incluindo hoje")
+    usage.add_argument("--by", default="provider,model,kind",
+                       help="Agrupamento: combinação de provider, model, kind e day (separados por vírgula)")
+    return parser
+
+
+def _format_snapshot(snapshot):
+    line = f"{snapshot['job_id'][:12]}  {snapshot['status']:<8} {snapshot['fraction']:>5.0%}"
+    if snapshot['status'] == 'running':
+        line += f"  {snapshot['stage_label'] or '-'}  restam ~{snapshot['eta_seconds']:.0f}s"
+    if snapshot['audio_seconds_total']:
+        line += f"  áudio {snapshot['audio_seconds_done'] or 0:.0f}/{snapshot['audio_seconds_total']:.0f}s"
+    if snapshot['tokens']:
+        line += f"  {snapshot['tokens']} tokens"
+    if snapshot['phases']:
+        line += "  " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in snapshot['phases'].items())
+    if snapshot['error']:
+        line += f"  erro: {snapshot['error']}"
+    return line
+
+
+def run_status(args):
+    """
+    Executa o subcomando status
+
+    Returns:
+        int: Código de saída
+    """
+    store = ProgressStore()
+    job_ids = [args.job_id] if args.job_id else store.recent_jobs(args.limit)
+    snapshots = [s for s in (store.snapshot(job_id) for job_id in job_ids) if s]
+    if args.job_id and not snapshots:
+        print(f"ERRO - Job não encontrado: {args.job_id}")
+        return 1
+
+    print("Processamentos:")
+    for snapshot in snapshots:
+        print("  " + _format_snapshot(snapshot))
+
+    print("\nLatência histórica por etapa (s):")
+    for stage, stats in store.latency_stats().items():
+        line = (f"  {stage:<28} n={stats['count']:<5} p50={stats['p50']:<8} "
+                f"p90={stats['p90']:<8} p99={stats['p99']}")
+        if 'seconds_per_audio_second' in stats:
+            line += f"  ({stats['seconds_per_audio_second']}s por segundo de áudio)"
+        print(line)
+    return 0
+
+
+def run_migrate_layout(args):
+    """
+    Executa o subcomando migrate-layout
+
+    Returns:
+        int: Código de saída
+    """
+    report_counts = ReportService(config.REPORT_DIR, transcription_dir=config.TRANSCRIPTION_DIR).migrate_layout(args.to)
+    transcription_counts = storage_layout.migrate(config.TRANSCRIPTION_DIR, ".txt", args.to)
+    for label, counts in (("Relatórios", report_counts), ("Transcrições", transcription_counts)):
+        print(f"{label}: {counts['moved']} movido(s), {counts['skipped']} já no lugar, "
+              f"{counts['conflicts']} conflito(s)")
+    if config.STORAGE_LAYOUT != args.to:
+        print(f"AVISO - Defina STORAGE_LAYOUT={args.to} para que os novos arquivos sigam a mesma organização")
+    return 1 if report_counts['conflicts'] or transcription_counts['conflicts'] else 0
+
+
+def run_archive(args):
+    """
+    Executa o subcomando archive
+
+    Returns:
+        int: Código de saída
+    """
+    targets = (("Relatórios", config.REPORT_DIR, ".md", "reports"),
+               ("Transcrições", config.TRANSCRIPTION_DIR, ".txt", "transcriptions"))
+    if not args.stats:
+        archiver = archive.Archiver(codec=args.codec, use_dictionary=False if args.no_dictionary else None)
+        report_service = ReportService(config.REPORT_DIR, transcription_dir=config.TRANSCRIPTION_DIR)
+        for label, root, suffix, name in targets:
+            if name == "reports":
+                stats = report_service.archive_reports(args.older_than_days, archiver, retrain=args.retrain)
+            else:
+                stats = archiver.archive(root, suffix, name, older_than_days=args.older_than_days,
+                                         retrain=args.retrain)
+            line = f"{label}: {stats['files']} arquivado(s) com {stats['codec']}"
+            if stats['files']:
+                line += (f", {stats['original_bytes'] / 1024:.0f} KB -> {stats['compressed_bytes'] / 1024:.0f} KB "
+                         f"({stats['ratio']:.1f}x) em {stats['seconds']:.1f}s")
+            if stats['dictionary']:
+                line += f", dicionário {stats['dictionary']}"
+            print(line)
+
+    print("\nEspaço e latência de leitura:")
+    for label, root, suffix, _ in targets:
+        stats = archive.archive_stats(root, suffix)
+        plain, archived = stats['plain'], stats['archived']
+        line = f"  {label}: {plain['files']} sem compressão ({plain['bytes'] / 1024:.0f} KB"
+        if plain['read_ms'] is not None:
+            line += f", leitura {plain['read_ms']:.2f} ms"
+        line += f"), {archived['files']} arquivado(s) ({archived['bytes'] / 1024:.0f} KB"
+        if archived['files']:
+            line += (f", {stats['ratio']:.1f}x sobre {stats['original_bytes'] / 1024:.0f} KB, "
+                     f"leitura {archived['read_ms']:.2f} ms")
+        print(line + ")")
+    return 0
+
+
+def run_usage(args):
+    """
+    Executa o subcomando usage
+
+    Returns:
+        int: Código de saída
+    """
+    group_by = tuple(name.strip() for name in args.by.split(",") if name.strip())
+    if not group_by or any(name not in ('provider', 'model', 'kind', 'day') for name in group_by):
+        print(f"ERRO - Agrupamento inválido: {args.by} (use provider, model, kind, day)")
+        return 1
+
+    start, end = last_days(args.days)
+    groups = UsageLedger().summary(start, end, group_by=group_by)
+    print(f"Uso dos provedores de {start.strftime('%d/%m/%Y')} a {end.strftime('%d/%m/%Y')}:")
+    if not groups:
+        print("  Nenhuma chamada registrada")
+        return 0
+
+    for group in groups:
+        label = " / ".join(str(group[name] or "-") for name in group_by)
+        line = (f"  {label:<48} {group['calls']:>5} chamada(s)  "
+                f"tokens {group['input_tokens']}/{group['output_tokens']}  US$ {group['cost_usd']:.4f}")
+        if group['audio_seconds']:
+            line += f"  áudio {group['audio_seconds'] / 60:.1f} min"
+        if group['latency_p50'] is not None:
+            line += f"  p50={group['latency_p50']:.1f}s p90={group['latency_p90']:.1f}s"
+        if group['ttft_p50'] is not None:
+            line += f"  primeiro trecho p50={group['ttft_p50']:.1f}s"
+        if group['cached_input_tokens']:
+            line += (f"  cache {group['cache_hits']}/{group['calls']} chamada(s), "
+                     f"{group['cached_input_tokens']} tokens de entrada reaproveitados")
+        if group['unpriced_calls']:
+            line += f"  ({group['unpriced_calls']} sem preço configurado)"
+        print(line)
+    print(f"Total: {sum(g['calls'] for g in groups)} chamada(s), US$ {sum(g['cost_usd'] for g in groups):.4f}")
+    return 0
+
+
+def run_watch(args):
+    """
+    Executa o subcomando watch (até Ctrl+C)
+
+    Os dados do paciente de cada gravação vêm de um arquivo JSON com o mesmo nome
+    (consulta.mp3 -> consulta.json), com os mesmos campos do manifesto do modo bulk.
+
+    Returns:
+        int: Código de saída
+    """
+    system = VeterinaryTranscription()
+    journal = JobJournal()
+    daemon = WatchDaemon(
+        system, journal,
+        directory=args.directory,
+        stable_seconds=args.stable_seconds,
+        poll_interval=args.poll_interval,
+        use_inotify=False if args.polling else None
+    )
+    print(f"Monitorando {daemon.directory.absolute()} ({daemon.watcher.mode}). Ctrl+C para sair.")
+    totals = daemon.run()
+    print(f"\nEncerrado: {totals['processed']} processado(s), {totals['failed']} erro(s)")
+    return 0
+
+
+def run_bulk(args):
+    """
+    Executa o subcomando bulk
+
+    Returns:
+        int: Código de saída (0 = tudo ok, 1 = alguma falha, 2 = manifesto inválido)
+    """
+    try:
+        items = load_manifest(args.manifest)
+    except ManifestError as e:
+        print(f"ERRO - {e}")
+        return 2
+    except OSError as e:
+        print(f"ERRO - Não foi possível ler o manifesto: {e}")
+        return 2
+
+    if not items:
+        print("AVISO - Manifesto sem linhas para processar")
+        return 0
+    print(f"OK - Manifesto validado: {len(items)} consulta(s)")
+
+    system = VeterinaryTranscription()
+    pipeline = BatchPipeline(
+        system,
+        transcribe_workers=args.transcribe_workers,
+        report_workers=args.report_workers,
+        journal=JobJournal(),
+        force=args.force
+    )
+    started_at = datetime.now()
+    results = pipeline.run(items)
+    finished_at = datetime.now()
+
+    summary = build_summary(args.manifest, results, pipeline.stats_summary(), started_at, finished_at)
+    summary_path = args.summary or args.manifest.with_name(
+        f"{args.manifest.stem}_resumo_{started_at.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    write_summary(summary, summary_path)
+
+    totals = summary['totals']
+    print(f"\nConcluído: {totals['succeeded']} ok, {totals['skipped']} já processado(s), "
+          f"{totals['failed']} erro(s) | custo estimado US$ {summary['cost']['estimated_usd']:.4f}")
+    print(f"Resumo: {summary_path}")
+    return 1 if totals['failed'] else 0
+
+
+def main(argv=None):
     """Função principal"""
+    args = build_arg_parser().parse_args(argv)
+    if args.command == "bulk":
+        return run_bulk(args)
+    if args.command == "watch":
+        return run_watch(args)
+    if args.command == "status":
+        return run_status(args)
+    if args.command == "usage":
+        return run_usage(args)
+    if args.command == "migrate-layout":
+        return run_migrate_layout(args)
+    if args.command == "archive":
+        return run_archive(args)
+
     print("""
 ===============================================================
    SISTEMA DE DOCUMENTACAO DE CONSULTAS VETERINARIAS
@@ -454,4 +1335,4 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -231,3 +231,44 @@ def cleanup_temp_files(directory, pattern="*.tmp", max_age_hours=24):
                 logging.info(f"Arquivo temporário removido: {file_path.name}")
         except Exception as e:
             logging.warning(f"Erro ao remover {file_path.name}: {e}")
+
+
+def evict_lru_files(directory, pattern, max_bytes):
+    """
+    Remove os arquivos menos usados recentemente (por mtime) até caber no limite.
+
+    Args:
+        directory (Path): Diretório do cache
+        pattern (str): Padrão glob dos arquivos do cache
+        max_bytes (int): Tamanho máximo total em bytes
+
+    Returns:
+        int: Número de arquivos removidos
+    """
+    entries = []
+    total = 0
+    for path in Path(directory).glob(pattern):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError as e:
+            logging.warning(f"Erro ao remover {path.name} do cache: {e}")
+            continue
+        total -= size
+        removed += 1
+        logging.debug(f"Removido do cache (LRU): {path.name}")
+    return removed